@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+#   This file is part of nexdatas - Tango Server for NeXus data writer
+#
+#    Copyright (C) 2012-2018 DESY, Jan Kotanski <jkotan@mail.desy.de>
+#
+#    nexdatas is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    nexdatas is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with nexdatas.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Benchmark of the nxscollect append path.
+
+Synthetic tif, cbf, raw and hdf5 frame sets are generated and appended
+to a master file by :class:`nxstools.nxscollect.Collector` for every
+combination of input format, writer and compression. Each case runs
+in a separate process so its peak RSS can be reported, e.g.
+
+    python benchmarks/collect_benchmark.py --frames 200 --shape 512,512
+
+    python benchmarks/collect_benchmark.py --formats tif,h5 \
+        --compressions '0;2;32008:0,2' --json results.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import fabio
+import numpy
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+from nxstools import filewriter
+from nxstools import nxscollect
+from nxstools.nxsparser import TableTools
+
+
+#: (:obj:`list` <:obj:`str`>) input formats
+FORMATS = ["tif", "cbf", "raw", "h5"]
+
+#: (:obj:`str`) nexus path of the collected field
+PATH = "/entry:NXentry/instrument:NXinstrument/detector:NXdetector/data"
+
+
+def generate(directory, fmt, nframes, shape, dtype):
+    """ generates synthetic frames with poisson noise
+
+    :param directory: output directory
+    :type directory: :obj:`str`
+    :param fmt: input format, i.e. 'tif', 'cbf', 'raw' or 'h5'
+    :type fmt: :obj:`str`
+    :param nframes: number of frames
+    :type nframes: :obj:`int`
+    :param shape: frame shape
+    :type shape: :obj:`list` <:obj:`int`>
+    :param dtype: frame data type
+    :type dtype: :obj:`str`
+    :returns: (input file string, raw data type, raw frame shape,
+              size of frames in bytes)
+    :rtype: (:obj:`str`, :obj:`str`, :obj:`list` <:obj:`int`>, :obj:`int`)
+    """
+    if fmt == "cbf":
+        dtype = "int32"
+    rs = numpy.random.RandomState(12345)
+    template = os.path.join(directory, "frame_%05d." + fmt)
+    nbytes = 0
+    for i in range(nframes):
+        frame = rs.poisson(10, shape).astype(dtype)
+        nbytes += frame.nbytes
+        filename = template % i
+        if fmt == "tif":
+            fabio.tifimage.TifImage(data=frame).write(filename)
+        elif fmt == "cbf":
+            fabio.cbfimage.CbfImage(data=frame).write(filename)
+        elif fmt == "raw":
+            frame.tofile(filename)
+        elif fmt == "h5":
+            import h5py
+            with h5py.File(filename, "w") as fl:
+                fl.create_dataset("data", data=frame)
+        else:
+            raise ValueError("Unknown format: %s" % fmt)
+    if fmt == "h5":
+        template += "://data"
+    inputfiles = "%s:0:%s" % (template, nframes - 1)
+    if fmt == "raw":
+        return inputfiles, dtype, list(shape), nbytes
+    return inputfiles, None, None, nbytes
+
+
+def runcase(case):
+    """ appends generated frames to a new master file
+
+    :param case: benchmark case parameters
+    :type case: :obj:`dict` <:obj:`str`, `any`>
+    :returns: collector summary with the peak RSS in MB
+    :rtype: :obj:`dict` <:obj:`str`, `any`>
+    """
+    master = case["master"]
+    wrmodule = nxscollect.WRITERS[case["writer"]]
+    fl = filewriter.create_file(master, overwrite=True, writer=wrmodule)
+    fl.close()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        collector = nxscollect.Collector(
+            master, case["compression"], storeold=False,
+            writer=case["writer"], workers=case["workers"],
+            batchframes=case["batchframes"])
+        collector.collect(PATH, [case["inputfiles"]],
+                          case["datatype"], case["shape"])
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    summary = collector.summary()
+    summary["rss"] = None
+    if resource is not None:
+        # ru_maxrss is given in kilobytes on linux
+        summary["rss"] = resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss / 1024.
+    os.remove(master)
+    return summary
+
+
+def _runcaseprocess(case, queue):
+    """ runs the benchmark case and puts its summary into the queue
+
+    :param case: benchmark case parameters
+    :type case: :obj:`dict` <:obj:`str`, `any`>
+    :param queue: result queue
+    :type queue: :class:`multiprocessing.Queue`
+    """
+    try:
+        summary = runcase(case)
+    except Exception as e:
+        summary = {"frames": 0, "bytes": 0, "time": 0, "rss": None,
+                   "error": str(e)}
+    queue.put(summary)
+
+
+def measure(case):
+    """ runs the benchmark case in a new process to measure its peak RSS
+
+    The process is not daemonic, so the collector can start
+    its decoding worker processes.
+
+    :param case: benchmark case parameters
+    :type case: :obj:`dict` <:obj:`str`, `any`>
+    :returns: collector summary with the peak RSS in MB
+    :rtype: :obj:`dict` <:obj:`str`, `any`>
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_runcaseprocess, args=(case, queue))
+    process.start()
+    summary = None
+    try:
+        while summary is None:
+            try:
+                summary = queue.get(timeout=1)
+            except Empty:
+                if not process.is_alive():
+                    summary = {
+                        "frames": 0, "bytes": 0, "time": 0, "rss": None,
+                        "error": "process exited with code %s"
+                        % process.exitcode}
+    finally:
+        process.join()
+    return summary
+
+
+def main():
+    """ the main benchmark function
+    """
+    parser = argparse.ArgumentParser(
+        description="benchmark of the nxscollect append path")
+    parser.add_argument(
+        "--formats", dest="formats", default=",".join(FORMATS),
+        help="input formats separated by ',' (default: %(default)s)")
+    parser.add_argument(
+        "--writers", dest="writers",
+        default=",".join(sorted(nxscollect.WRITERS.keys())),
+        help="writers separated by ',' (default: %(default)s)")
+    parser.add_argument(
+        "--compressions", dest="compressions", default="0;2;32008:0,2",
+        help="compressions separated by ';' (default: %(default)s)")
+    parser.add_argument(
+        "--frames", dest="frames", type=int, default=100,
+        help="number of frames (default: %(default)s)")
+    parser.add_argument(
+        "--shape", dest="shape", default="512,512",
+        help="frame shape (default: %(default)s)")
+    parser.add_argument(
+        "--dtype", dest="dtype", default="uint16",
+        help="frame data type, cbf frames are int32 (default: %(default)s)")
+    parser.add_argument(
+        "--batch-frames", dest="batchframes", type=int, default=1,
+        help="number of frames written in one block (default: %(default)s)")
+    parser.add_argument(
+        "--workers", dest="workers", type=int, default=0,
+        help="number of decoding processes (default: %(default)s)")
+    parser.add_argument(
+        "--directory", dest="directory", default=None,
+        help="directory for generated files (default: a temporary one)")
+    parser.add_argument(
+        "--json", dest="json", default=None,
+        help="file name to dump results in the JSON format")
+    options = parser.parse_args()
+
+    shape = [int(sh) for sh in options.shape.split(",")]
+    writers = [wr for wr in options.writers.split(",")
+               if wr in nxscollect.WRITERS]
+    directory = options.directory or tempfile.mkdtemp(prefix="nxsbench_")
+    results = []
+    try:
+        for fmt in options.formats.split(","):
+            fdir = os.path.join(directory, fmt)
+            if not os.path.isdir(fdir):
+                os.makedirs(fdir)
+            inputfiles, datatype, rawshape, nbytes = generate(
+                fdir, fmt, options.frames, shape, options.dtype)
+            for writer in writers:
+                for compression in options.compressions.split(";"):
+                    case = {
+                        "format": fmt,
+                        "writer": writer,
+                        "compression": compression,
+                        "master": os.path.join(fdir, "master.nxs"),
+                        "inputfiles": inputfiles,
+                        "datatype": datatype,
+                        "shape": rawshape,
+                        "workers": options.workers,
+                        "batchframes": options.batchframes,
+                    }
+                    summary = measure(case)
+                    seconds = summary["time"] or float("nan")
+                    results.append({
+                        "format": fmt,
+                        "writer": writer,
+                        "compression": compression,
+                        "frames": summary["frames"],
+                        "seconds": round(summary["time"], 3),
+                        "frames/s": round(summary["frames"] / seconds, 1),
+                        "MB/s": round(
+                            nbytes * summary["frames"] / options.frames
+                            / seconds / 1e6, 1),
+                        "file_MB": round(summary["bytes"] / 1e6, 2),
+                        "peak_RSS_MB": (round(summary["rss"], 1)
+                                        if summary["rss"] else None),
+                        "error": summary["error"] or "",
+                    })
+    finally:
+        if not options.directory:
+            shutil.rmtree(directory)
+
+    ttools = TableTools(results)
+    ttools.title = "nxscollect append: %s frames of %s %s" % (
+        options.frames, shape, options.dtype)
+    ttools.headers = [
+        "format", "writer", "compression", "frames", "seconds",
+        "frames/s", "MB/s", "file_MB", "peak_RSS_MB", "error"]
+    print("\n".join(ttools.generateList()))
+    if options.json:
+        with open(options.json, "w") as fl:
+            json.dump({"time": time.time(), "frames": options.frames,
+                       "shape": shape, "dtype": options.dtype,
+                       "results": results}, fl, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,7 +19,9 @@
 
 """ Filename generator """
 
+import re
 import sys
+import itertools
 
 
 if sys.version_info > (3,):
@@ -58,9 +60,23 @@ class FilenameGenerator(object):
     :type start_index: :obj:`int`
     :param stop_index: file stop index
     :type stop_index: :obj:`int`
+    :param step: file index step
+    :type step: :obj:`int`
+    :param ranges: further (start, stop, step) index ranges
+    :type ranges: :obj:`list` < (:obj:`int`, :obj:`int`, :obj:`int`) >
+    :param excluded: excluded file indices
+    :type excluded: :obj:`list` <:obj:`int`>
     """
 
-    def __init__(self, fname_template, start_index=0, stop_index=None):
+    #: (:class:`re.RegexObject`) file template with the first index range
+    template_pattern = re.compile("^(.+?):(\\d+):(\\d+)(?::(\\d+))?$")
+    #: (:class:`re.RegexObject`) further index range
+    range_pattern = re.compile("^(\\d+):(\\d+)(?::(\\d+))?$")
+    #: (:class:`re.RegexObject`) excluded index or index range
+    excluded_pattern = re.compile("^!(\\d+)(?::(\\d+))?$")
+
+    def __init__(self, fname_template, start_index=0, stop_index=None,
+                 step=1, ranges=None, excluded=None):
 
         #: (:obj:`int`) file start index
         self.file_index = start_index
@@ -68,33 +84,126 @@ class FilenameGenerator(object):
         self.file_template = fname_template
         #: (:obj:`int`) file stop index
         self.stop_index = stop_index
+        #: (:obj:`int`) file index step
+        self.step = step
+        #: (:obj:`list` < (:obj:`int`, :obj:`int`, :obj:`int`) >) \
+        #:    further (start, stop, step) index ranges
+        self.ranges = list(ranges or [])
+        #: (:obj:`set` <:obj:`int`>) excluded file indices
+        self.excluded = set(excluded or [])
+
+        for _, _, stp in [(start_index, stop_index, step)] + self.ranges:
+            if stp < 1:
+                raise ValueError(
+                    "FilenameGenerator: index step %s of %s is not positive"
+                    % (stp, fname_template))
+        try:
+            fname_template % start_index
+        except (TypeError, ValueError):
+            raise ValueError(
+                "FilenameGenerator: %s is not a valid file name template"
+                % fname_template)
 
     def __call__(self):
-        # if self.stop_index is -1 we loop forever, otherwise we stop
-        # when the current index exceeds self.stop_index
-        while self.stop_index is None or self.file_index <= self.stop_index:
-            filename = self.file_template % (self.file_index)
-            self.file_index += 1
-            yield filename
+        if self.stop_index is not None:
+            for filename in self.names():
+                yield filename
+            return
+        # if self.stop_index is None we loop forever
+        while True:
+            if self.file_index not in self.excluded:
+                yield self.file_template % (self.file_index)
+            self.file_index += self.step
+
+    def indices(self):
+        """ provides all file indices
+
+        :returns: file indices
+        :rtype: :obj:`list` <:obj:`int`>
+        """
+        if self.stop_index is None:
+            raise ValueError(
+                "FilenameGenerator: %s has no stop index" % self.file_template)
+        ranges = [(self.file_index, self.stop_index, self.step)] + self.ranges
+        return [
+            index for index in itertools.chain(
+                *[range(start, stop + 1, step)
+                  for start, stop, step in ranges])
+            if index not in self.excluded]
+
+    def names(self):
+        """ provides all file names
+
+        :returns: file names
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        template = self.file_template
+        return [template % index for index in self.indices()]
 
     @staticmethod
     def from_slice(file_template):
         """
         Static factory method to create a filename_generator instance
-        from a sliced user input
+        from a sliced user input, i.e.
+        ``<template>:<start>:<stop>[:<step>][,<start>:<stop>[:<step>]]``
+        with optional ``,!<index>`` or ``,!<start>:<stop>`` exclusions,
+        e.g. ``scan_%05d.cbf:0:1000:2,!16,!40:42``
 
         :param file_template: file template
         :type file_template: :obj:`str`
         :returns: filename generator object
         :rtype: :class:`FilenameGenerator`
         """
+        expressions = file_template.split(",")
+        match = FilenameGenerator.template_pattern.match(expressions[0])
+        if not match:
+            raise ValueError(
+                "FilenameGenerator: %s is not a valid file name slice"
+                % file_template)
+        file_format = match.group(1)
+        start_index = int(match.group(2))
+        stop_index = long(match.group(3))
+        step = int(match.group(4) or 1)
+        ranges = []
+        excluded = []
+        for expr in expressions[1:]:
+            match = FilenameGenerator.range_pattern.match(expr)
+            if match:
+                ranges.append((int(match.group(1)), long(match.group(2)),
+                               int(match.group(3) or 1)))
+                continue
+            match = FilenameGenerator.excluded_pattern.match(expr)
+            if match:
+                first = int(match.group(1))
+                last = int(match.group(2) or first)
+                excluded.extend(range(first, last + 1))
+                continue
+            raise ValueError(
+                "FilenameGenerator: %s in %s is not a valid index range"
+                % (expr, file_template))
+
+        return FilenameGenerator(
+            file_format, start_index, stop_index, step, ranges, excluded)
 
-        (file_format, start_index_str, stop_index_str) = \
-            file_template.rsplit(":", 2)
-        stop_index = None
-        if stop_index_str is not None:
-            stop_index = long(stop_index_str)
-
-        start_index = int(start_index_str)
+    @staticmethod
+    def join_slices(expressions):
+        """
+        Static method joining index ranges and exclusions split
+        from their file templates, e.g. by a file name separator
 
-        return FilenameGenerator(file_format, start_index, stop_index)
+        :param expressions: file name expressions
+        :type expressions: :obj:`list` <:obj:`str`>
+        :returns: file names and file name slices
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        joined = []
+        for expr in expressions:
+            if joined and \
+               FilenameGenerator.template_pattern.match(
+                   joined[-1].split(",")[0]) and \
+               (FilenameGenerator.range_pattern.match(expr) or
+                    expr.startswith("!")):
+                joined[-1] += "," + expr
+            else:
+                joined.append(expr)
+        return joined
@@ -19,13 +19,30 @@
 
 """ Provides abstraction for file writer """
 
+import atexit
 import weakref
 import time
 import pytz
 import datetime
 import threading
+import itertools
+import os
+import struct
+import zlib
 import numpy
 
+from multiprocessing.pool import ThreadPool
+
+try:
+    import bitshuffle
+except ImportError:
+    bitshuffle = None
+
+try:
+    import lz4.block as lz4block
+except ImportError:
+    lz4block = None
+
 
 #: (:mod:`PNIWriter` or :mod:`H5PYWriter`or :mod:`H5CppWriter`)
 #    default writer module
@@ -34,6 +51,13 @@ writer = None
 #: (:class:`threading.Lock`) writer module
 writerlock = threading.Lock()
 
+#: (:obj:`dict` <(:obj:`int`, :obj:`int`), :class:`ThreadPool`>)
+#    compression thread pools with (process id, threads) keys
+_threadpools = {}
+
+#: (:class:`threading.Lock`) compression thread pool lock
+_threadpoollock = threading.Lock()
+
 
 def open_file(filename, readonly=False, **pars):
     """ open the new file
@@ -188,6 +212,203 @@ def data_filter(parent=None):
 deflate_filter = data_filter
 
 
+def chunk_encoder(field, threads):
+    """ create chunk encoder which compresses chunks of the field in
+    a thread pool if the field filter pipeline is supported
+
+    :param field: file tree field
+    :type field: :class:`FTField`
+    :param threads: number of compression threads
+    :type threads: :obj:`int`
+    :returns: chunk encoder or None
+    :rtype: :class:`FTChunkEncoder`
+    """
+    if not threads or threads < 1:
+        return None
+    try:
+        chunk = field.chunk
+        filters = field.filters
+        dtype = numpy.dtype(field.dtype)
+        fillvalue = field.fillvalue
+    except Exception:
+        return None
+    if not chunk or not filters or dtype.hasobject \
+       or dtype.kind not in "biuf" or fillvalue is None \
+       or not all(_supported(fid, options, dtype.itemsize)
+                  for fid, options in filters):
+        return None
+    return FTChunkEncoder(filters, chunk, dtype, threads, fillvalue)
+
+
+def _supported(fid, options, itemsize):
+    """ checks if the chunk encoder of the filter implements
+    exactly the given filter options
+
+    :param fid: filter id
+    :type fid: :obj:`int`
+    :param options: filter options
+    :type options: :obj:`tuple` <:obj:`int`>
+    :param itemsize: data item size
+    :type itemsize: :obj:`int`
+    :returns: if the filter options are supported
+    :rtype: :obj:`bool`
+    """
+    if fid not in CHUNK_ENCODERS:
+        return False
+    options = tuple(options or ())
+    if fid == 1:
+        return len(options) < 2 and \
+            all(0 <= opt <= 9 for opt in options)
+    if fid == 2:
+        return len(options) < 2 and \
+            all(opt == itemsize for opt in options)
+    if fid == 32008:
+        if len(options) > 3:
+            if options[2] not in [0, itemsize]:
+                return False
+            options = options[3:]
+        if len(options) > 2:
+            return False
+        blocksize = options[0] if options else 0
+        compression = options[1] if len(options) > 1 else 0
+        return blocksize % 8 == 0 and compression in [0, 2]
+    if fid == 32004:
+        return len(options) < 2
+    return False
+
+
+def _threadpool(threads):
+    """ provides a compression thread pool of the current process
+
+    :param threads: number of threads
+    :type threads: :obj:`int`
+    :returns: thread pool
+    :rtype: :class:`ThreadPool`
+    """
+    key = (os.getpid(), threads)
+    with _threadpoollock:
+        if key not in _threadpools:
+            _threadpools[key] = ThreadPool(threads)
+        return _threadpools[key]
+
+
+def close_threadpools():
+    """ closes the compression thread pools of the current process
+    """
+    pid = os.getpid()
+    with _threadpoollock:
+        pools = [pool for (ppid, _), pool in _threadpools.items()
+                 if ppid == pid]
+        _threadpools.clear()
+    for pool in pools:
+        pool.close()
+        pool.join()
+
+
+atexit.register(close_threadpools)
+
+
+def _deflate(buf, options, itemsize):
+    """ deflate chunk encoder
+
+    :param buf: chunk buffer
+    :type buf: :obj:`bytes`
+    :param options: filter options, i.e. (level,)
+    :type options: :obj:`tuple` <:obj:`int`>
+    :param itemsize: data item size
+    :type itemsize: :obj:`int`
+    :returns: encoded chunk buffer
+    :rtype: :obj:`bytes`
+    """
+    return zlib.compress(buf, options[0] if options else 6)
+
+
+def _shuffle(buf, options, itemsize):
+    """ byte shuffle chunk encoder
+
+    :param buf: chunk buffer
+    :type buf: :obj:`bytes`
+    :param options: filter options, i.e. (itemsize,)
+    :type options: :obj:`tuple` <:obj:`int`>
+    :param itemsize: data item size
+    :type itemsize: :obj:`int`
+    :returns: encoded chunk buffer
+    :rtype: :obj:`bytes`
+    """
+    size = options[0] if options else itemsize
+    if size < 2 or len(buf) % size:
+        return buf
+    return numpy.frombuffer(buf, dtype="uint8").reshape(
+        -1, size).T.tobytes()
+
+
+def _bitshuffle(buf, options, itemsize):
+    """ bitshuffle chunk encoder with optional lz4 compression,
+    i.e. the framing of the bitshuffle hdf5 filter
+
+    :param buf: chunk buffer
+    :type buf: :obj:`bytes`
+    :param options: filter options, i.e.
+        (major, minor, itemsize, block size, compression) with
+        no compression (0) or lz4 compression (2)
+    :type options: :obj:`tuple` <:obj:`int`>
+    :param itemsize: data item size
+    :type itemsize: :obj:`int`
+    :returns: encoded chunk buffer
+    :rtype: :obj:`bytes`
+    """
+    options = tuple(options)
+    if len(options) > 3:
+        itemsize = options[2] or itemsize
+        options = options[3:]
+    blocksize = options[0] if options else 0
+    compression = options[1] if len(options) > 1 else 0
+    if not blocksize:
+        # default block size of the bitshuffle library
+        blocksize = max((8192 // itemsize) // 8 * 8, 128)
+    data = numpy.frombuffer(buf, dtype="u%s" % itemsize)
+    if compression == 2:
+        return struct.pack(">QI", len(buf), blocksize * itemsize) + \
+            bitshuffle.compress_lz4(data, blocksize).tobytes()
+    return bitshuffle.bitshuffle(data, blocksize).tobytes()
+
+
+def _lz4(buf, options, itemsize):
+    """ lz4 chunk encoder, i.e. the framing of the lz4 hdf5 filter
+
+    :param buf: chunk buffer
+    :type buf: :obj:`bytes`
+    :param options: filter options, i.e. (block size,)
+    :type options: :obj:`tuple` <:obj:`int`>
+    :param itemsize: data item size
+    :type itemsize: :obj:`int`
+    :returns: encoded chunk buffer
+    :rtype: :obj:`bytes`
+    """
+    blocksize = (options[0] if options and options[0] else 1 << 30)
+    blocksize = min(blocksize, len(buf)) or 1
+    blocks = [struct.pack(">QI", len(buf), blocksize)]
+    for start in range(0, len(buf), blocksize):
+        block = buf[start:start + blocksize]
+        cblock = lz4block.compress(block, store_size=False)
+        if len(cblock) >= len(block):
+            cblock = block
+        blocks.append(struct.pack(">I", len(cblock)))
+        blocks.append(cblock)
+    return b"".join(blocks)
+
+
+#: (:obj:`dict` <:obj:`int`, :obj:`instancemethod` >)
+#    chunk encoders of hdf5 filters
+CHUNK_ENCODERS = {1: _deflate, 2: _shuffle}
+
+if bitshuffle is not None:
+    CHUNK_ENCODERS[32008] = _bitshuffle
+
+if lz4block is not None:
+    CHUNK_ENCODERS[32004] = _lz4
+
+
 def external_field(filename, fieldpath, shape,
                    dtype=None, maxshape=None, parent=None):
     """ create external field for VDS
@@ -390,6 +611,9 @@ class FTFile(FTObject):
         #: (:mod:`PNIWriter` or :mod:`H5PYWriter` or :mod:`H5CppWriter`)
         # writer module
         self.writer = None
+        #: (:obj:`dict` <:obj:`str`, :class:`FTObject`>)
+        #    nodes resolved by :meth:`FTGroup.open_path` with their paths
+        self.resolved = {}
 
     def root(self):
         """ root object
@@ -430,6 +654,12 @@ class FTFile(FTObject):
         """
         FTObject._reopen(self)
 
+    def close(self):
+        """ close file
+        """
+        self.resolved = {}
+        FTObject.close(self)
+
     @classmethod
     def currenttime(cls):
         """ returns current time string
@@ -452,7 +682,7 @@ class FTFile(FTObject):
                 nname = attrs["default"].read()
                 if isinstance(nname, numpy.ndarray) and len(nname):
                     nname = nname[0]
-                if nname in node.names():
+                if node.exists(nname):
                     node = node.open(nname)
                     continue
             searching = False
@@ -462,18 +692,18 @@ class FTFile(FTObject):
                 nname = attrs["signal"].read()
                 if isinstance(nname, numpy.ndarray) and len(nname):
                     nname = nname[0]
-                if nname in node.names():
+                if node.exists(nname):
                     node = node.open(nname)
         if not hasattr(node, "names"):
             return node
 
         for cnm in ["NXentry", "NXdata", "NXmonitor", "NXlog"]:
-            names = node.names()
-            if cnm[2:] in names:
+            if node.exists(cnm[2:]):
                 snames = [cnm[2:]]
             else:
                 snames = []
-            snames.extend(sorted([nm for nm in names if nm != cnm[2:]]))
+            snames.extend(
+                sorted([nm for nm in node.names() if nm != cnm[2:]]))
             for nn in snames:
                 nd = node.open(nn)
                 if not hasattr(nd, "attributes"):
@@ -492,11 +722,11 @@ class FTFile(FTObject):
                 nname = attrs["signal"].read()
                 if isinstance(nname, numpy.ndarray) and len(nname):
                     nname = nname[0]
-                if nname in node.names():
+                if node.exists(nname):
                     node = node.open(nname)
         if not hasattr(node, "names"):
             return node
-        while hasattr(node, "names") and "data" in node.names():
+        while hasattr(node, "names") and node.exists("data"):
             node = node.open("data")
         if hasattr(node, "names"):
             for nn in sorted(node.names()):
@@ -569,7 +799,7 @@ class FTGroup(FTObject):
         """
 
     def create_field(self, name, type_code,
-                     shape=None, chunk=None, dfilter=None):
+                     shape=None, chunk=None, dfilter=None, cache=None):
         """ open a file tree element
 
         :param n: group name
@@ -582,6 +812,8 @@ class FTGroup(FTObject):
         :type chunk: :obj:`list` < :obj:`int` >
         :param dfilter: filter deflater
         :type dfilter: :class:`FTDeflate`
+        :param cache: raw data chunk cache size in bytes and number of slots
+        :type cache: [:obj:`int`, :obj:`int`]
         :returns: file tree field
         :rtype: :class:`FTField`
         """
@@ -611,6 +843,16 @@ class FTGroup(FTObject):
         :rtype: :obj:`bool`
         """
 
+    def remove(self, name):
+        """ removes the child link
+
+        :param name: child name
+        :type name: :obj:`str`
+        """
+        resolved = self._resolved()
+        if resolved is not None:
+            resolved.clear()
+
     def names(self):
         """ read the child names
 
@@ -618,6 +860,95 @@ class FTGroup(FTObject):
         :rtype: :obj:`list` <`str`>
         """
 
+    def _resolved(self):
+        """ provides nodes resolved by open_path in the file of the group
+
+        :returns: resolved nodes with their paths
+        :rtype: :obj:`dict` <:obj:`str`, :class:`FTObject`>
+        """
+        node = self
+        while node._tparent is not None:
+            node = node._tparent
+        return getattr(node, "resolved", None)
+
+    def open_path(self, path, create=False, created=None):
+        """ opens the element of the nexus path, e.g.
+        '/entry:NXentry/instrument/detector:NXdetector/data'.
+        Groups are looked up with :meth:`exists` and resolved nodes
+        are memoised in the file object
+
+        :param path: nexus path relative to the group
+        :type path: :obj:`str`
+        :param create: if create missing groups with the given NX_class
+                       or with the 'NX' prefixed group name
+        :type create: :obj:`bool`
+        :param created: list to append (parent, name, group)
+                        of created groups
+        :type created: :obj:`list`
+        :returns: file tree object
+        :rtype: :class:`FTObject`
+        """
+        resolved = self._resolved()
+        base = getattr(self, "path", None)
+        if base is None:
+            resolved = None
+        else:
+            base = "/".join(nd.split(":")[0] for nd in base.split("/"))
+        node = self
+        for nd in path.split("/"):
+            if not nd:
+                continue
+            name, _, nxclass = nd.partition(":")
+            if resolved is not None:
+                base = "%s/%s" % (base.rstrip("/"), name)
+                if base in resolved:
+                    if resolved[base].is_valid:
+                        node = resolved[base]
+                        continue
+                    resolved.pop(base)
+            if not hasattr(node, "exists"):
+                raise Exception(
+                    "Error: path %s cannot be open in %s" % (path, name))
+            if node.exists(name):
+                child = node.open(name)
+            elif create:
+                child = node.create_group(name, nxclass or "NX" + name)
+                if created is not None:
+                    created.append((node, name, child))
+            else:
+                raise Exception(
+                    "Error: path %s cannot be open in %s" % (path, name))
+            node = child
+            if resolved is not None:
+                resolved[base] = node
+        return node
+
+    def find_groups(self, nxclass):
+        """ finds subgroups of the given NX_class in one pass
+        reading only NX_class attributes of groups
+
+        :param nxclass: NX_class of groups
+        :type nxclass: :obj:`str`
+        :returns: paths of groups relative to the group
+        :rtype: :obj:`list` <`str`>
+        """
+        paths = []
+        for name in self.names():
+            child = self.open(name)
+            if not hasattr(child, "names"):
+                continue
+            attrs = child.attributes
+            if "NX_class" in attrs.names():
+                gtype = first(attrs["NX_class"].read())
+                if isinstance(gtype, bytes):
+                    gtype = gtype.decode()
+                if gtype == nxclass:
+                    paths.append(name)
+            paths.extend(
+                "%s/%s" % (name, path)
+                for path in child.find_groups(nxclass))
+        return paths
+
     def reopen(self):
         """ reopen attribute
         """
@@ -684,6 +1015,9 @@ class FTField(FTObject):
         :type tparent: :obj:`FTObject`
         """
         FTObject.__init__(self, h5object, tparent)
+        #: (:class:`FTChunkEncoder`) encoder compressing written chunks
+        #    in a thread pool
+        self.encoder = None
 
     @property
     def attributes(self):
@@ -765,6 +1099,51 @@ class FTField(FTObject):
         :rtype: :obj:`int`
         """
 
+    @property
+    def chunk(self):
+        """ field chunk
+
+        :returns: field chunk or None if the field is not chunked
+        :rtype: :obj:`tuple` < :obj:`int` >
+        """
+
+    @property
+    def filters(self):
+        """ field filter pipeline
+
+        :returns: list of (filter id, filter options) or None
+                  if the pipeline cannot be read
+        :rtype: :obj:`list` < (:obj:`int`, :obj:`tuple` <:obj:`int`>) >
+        """
+
+    @property
+    def fillvalue(self):
+        """ field fill value
+
+        :returns: fill value or None if it cannot be read
+        :rtype: :obj:`any`
+        """
+
+    def read_chunk(self, offset):
+        """ reads a raw chunk without applying filters
+
+        :param offset: chunk offset
+        :type offset: :obj:`tuple` < :obj:`int` >
+        :returns: (filter mask, chunk bytes)
+        :rtype: (:obj:`int`, :obj:`bytes`)
+        """
+
+    def write_chunk(self, offset, data, filtermask=0):
+        """ writes a raw chunk without applying filters
+
+        :param offset: chunk offset
+        :type offset: :obj:`tuple` < :obj:`int` >
+        :param data: chunk bytes
+        :type data: :obj:`bytes`
+        :param filtermask: filter mask
+        :type filtermask: :obj:`int`
+        """
+
     def reopen(self):
         """ reopen attribute
         """
@@ -829,6 +1208,9 @@ class FTDataFilter(FTObject):
         self._filterid = 1
         #: (:obj:`tuple` <:obj:`int`>) compression options
         self._options = tuple()
+        #: (:obj:`int`) number of threads compressing chunks
+        #    outside of the hdf5 filter pipeline, 0 to disable
+        self._threads = 0
 
     @property
     def options(self):
@@ -902,6 +1284,24 @@ class FTDataFilter(FTObject):
         """
         self._shuffle = value
 
+    @property
+    def threads(self):
+        """ getter for number of compression threads
+
+        :returns: number of compression threads
+        :rtype: :obj:`int`
+        """
+        return self._threads
+
+    @threads.setter
+    def threads(self, value):
+        """ setter for number of compression threads
+
+        :param value: number of compression threads
+        :type value: :obj:`int`
+        """
+        self._threads = value
+
     def reopen(self):
         """ reopen attribute
         """
@@ -912,6 +1312,150 @@ class FTDeflate(FTDataFilter):
     pass
 
 
+class FTChunkEncoder(object):
+
+    """ chunk encoder which compresses chunks in a thread pool
+    with the codecs of the field filter pipeline and writes them
+    directly, i.e. the on-disk format is not changed
+    """
+
+    def __init__(self, filters, chunk, dtype, threads, fillvalue=0):
+        """ constructor
+
+        :param filters: field filter pipeline
+        :type filters: :obj:`list` < (:obj:`int`, :obj:`tuple` <:obj:`int`>) >
+        :param chunk: field chunk shape
+        :type chunk: :obj:`list` < :obj:`int` >
+        :param dtype: field data type
+        :type dtype: :class:`numpy.dtype`
+        :param threads: number of compression threads
+        :type threads: :obj:`int`
+        :param fillvalue: field fill value
+        :type fillvalue: :obj:`any`
+        """
+        #: (:obj:`list` < (:obj:`int`, :obj:`tuple` <:obj:`int`>) >) filters
+        self.filters = list(filters)
+        #: (:obj:`list` < :obj:`int` >) chunk shape
+        self.chunk = list(chunk)
+        #: (:class:`numpy.dtype`) field data type
+        self.dtype = numpy.dtype(dtype)
+        #: (:obj:`int`) number of compression threads
+        self.threads = threads
+        #: (:obj:`any`) fill value of chunk edges
+        self.fillvalue = fillvalue
+
+    def encode(self, data):
+        """ encodes the chunk with the filter pipeline
+
+        :param data: chunk data
+        :type data: :class:`numpy.ndarray`
+        :returns: encoded chunk
+        :rtype: :obj:`bytes`
+        """
+        buf = numpy.ascontiguousarray(data, dtype=self.dtype).tobytes()
+        for fid, options in self.filters:
+            buf = CHUNK_ENCODERS[fid](buf, options, self.dtype.itemsize)
+        return buf
+
+    def _framerange(self, key, nframes):
+        """ provides the frame range of the selection
+        if it covers whole frames
+
+        :param key: selection
+        :type key: :obj:`tuple`
+        :param nframes: number of frames in the field
+        :type nframes: :obj:`int`
+        :returns: first frame, frame after the last one
+            and if the frame axis is squeezed or None
+        :rtype: (:obj:`int`, :obj:`int`, :obj:`bool`)
+        """
+        if not isinstance(key, tuple):
+            key = (key, )
+        for ky in key[1:]:
+            if ky is not Ellipsis and not (
+                    isinstance(ky, slice) and ky == slice(None)):
+                return None
+        first = key[0] if key else Ellipsis
+        if first is Ellipsis:
+            return 0, nframes, False
+        if isinstance(first, (int, numpy.integer)):
+            first = int(first)
+            if first < 0:
+                first += nframes
+            if first < 0 or first >= nframes:
+                return None
+            return first, first + 1, True
+        if isinstance(first, slice) and first.step in [None, 1]:
+            start, stop, _ = first.indices(nframes)
+            if start < stop:
+                return start, stop, False
+        return None
+
+    def write(self, field, key, value):
+        """ writes the value compressing its chunks in the thread pool.
+        The selection has to start at a chunk boundary of the frame axis
+        and cover whole frames. A partially filled last chunk is only
+        written at the end of the field
+
+        :param field: file tree field
+        :type field: :class:`FTField`
+        :param key: selection
+        :type key: :obj:`tuple`
+        :param value: data to write
+        :type value: :obj:`any`
+        :returns: if the value was written
+        :rtype: :obj:`bool`
+        """
+        shape = list(field.shape)
+        if len(shape) != len(self.chunk):
+            return False
+        frange = self._framerange(key, shape[0])
+        if frange is None:
+            return False
+        start, stop, squeezed = frange
+        depth = self.chunk[0]
+        if start % depth or ((stop - start) % depth and stop != shape[0]):
+            return False
+        try:
+            data = numpy.asarray(value, dtype=self.dtype)
+        except Exception:
+            return False
+        if squeezed:
+            data = data.reshape([1] + list(data.shape))
+        if list(data.shape) != [stop - start] + shape[1:]:
+            return False
+        offsets = list(itertools.product(
+            range(start, stop, depth),
+            *[range(0, sh, ch) for sh, ch in zip(shape[1:], self.chunk[1:])]))
+        chunks = _threadpool(self.threads).map(
+            self._encodeat, [(data, start, offset) for offset in offsets])
+        for offset, chunk in zip(offsets, chunks):
+            field.write_chunk(offset, chunk)
+        return True
+
+    def _encodeat(self, pars):
+        """ encodes the chunk at the given offset
+        padding the chunk edges with the fill value
+
+        :param pars: data, first frame of the data and chunk offset
+        :type pars: (:class:`numpy.ndarray`, :obj:`int`,
+                     :obj:`tuple` <:obj:`int`>)
+        :returns: encoded chunk
+        :rtype: :obj:`bytes`
+        """
+        data, start, offset = pars
+        sel = tuple(
+            slice(of - (start if dm == 0 else 0),
+                  of - (start if dm == 0 else 0) + ch)
+            for dm, (of, ch) in enumerate(zip(offset, self.chunk)))
+        block = data[sel]
+        if list(block.shape) != self.chunk:
+            padded = numpy.full(self.chunk, self.fillvalue, dtype=self.dtype)
+            padded[tuple(slice(0, sh) for sh in block.shape)] = block
+            block = padded
+        return self.encode(block)
+
+
 class FTAttributeManager(FTObject):
 
     """ file tree attribute
@@ -654,7 +654,7 @@ class H5CppGroup(filewriter.FTGroup):
             layout._h5object, dcpl=dcpl), self)
 
     def create_field(self, name, type_code,
-                     shape=None, chunk=None, dfilter=None):
+                     shape=None, chunk=None, dfilter=None, cache=None):
         """ open a file tree element
 
         :param n: group name
@@ -667,6 +667,8 @@ class H5CppGroup(filewriter.FTGroup):
         :type chunk: :obj:`list` < :obj:`int` >
         :param dfilter: filter deflater
         :type dfilter: :class:`H5CppDataFilter`
+        :param cache: raw data chunk cache size in bytes and number of slots
+        :type cache: [:obj:`int`, :obj:`int`]
         :returns: file tree field
         :rtype: :class:`H5CppField`
         """
@@ -697,10 +699,23 @@ class H5CppGroup(filewriter.FTGroup):
                 chunk = [(dm if dm != 0 else 1) for dm in shape]
             dcpl.layout = h5cpp.property.DatasetLayout.CHUNKED
             dcpl.chunk = tuple(chunk)
-            return H5CppField(h5cpp.node.Dataset(
-                self._h5object, h5cpp.Path(name),
-                pTh[_tostr(type_code)], dataspace,
-                dcpl=dcpl), self)
+            if cache and hasattr(h5cpp.property, "ChunkCacheParameters"):
+                dapl = h5cpp.property.DatasetAccessList()
+                dapl.chunk_cache_parameters = \
+                    h5cpp.property.ChunkCacheParameters(
+                        int(cache[1]), int(cache[0]))
+                f = H5CppField(h5cpp.node.Dataset(
+                    self._h5object, h5cpp.Path(name),
+                    pTh[_tostr(type_code)], dataspace,
+                    dcpl=dcpl, dapl=dapl), self)
+            else:
+                f = H5CppField(h5cpp.node.Dataset(
+                    self._h5object, h5cpp.Path(name),
+                    pTh[_tostr(type_code)], dataspace,
+                    dcpl=dcpl), self)
+            if dfilter and dfilter.threads:
+                f.encoder = filewriter.chunk_encoder(f, dfilter.threads)
+            return f
 
     @property
     def size(self):
@@ -751,8 +766,23 @@ class H5CppGroup(filewriter.FTGroup):
         :returns: existing flag
         :rtype: :obj:`bool`
         """
-        return name in [
-            lk.path.name for lk in self._h5object.links]
+        try:
+            # link query without listing the group
+            return self._h5object.links.exists(_tostr(name))
+        except AttributeError:
+            return name in [
+                lk.path.name for lk in self._h5object.links]
+        except Exception:
+            return False
+
+    def remove(self, name):
+        """ removes the child link
+
+        :param name: child name
+        :type name: :obj:`str`
+        """
+        h5cpp.node.remove(base=self._h5object, path=h5cpp.Path(name))
+        filewriter.FTGroup.remove(self, name)
 
     def names(self):
         """ read the child names
@@ -763,6 +793,31 @@ class H5CppGroup(filewriter.FTGroup):
         return [
             lk.path.name for lk in self._h5object.links]
 
+    def find_groups(self, nxclass):
+        """ finds subgroups of the given NX_class in one pass
+        reading only NX_class attributes of groups
+
+        :param nxclass: NX_class of groups
+        :type nxclass: :obj:`str`
+        :returns: paths of groups relative to the group
+        :rtype: :obj:`list` <`str`>
+        """
+        nodes = getattr(self._h5object.nodes, "recursive", None)
+        if nodes is None:
+            return filewriter.FTGroup.find_groups(self, nxclass)
+        base = str(self._h5object.link.path).rstrip("/")
+        paths = []
+        for node in nodes:
+            if node.type != h5cpp.node.Type.GROUP or \
+               not node.attributes.exists("NX_class"):
+                continue
+            gtype = filewriter.first(node.attributes["NX_class"].read())
+            if isinstance(gtype, bytes):
+                gtype = gtype.decode()
+            if gtype == nxclass:
+                paths.append(str(node.link.path)[len(base) + 1:])
+        return paths
+
     class H5CppGroupIter(object):
 
         def __init__(self, group):
@@ -930,6 +985,8 @@ class H5CppField(filewriter.FTField):
         :param o: h5 object
         :type o: :obj:`any`
         """
+        if self.encoder is not None and self.encoder.write(self, t, o):
+            return
         if self.shape == (1,) and t == 0:
             return self._h5object.write(o)
         selection = _slice2selection(t, self.shape)
@@ -1103,6 +1160,77 @@ class H5CppField(filewriter.FTField):
         """
         return self._h5object.dataspace.size
 
+    @property
+    def chunk(self):
+        """ field chunk
+
+        :returns: field chunk or None if the field is not chunked
+        :rtype: :obj:`tuple` < :obj:`int` >
+        """
+        try:
+            dcpl = self._h5object.creation_list
+            if dcpl.layout == h5cpp.property.DatasetLayout.CHUNKED:
+                return tuple(dcpl.chunk)
+        except Exception:
+            pass
+        return None
+
+    @property
+    def filters(self):
+        """ field filter pipeline
+
+        :returns: list of (filter id, filter options) or None
+                  if the pipeline cannot be read
+        :rtype: :obj:`list` < (:obj:`int`, :obj:`tuple` <:obj:`int`>) >
+        """
+        try:
+            efilters = h5cpp.filter.ExternalFilters()
+            efilters.fill(self._h5object.creation_list)
+            return [(flt.id, tuple(flt.cd_values)) for flt in efilters]
+        except Exception:
+            return None
+
+    @property
+    def fillvalue(self):
+        """ field fill value
+
+        :returns: fill value or None if it cannot be read
+        :rtype: :obj:`any`
+        """
+        try:
+            return self._h5object.creation_list.fill_value(
+                self._h5object.datatype)
+        except Exception:
+            return None
+
+    def read_chunk(self, offset):
+        """ reads a raw chunk without applying filters
+
+        :param offset: chunk offset
+        :type offset: :obj:`tuple` < :obj:`int` >
+        :returns: (filter mask, chunk bytes)
+        :rtype: (:obj:`int`, :obj:`bytes`)
+        """
+        offset = list(offset)
+        buf = np.zeros(
+            shape=[self._h5object.chunk_storage_size(offset)],
+            dtype="uint8")
+        filtermask = self._h5object.read_chunk(buf, offset)
+        return filtermask, buf.tobytes()
+
+    def write_chunk(self, offset, data, filtermask=0):
+        """ writes a raw chunk without applying filters
+
+        :param offset: chunk offset
+        :type offset: :obj:`tuple` < :obj:`int` >
+        :param data: chunk bytes
+        :type data: :obj:`bytes`
+        :param filtermask: filter mask
+        :type filtermask: :obj:`int`
+        """
+        self._h5object.write_chunk(
+            np.frombuffer(data, dtype="uint8"), list(offset), filtermask)
+
 
 class H5CppLink(filewriter.FTLink):
 
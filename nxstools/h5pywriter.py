@@ -485,7 +485,7 @@ class H5PYGroup(filewriter.FTGroup):
             self)
 
     def create_field(self, name, type_code,
-                     shape=None, chunk=None, dfilter=None):
+                     shape=None, chunk=None, dfilter=None, cache=None):
         """ creates a field tree element
 
         :param name: group name
@@ -498,6 +498,8 @@ class H5PYGroup(filewriter.FTGroup):
         :type chunk: :obj:`list` < :obj:`int` >
         :param dfilter: filter deflater
         :type dfilter: :class:`H5PYDataFilter`
+        :param cache: raw data chunk cache size in bytes and number of slots
+        :type cache: [:obj:`int`, :obj:`int`]
         :returns: file tree field
         :rtype: :class:`H5PYField`
         """
@@ -512,6 +514,11 @@ class H5PYGroup(filewriter.FTGroup):
 
         shape = shape or [1]
         mshape = [None for _ in shape] or (None,)
+        # chunk cache of the dataset access property list
+        dapl = {}
+        if cache:
+            dapl = {"rdcc_nbytes": int(cache[0]),
+                    "rdcc_nslots": int(cache[1])}
         if dfilter:
             if dfilter.filterid == 1:
                 f = H5PYField(
@@ -524,7 +531,8 @@ class H5PYGroup(filewriter.FTGroup):
                             dfilter.options[0]
                             if dfilter.options
                             else dfilter.rate),
-                        shuffle=dfilter.shuffle, maxshape=mshape
+                        shuffle=dfilter.shuffle, maxshape=mshape,
+                        **dapl
                     ),
                     self)
             else:
@@ -535,7 +543,8 @@ class H5PYGroup(filewriter.FTGroup):
                                 if chunk is not None else None),
                         compression=dfilter.filterid,
                         compression_opts=tuple(dfilter.options),
-                        shuffle=dfilter.shuffle, maxshape=mshape
+                        shuffle=dfilter.shuffle, maxshape=mshape,
+                        **dapl
                     ),
                     self)
         else:
@@ -544,9 +553,11 @@ class H5PYGroup(filewriter.FTGroup):
                     name, shape, type_code,
                     chunks=(tuple(chunk)
                             if chunk is not None else None),
-                    maxshape=mshape
+                    maxshape=mshape, **dapl
                 ),
                 self)
+        if dfilter and dfilter.threads:
+            f.encoder = filewriter.chunk_encoder(f, dfilter.threads)
         return f
 
     @property
@@ -575,7 +586,23 @@ class H5PYGroup(filewriter.FTGroup):
         :returns: existing flag
         :rtype: :obj:`bool`
         """
-        return name in self._h5object.keys()
+        if isinstance(name, unicode):
+            name = name.encode("utf-8")
+        try:
+            # link query without listing the group,
+            # true also for dangling links
+            return self._h5object.id.links.exists(name)
+        except Exception:
+            return False
+
+    def remove(self, name):
+        """ removes the child link
+
+        :param name: child name
+        :type name: :obj:`str`
+        """
+        del self._h5object[name]
+        filewriter.FTGroup.remove(self, name)
 
     def names(self):
         """ read the child names
@@ -585,6 +612,41 @@ class H5PYGroup(filewriter.FTGroup):
         """
         return list(self._h5object.keys())
 
+    def find_groups(self, nxclass):
+        """ finds subgroups of the given NX_class in one pass
+        reading only NX_class attributes of groups. Fields and
+        soft or external links are not opened and groups linked
+        more than once are visited once
+
+        :param nxclass: NX_class of groups
+        :type nxclass: :obj:`str`
+        :returns: paths of groups relative to the group
+        :rtype: :obj:`list` <`str`>
+        """
+        paths = []
+        visited = set([self._h5object.id])
+
+        def _find(group, prefix):
+            for name in group:
+                if not isinstance(group.get(name, getlink=True),
+                                  h5py.HardLink) or \
+                   group.get(name, getclass=True) is not h5py.Group:
+                    continue
+                child = group[name]
+                if child.id in visited:
+                    continue
+                visited.add(child.id)
+                path = prefix + name
+                gtype = filewriter.first(child.attrs.get("NX_class"))
+                if isinstance(gtype, bytes):
+                    gtype = gtype.decode()
+                if gtype == nxclass:
+                    paths.append(path)
+                _find(child, path + "/")
+
+        _find(self._h5object, "")
+        return paths
+
     @property
     def is_valid(self):
         """ check if group is valid
@@ -702,6 +764,8 @@ class H5PYField(filewriter.FTField):
         :param o: h5 object
         :type o: :obj:`any`
         """
+        if self.encoder is not None and self.encoder.write(self, t, o):
+            return
         if isinstance(o, np.ndarray):
             hsh = self._h5object.shape
             if t is Ellipsis:
@@ -779,6 +843,71 @@ class H5PYField(filewriter.FTField):
         """
         return self._h5object.size
 
+    @property
+    def chunk(self):
+        """ field chunk
+
+        :returns: field chunk or None if the field is not chunked
+        :rtype: :obj:`tuple` < :obj:`int` >
+        """
+        return self._h5object.chunks
+
+    @property
+    def filters(self):
+        """ field filter pipeline
+
+        :returns: list of (filter id, filter options) or None
+                  if the pipeline cannot be read
+        :rtype: :obj:`list` < (:obj:`int`, :obj:`tuple` <:obj:`int`>) >
+        """
+        try:
+            dcpl = self._h5object.id.get_create_plist()
+            filters = []
+            for i in range(dcpl.get_nfilters()):
+                flt = dcpl.get_filter(i)
+                filters.append((flt[0], tuple(flt[2])))
+            return filters
+        except Exception:
+            return None
+
+    @property
+    def fillvalue(self):
+        """ field fill value
+
+        :returns: fill value or None if it cannot be read
+        :rtype: :obj:`any`
+        """
+        try:
+            return self._h5object.fillvalue
+        except Exception:
+            return None
+
+    def read_chunk(self, offset):
+        """ reads a raw chunk without applying filters
+
+        :param offset: chunk offset
+        :type offset: :obj:`tuple` < :obj:`int` >
+        :returns: (filter mask, chunk bytes)
+        :rtype: (:obj:`int`, :obj:`bytes`)
+        """
+        chunk = self._h5object.id.read_direct_chunk(tuple(offset))
+        if not isinstance(chunk, tuple):
+            chunk = (0, chunk)
+        return chunk
+
+    def write_chunk(self, offset, data, filtermask=0):
+        """ writes a raw chunk without applying filters
+
+        :param offset: chunk offset
+        :type offset: :obj:`tuple` < :obj:`int` >
+        :param data: chunk bytes
+        :type data: :obj:`bytes`
+        :param filtermask: filter mask
+        :type filtermask: :obj:`int`
+        """
+        self._h5object.id.write_direct_chunk(
+            tuple(offset), data, filtermask)
+
 
 class H5PYLink(filewriter.FTLink):
 
@@ -30,9 +30,32 @@ import signal
 import argparse
 import numpy
 import json
+import time
+import collections
+import itertools
+import multiprocessing
+import threading
+
+from multiprocessing.pool import ThreadPool
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 from .filenamegenerator import FilenameGenerator
 from .nxsargparser import (Runner, NXSArgParser, ErrorException)
+from .nxsparser import TableTools
 from . import filewriter
 
 
@@ -43,6 +66,12 @@ else:
     bytes = str
 
 
+#: (:obj:`int`) linux ioctl request which clones a file
+FICLONE = 0x40049409
+
+#: (:obj:`str`) name template of fields with ledgers of appended files
+LEDGER = "%s_nxscollect_ledger"
+
 WRITERS = {}
 try:
     from . import h5pywriter
@@ -92,13 +121,599 @@ def getcompression(compression):
         return
 
 
+def getchunk(chunk):
+    """ converts chunk string to a chunking policy
+
+    :param chunk: chunk string, i.e. 'auto' or 'frames,y,x'
+    :type chunk: :obj:`str`
+    :returns: 'auto' or list with chunk sizes
+    :rtype: :obj:`str` or :obj:`list` < :obj:`int` > or `None`
+    """
+    if chunk:
+        if isinstance(chunk, (list, tuple)):
+            return [int(ch) for ch in chunk]
+        if chunk.strip().lower() == "auto":
+            return "auto"
+        try:
+            chunks = [int(ch) for ch in chunk.strip(" []()").split(",")]
+        except Exception:
+            raise Exception(
+                "Error: argument --chunk: "
+                "invalid format: '%s'\n" % chunk)
+        if not chunks or min(chunks) < 1:
+            raise Exception(
+                "Error: argument --chunk: "
+                "invalid format: '%s'\n" % chunk)
+        return chunks
+
+
+def _nextprime(number):
+    """ provides the smallest prime number not less than the given one,
+    i.e. a recommended number of hash table slots
+
+    :param number: lower limit
+    :type number: :obj:`int`
+    :returns: prime number
+    :rtype: :obj:`int`
+    """
+    number = max(int(number), 2)
+    while any(number % dv == 0
+              for dv in range(2, int(number ** 0.5) + 1)):
+        number += 1
+    return number
+
+
+def _readahead(filename):
+    """ advises the operating system to read the file in advance
+
+    :param filename: file name
+    :type filename: :obj:`str`
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            fd = os.open(filename, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def _initworker():
+    """ initializes a decoding worker process, i.e. leaves handling of
+    the interrupt signals to the main process
+    """
+    for sname in ('SIGINT', 'SIGHUP'):
+        signal.signal(signal.__dict__[sname], signal.SIG_IGN)
+    for sname in ('SIGALRM', 'SIGTERM'):
+        signal.signal(signal.__dict__[sname], signal.SIG_DFL)
+
+
+#: (:class:`multiprocessing.Event`) event of a job worker process
+#:  set when collecting of master files is interrupted
+_stopped = None
+
+
+def _initjob(stopped):
+    """ initializes a job worker process collecting master files
+
+    :param stopped: event set when collecting is interrupted
+    :type stopped: :class:`multiprocessing.Event`
+    """
+    global _stopped
+    _stopped = stopped
+
+
+def _collectfile(job):
+    """ collects images of one master file in a job worker process
+
+    :param job: (nexus file name, collector parameters,
+                 collect arguments)
+    :type job: (:obj:`str`, :obj:`dict` <:obj:`str`, `any`>, :obj:`tuple`)
+    :returns: (nexus file name, collector output, collecting summary
+              or None if the file was skipped)
+    :rtype: (:obj:`str`, :obj:`str`, :obj:`dict` <:obj:`str`, `any`>)
+    """
+    nexusfilename, pars, args = job
+    if _stopped is not None and _stopped.is_set():
+        return nexusfilename, "", None
+    stdout = sys.stdout
+    sys.stdout = output = StringIO()
+    try:
+        collector = Collector(nexusfilename, **pars)
+        collector.collect(*args)
+        summary = collector.summary()
+    except Exception as e:
+        summary = {"frames": 0, "bytes": 0, "time": 0, "error": str(e)}
+    finally:
+        sys.stdout = stdout
+    return nexusfilename, output.getvalue(), summary
+
+
+def _readimage(filename):
+    """ reads image from file with fabio
+
+    :param filename: image file name
+    :type filename: :obj:`str`
+    :returns: (image data, image data type, image shape)
+    :rtype: (:class:`numpy.ndarray`, :obj:`str`, :obj:`list` <:obj:`int`>)
+    """
+    image = fabio.open(filename)
+    if image:
+        return image.data[...], image.data.dtype.__str__(), image.data.shape
+    else:
+        raise Exception("Cannot open a file %s" % filename)
+
+
+def _reflink(source, target):
+    """ creates a copy-on-write clone of the source file
+    if the file system supports it
+
+    :param source: source file name
+    :type source: :obj:`str`
+    :param target: target file name
+    :type target: :obj:`str`
+    :returns: if the clone was created
+    :rtype: :obj:`bool`
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as src:
+            with open(target, "wb") as tgt:
+                fcntl.ioctl(tgt.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, target)
+        return True
+    except (IOError, OSError):
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+
+
+class StageTimer(object):
+
+    """ Context manager measuring time of a collecting stage
+    """
+
+    def __init__(self, profiler=None, stage=None):
+        """ constructor
+
+        :param profiler: profiler or None if profiling is disabled
+        :type profiler: :class:`Profiler`
+        :param stage: stage name
+        :type stage: :obj:`str`
+        """
+        #: (:class:`Profiler`) profiler
+        self.profiler = profiler
+        #: (:obj:`str`) stage name
+        self.stage = stage
+        #: (:obj:`int`) number of bytes processed by the stage
+        self.nbytes = 0
+        self.__start = None
+
+    def __enter__(self):
+        if self.profiler is not None:
+            self.__start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        if self.profiler is not None:
+            self.profiler.add(
+                self.stage, time.time() - self.__start, self.nbytes)
+        return False
+
+
+class Profiler(object):
+
+    """ Accumulates times, calls and processed bytes of collecting stages
+    """
+
+    def __init__(self):
+        """ constructor
+        """
+        self.__stages = collections.OrderedDict()
+        self.__start = time.time()
+
+    def stage(self, stage):
+        """ provides a context manager measuring the stage
+
+        :param stage: stage name
+        :type stage: :obj:`str`
+        :returns: stage timer
+        :rtype: :class:`StageTimer`
+        """
+        return StageTimer(self, stage)
+
+    def add(self, stage, seconds, nbytes=0):
+        """ adds a measurement of the stage
+
+        :param stage: stage name
+        :type stage: :obj:`str`
+        :param seconds: stage time in seconds
+        :type seconds: :obj:`float`
+        :param nbytes: number of processed bytes
+        :type nbytes: :obj:`int`
+        """
+        calls, total, tbytes = self.__stages.get(stage, (0, 0., 0))
+        self.__stages[stage] = (calls + 1, total + seconds, tbytes + nbytes)
+
+    def todict(self):
+        """ provides measured stages
+
+        :returns: dictionary with the total time in seconds and calls,
+                  seconds and bytes of stages
+        :rtype: :obj:`dict` <:obj:`str`, `any`>
+        """
+        return {
+            "time": time.time() - self.__start,
+            "stages": collections.OrderedDict(
+                (stage, {"calls": calls, "seconds": seconds,
+                         "bytes": nbytes})
+                for stage, (calls, seconds, nbytes)
+                in self.__stages.items())
+        }
+
+    def table(self, title=None):
+        """ provides summary table of measured stages
+
+        :param title: table title
+        :type title: :obj:`str`
+        :returns: table rows
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        total = time.time() - self.__start
+        description = []
+        for stage, (calls, seconds, nbytes) in self.__stages.items():
+            description.append({
+                "stage": stage,
+                "calls": calls,
+                "seconds": "%.3f" % seconds,
+                "share": "%.1f%%" % (100. * seconds / total if total else 0),
+                "MB": "%.2f" % (nbytes / 1e6) if nbytes else "",
+                "MB/s": ("%.1f" % (nbytes / 1e6 / seconds)
+                         if nbytes and seconds else ""),
+            })
+        description.append(None)
+        description.append({"stage": "total", "seconds": "%.3f" % total})
+        ttools = TableTools(description)
+        ttools.title = title
+        ttools.headers = ["stage", "calls", "seconds", "share", "MB", "MB/s"]
+        return ttools.generateList()
+
+
+class FileWatcher(object):
+
+    """ Waits for image files written by a running detector.
+    Directories are watched with inotify if pyinotify is installed,
+    otherwise they are polled
+    """
+
+    def __init__(self, interval=0.5):
+        """ constructor
+
+        :param interval: maximal time in seconds between two checks
+        :type interval: :obj:`float`
+        """
+        #: (:obj:`float`) maximal time in seconds between two checks
+        self.interval = max(interval or 0, 0.01)
+        self.__sizes = {}
+        self.__watched = set()
+        self.__manager = None
+        self.__notifier = None
+        if pyinotify is not None:
+            try:
+                self.__manager = pyinotify.WatchManager()
+                # events only wake up wait(), the default processing
+                # of pyinotify would print them
+                self.__notifier = pyinotify.Notifier(
+                    self.__manager, default_proc_fun=pyinotify.ProcessEvent(),
+                    timeout=int(self.interval * 1000))
+            except Exception:
+                self.__manager = None
+                self.__notifier = None
+
+    def ready(self, filename):
+        """ checks if the file exists and it has not been modified
+        within the check interval or its size has not changed
+        since the previous check
+
+        :param filename: image file name
+        :type filename: :obj:`str`
+        :returns: if the file is completely written
+        :rtype: :obj:`bool`
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return False
+        if time.time() - stat.st_mtime >= self.interval:
+            self.__sizes.pop(filename, None)
+            return True
+        size = stat.st_size
+        last = self.__sizes.get(filename)
+        self.__sizes[filename] = size
+        if last == size:
+            self.__sizes.pop(filename)
+            return True
+        return False
+
+    def wait(self, filenames):
+        """ waits for changes in directories of the given files
+        but not longer than the check interval
+
+        :param filenames: image file names
+        :type filenames: :obj:`list` <:obj:`str`>
+        """
+        if self.__notifier is None:
+            time.sleep(self.interval)
+            return
+        for dirname in set(os.path.dirname(os.path.abspath(fl))
+                           for fl in filenames):
+            if dirname not in self.__watched and os.path.isdir(dirname):
+                self.__manager.add_watch(
+                    dirname,
+                    pyinotify.IN_CREATE | pyinotify.IN_CLOSE_WRITE |
+                    pyinotify.IN_MOVED_TO)
+                self.__watched.add(dirname)
+        if self.__notifier.check_events():
+            self.__notifier.read_events()
+            self.__notifier.process_events()
+
+    def close(self):
+        """ stops watching directories
+        """
+        if self.__notifier is not None:
+            self.__notifier.stop()
+            self.__notifier = None
+
+
+class ChunkSource(object):
+
+    """ Opened hdf5 field of an input file which can be copied
+    into the nexus file chunk by chunk
+    """
+
+    def __init__(self, nxsfile, field):
+        """ constructor
+
+        :param nxsfile: input file
+        :type nxsfile: :class:`filewriter.FTFile`
+        :param field: input field
+        :type field: :class:`filewriter.FTField`
+        """
+        #: (:class:`filewriter.FTFile`) input file
+        self.nxsfile = nxsfile
+        #: (:class:`filewriter.FTField`) input field
+        self.field = field
+
+    def read(self):
+        """ reads decompressed field data
+
+        :returns: field data
+        :rtype: :class:`numpy.ndarray`
+        """
+        return self.field[...]
+
+    def close(self):
+        """ closes the input file
+        """
+        self.nxsfile.close()
+
+
+class H5Prefetcher(object):
+
+    """ Prefetcher of hdf5 input files which opens the next input files
+    in background threads, keeps an LRU of open file handles and caches
+    resolved field paths per file family
+    """
+
+    def __init__(self, opener, size=2, threads=True):
+        """ constructor
+
+        :param opener: function opening the image field of hdf5 file
+                       with (file name, field path) arguments
+        :type opener: :obj:`instancemethod`
+        :param size: number of files opened in advance
+                     and size of the handle LRU
+        :type size: :obj:`int`
+        :param threads: if open files in background threads
+        :type threads: :obj:`bool`
+        """
+        #: (:obj:`instancemethod`) function opening the image field
+        self.__opener = opener
+        #: (:obj:`int`) number of files opened in advance
+        self.__size = max(size, 1)
+        #: (:class:`ThreadPool`) opening threads
+        self.__pool = ThreadPool(min(self.__size, 4)) if threads else None
+        #: (:obj:`dict` <(:obj:`str`, :obj:`str`),
+        #:   :class:`multiprocessing.pool.AsyncResult`>) files being opened
+        self.__pending = {}
+        #: (:class:`collections.OrderedDict` <(:obj:`str`, :obj:`str`),
+        #:   (:class:`filewriter.FTFile`, :class:`filewriter.FTField`)>)
+        #:   LRU of open file handles
+        self.__handles = collections.OrderedDict()
+        #: (:obj:`dict` <(:obj:`str`, :obj:`str`, :obj:`str`), :obj:`str`>)
+        #:   resolved field paths of file families
+        self.__paths = {}
+        #: (:class:`threading.Lock`) field path lock
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def family(cls, filename, path=None):
+        """ provides the file family key, i.e. the file name
+        with numbers replaced by '#' and the requested field path
+
+        :param filename: hdf5 file name
+        :type filename: :obj:`str`
+        :param path: requested field path
+        :type path: :obj:`str`
+        :returns: file family key
+        :rtype: (:obj:`str`, :obj:`str`, :obj:`str`)
+        """
+        dirname, basename = os.path.split(filename)
+        return dirname, re.sub("\\d+", "#", basename), path or ""
+
+    def fieldpath(self, filename, path=None):
+        """ provides the field path resolved for the file family
+
+        :param filename: hdf5 file name
+        :type filename: :obj:`str`
+        :param path: requested field path
+        :type path: :obj:`str`
+        :returns: resolved field path or None
+        :rtype: :obj:`str`
+        """
+        with self.__lock:
+            return self.__paths.get(self.family(filename, path))
+
+    def setfieldpath(self, filename, path, fieldpath):
+        """ stores the field path resolved for the file family
+
+        :param filename: hdf5 file name
+        :type filename: :obj:`str`
+        :param path: requested field path
+        :type path: :obj:`str`
+        :param fieldpath: resolved field path
+        :type fieldpath: :obj:`str`
+        """
+        with self.__lock:
+            self.__paths[self.family(filename, path)] = fieldpath
+
+    def prefetch(self, filename, path=None):
+        """ starts reading the file in advance
+
+        :param filename: hdf5 file name
+        :type filename: :obj:`str`
+        :param path: requested field path
+        :type path: :obj:`str`
+        """
+        key = (filename, path)
+        if key in self.__pending or key in self.__handles:
+            return
+        _readahead(filename)
+        if self.__pool is not None:
+            self.__pending[key] = self.__pool.apply_async(
+                self.__opener, key)
+
+    def open(self, filename, path=None):
+        """ provides the opened file and its image field
+
+        :param filename: hdf5 file name
+        :type filename: :obj:`str`
+        :param path: requested field path
+        :type path: :obj:`str`
+        :returns: (hdf5 file, hdf5 image field)
+        :rtype: (:class:`filewriter.FTFile`, :class:`filewriter.FTField`)
+        """
+        key = (filename, path)
+        if key in self.__handles:
+            handle = self.__handles.pop(key)
+            if handle[1].is_valid:
+                return handle
+        result = self.__pending.pop(key, None)
+        if result is not None:
+            return result.get()
+        return self.__opener(filename, path)
+
+    def release(self, filename, path, handle):
+        """ puts the file handle back into the LRU
+        closing the least recently used handles
+
+        :param filename: hdf5 file name
+        :type filename: :obj:`str`
+        :param path: requested field path
+        :type path: :obj:`str`
+        :param handle: (hdf5 file, hdf5 image field)
+        :type handle: (:class:`filewriter.FTFile`,
+                      :class:`filewriter.FTField`)
+        """
+        self.__handles[(filename, path)] = handle
+        while len(self.__handles) > self.__size:
+            _, (nxsfile, _) = self.__handles.popitem(last=False)
+            nxsfile.close()
+
+    def close(self):
+        """ closes opened files and stops the threads
+        """
+        for result in self.__pending.values():
+            try:
+                result.get()[0].close()
+            except Exception:
+                pass
+        self.__pending = {}
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+        while self.__handles:
+            _, (nxsfile, _) = self.__handles.popitem(last=False)
+            nxsfile.close()
+
+
+class UndoRecord(object):
+
+    """ Record of objects created or grown in the nexus file
+    which allows to roll back changes done in place
+    """
+
+    def __init__(self):
+        """ constructor
+        """
+        #: (:obj:`list` < (:class:`filewriter.FTGroup`, :obj:`str`) >)
+        #    parents and names of created nodes
+        self.__created = []
+        #: (:obj:`list` < (:class:`filewriter.FTField`, :obj:`int`) >)
+        #    grown fields with their original lengths
+        self.__grown = []
+        #: (:obj:`set` < :obj:`int` >) ids of recorded nodes
+        self.__recorded = set()
+
+    def created(self, parent, name, node=None):
+        """ records a created node
+
+        :param parent: parent node
+        :type parent: :class:`filewriter.FTGroup`
+        :param name: node name
+        :type name: :obj:`str`
+        :param node: created node
+        :type node: :class:`filewriter.FTObject`
+        """
+        self.__created.append((parent, name))
+        if node is not None:
+            self.__recorded.add(id(node))
+
+    def grown(self, field):
+        """ records the original length of the field to be grown
+
+        :param field: field node
+        :type field: :class:`filewriter.FTField`
+        """
+        if id(field) not in self.__recorded:
+            self.__recorded.add(id(field))
+            self.__grown.append((field, field.shape[0]))
+
+    def rollback(self):
+        """ removes created nodes and shrinks grown fields
+        """
+        for field, size in reversed(self.__grown):
+            if field.shape[0] != size:
+                field.grow(0, size - field.shape[0])
+        for parent, name in reversed(self.__created):
+            parent.remove(name)
+        self.__created = []
+        self.__grown = []
+        self.__recorded = set()
+
+
 class Linker(object):
 
     """ Create external and internal links of NeXus files
     """
 
     def __init__(self, nexusfilepath, target, name=None,
-                 storeold=False, testmode=False, writer=None):
+                 storeold=False, testmode=False, writer=None,
+                 inplace=False):
         """ The constructor creates the collector object
 
         :param nexusfilepath: the nexus file name and nexus path
@@ -111,6 +726,8 @@ class Linker(object):
         :type testmode: :obj:`bool`
         :param writer: the writer module
         :type writer: :obj:`str`
+        :param inplace: if avoid copying of the input file
+        :type inplace: :obj:`bool`
         """
         self.__target = target
         self.__name = name
@@ -118,6 +735,9 @@ class Linker(object):
             self.__name = target.split("/")[-1]
         self.__testmode = testmode
         self.__storeold = storeold
+        self.__inplace = inplace
+        self.__tempfilename = None
+        self.__undo = None
         self.__wrmodule = None
         self.__nexuspath = None
         self.__nexusfilename, self.__nexuspath = \
@@ -143,11 +763,20 @@ class Linker(object):
             print("terminated by %s" % self.__siginfo[sig])
 
     def _createtmpfile(self):
-        """ creates temporary file
+        """ creates temporary file. In the in-place mode the file
+        is cloned if it is supported or it is not created at all
+        when the input file is not backed up
         """
         self.__tempfilename = self.__nexusfilename + ".__nxscollect_temp__"
         while os.path.exists(self.__tempfilename):
             self.__tempfilename += "_"
+        if self.__inplace:
+            if _reflink(self.__nexusfilename, self.__tempfilename):
+                return
+            if not self.__storeold:
+                self.__tempfilename = None
+                self.__undo = UndoRecord()
+                return
         shutil.copy2(self.__nexusfilename, self.__tempfilename)
 
     def _storeoldfile(self):
@@ -163,27 +792,26 @@ class Linker(object):
         """
         self._createtmpfile()
         path = self.__nexuspath
+        self.__nxsfile = None
         try:
             self.__nxsfile = filewriter.open_file(
-                self.__tempfilename, readonly=False,
+                self.__tempfilename or self.__nexusfilename, readonly=False,
                 writer=self.__wrmodule)
             root = self.__nxsfile.root()
-            groups = path.split("/")
-            parent = root
-            tgr = ""
-            for gr in groups:
-                if gr:
-                    if ":" in gr:
-                        gr, tgr = gr.split(":", 1)
-                    if parent is not None and gr in parent.names():
-                        parent = parent.open(gr)
-                    else:
-                        if not tgr:
-                            tgr = "NX" + gr
-                        if not self.__testmode:
-                            parent = parent.create_group(gr, tgr)
-                        else:
-                            parent = None
+            if self.__testmode:
+                try:
+                    parent = root.open_path(path)
+                except Exception:
+                    parent = None
+            else:
+                created = []
+                try:
+                    parent = root.open_path(
+                        path, create=True, created=created)
+                finally:
+                    if self.__undo is not None:
+                        for grparent, gr, group in created:
+                            self.__undo.created(grparent, gr, group)
 
             if parent:
                 print("link: target %s at %s://%s as %s" %
@@ -194,13 +822,22 @@ class Linker(object):
                       (self.__target, path, self.__name))
             if not self.__testmode:
                 filewriter.link(self.__target, parent, self.__name)
+                if self.__undo is not None:
+                    self.__undo.created(parent, self.__name)
 
-            if self.__storeold:
-                self._storeoldfile()
-            shutil.move(self.__tempfilename, self.__nexusfilename)
+            if self.__tempfilename:
+                if self.__storeold:
+                    self._storeoldfile()
+                shutil.move(self.__tempfilename, self.__nexusfilename)
+            else:
+                self.__nxsfile.close()
         except Exception as e:
             print(str(e))
-            os.remove(self.__tempfilename)
+            if self.__tempfilename:
+                os.remove(self.__tempfilename)
+            elif self.__nxsfile is not None and self.__nxsfile.is_valid:
+                self.__undo.rollback()
+                self.__nxsfile.close()
 
 
 class Collector(object):
@@ -211,7 +848,12 @@ class Collector(object):
 
     def __init__(self, nexusfilename, compression=2,
                  skipmissing=False, storeold=False, testmode=False,
-                 writer=None):
+                 writer=None, workers=0, batchframes=1,
+                 flushframes=0, flushinterval=0, inplace=False,
+                 chunkcopy=False, rawoffset=0, resume=False,
+                 profile=False, profilefile=None, chunk=None,
+                 chunkbytes=1048576, cachesize=0, cacheslots=0,
+                 compressionthreads=0, prefetch=0):
         """ The constructor creates the collector object
 
         :param nexusfilename: the nexus file name
@@ -226,13 +868,82 @@ class Collector(object):
         :type testmode: :obj:`bool`
         :param writer: the writer module
         :type writer: :obj:`str`
+        :param workers: number of processes decoding images in advance
+        :type workers: :obj:`int`
+        :param batchframes: number of frames written in one block
+        :type batchframes: :obj:`int`
+        :param flushframes: number of appended frames after which
+                            the file is flushed, 0 to disable
+        :type flushframes: :obj:`int`
+        :param flushinterval: time in seconds after which
+                              the file is flushed, 0 to disable
+        :type flushinterval: :obj:`float`
+        :param inplace: if avoid copying of the input file
+        :type inplace: :obj:`bool`
+        :param chunkcopy: if copy compressed chunks of hdf5 input files
+        :type chunkcopy: :obj:`bool`
+        :param rawoffset: size of raw file headers in bytes
+        :type rawoffset: :obj:`int`
+        :param resume: if skip files stored in ledgers of appended files
+        :type resume: :obj:`bool`
+        :param profile: if measure and print times of collecting stages
+        :type profile: :obj:`bool`
+        :param profilefile: name of a file to append stage times
+                            as JSON lines
+        :type profilefile: :obj:`str`
+        :param chunk: chunk shape of created fields, i.e.
+                      'frames,y,x' or 'auto'
+        :type chunk: :obj:`str` or :obj:`list` <:obj:`int`>
+        :param chunkbytes: chunk size in bytes targeted by 'auto' chunks
+        :type chunkbytes: :obj:`int`
+        :param cachesize: raw data chunk cache size in bytes,
+                          0 to derive it from the chunk shape
+        :type cachesize: :obj:`int`
+        :param cacheslots: number of raw data chunk cache slots,
+                           0 to derive it from the chunk shape
+        :type cacheslots: :obj:`int`
+        :param compressionthreads: number of threads compressing chunks
+                                   outside of the hdf5 filter pipeline
+        :type compressionthreads: :obj:`int`
+        :param prefetch: number of hdf5 input files opened in advance
+        :type prefetch: :obj:`int`
         """
         self.__nexusfilename = nexusfilename
         self.__compression = compression
         self.__skipmissing = skipmissing
         self.__testmode = testmode
         self.__storeold = storeold
+        self.__workers = workers or 0
+        self.__batchframes = max(batchframes or 1, 1)
+        self.__flushframes = flushframes or 0
+        self.__flushinterval = flushinterval or 0
+        self.__unflushed = 0
+        self.__flushtime = time.time()
+        self.__inplace = inplace
+        self.__chunkcopy = chunkcopy
+        self.__rawoffset = rawoffset or 0
+        self.__resume = resume
+        self.__ledger = None
+        self.__ledgered = collections.deque()
+        self.__stats = {}
+        self.__watcher = None
+        self.__timeout = 0
+        self.__swmr = False
+        self.__frames = 0
+        self.__summary = {}
+        self.__dirindex = {}
+        self.__profile = profile or bool(profilefile)
+        self.__profilefile = profilefile
+        self.__profiler = None
+        self.__chunk = getchunk(chunk)
+        self.__chunkbytes = max(chunkbytes or 1048576, 1)
+        self.__cachesize = cachesize or 0
+        self.__cacheslots = cacheslots or 0
+        self.__compressionthreads = compressionthreads or 0
+        self.__prefetch = prefetch or 0
+        self.__prefetcher = None
         self.__tempfilename = None
+        self.__undo = None
         self.__filepattern = re.compile(".+:\\d+:\\d+")
         self.__nxsfile = None
         self.__break = False
@@ -258,11 +969,20 @@ class Collector(object):
             print("terminated by %s" % self.__siginfo[sig])
 
     def _createtmpfile(self):
-        """ creates temporary file
+        """ creates temporary file. In the in-place mode the file
+        is cloned if it is supported or it is not created at all
+        when the input file is not backed up
         """
         self.__tempfilename = self.__nexusfilename + ".__nxscollect_temp__"
         while os.path.exists(self.__tempfilename):
             self.__tempfilename += "_"
+        if self.__inplace:
+            if _reflink(self.__nexusfilename, self.__tempfilename):
+                return
+            if not self.__storeold:
+                self.__tempfilename = None
+                self.__undo = UndoRecord()
+                return
         shutil.copy2(self.__nexusfilename, self.__tempfilename)
 
     def _storeoldfile(self):
@@ -273,6 +993,25 @@ class Collector(object):
             temp += "_"
         shutil.move(self.__nexusfilename, temp)
 
+    def _replacefile(self):
+        """ replaces the input file by the temporary one
+        """
+        if self.__tempfilename:
+            if self.__storeold:
+                self._storeoldfile()
+            shutil.move(self.__tempfilename, self.__nexusfilename)
+
+    def _stage(self, stage):
+        """ provides a context manager measuring time of the stage
+        if profiling is enabled
+
+        :param stage: stage name
+        :type stage: :obj:`str`
+        :returns: stage timer
+        :rtype: :class:`StageTimer`
+        """
+        return StageTimer(self.__profiler, stage)
+
     def _filegenerator(self, filestr):
         """ provides file name generator from file string
 
@@ -288,6 +1027,18 @@ class Collector(object):
                 return [filestr]
             return _files
 
+    def _filegenerators(self, files):
+        """ provides file name generators of all file strings,
+        i.e. malformed file strings are reported before collecting
+
+        :param files: a list of file strings
+        :type files: :obj:`list` <:obj:`str`>
+        :returns: file name generators or lists of file names
+        :rtype: :obj:`list` <:class:`methodinstance`>
+        """
+        return [self._filegenerator(filestr)
+                for filestr in FilenameGenerator.join_slices(files)]
+
     @classmethod
     def _absolutefilename(cls, filename, masterfile):
         """ provides absolute image file name
@@ -305,8 +1056,71 @@ class Collector(object):
             filename = os.path.abspath(os.path.join(nexusfilepath, filename))
         return filename
 
+    def _filecandidates(self, filename, nname=None):
+        """ provides absolute image file names to search for
+
+        :param filename: image file name
+        :type: filename: :obj:`str`
+        :param nname: hdf5 node name
+        :typ nname: :obj:`str`
+
+        :returns: absolute image file names in the search order
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        filelist = []
+        masterfiles = [self.__nexusfilename]
+        if self.__fullfilename:
+            masterfiles.append(self.__fullfilename)
+        if nname is not None:
+            for masterfile in masterfiles:
+                filelist.append('%s/%s/%s' % (
+                    os.path.splitext(masterfile)[0],
+                    nname,
+                    filename.split("/")[-1]))
+        for masterfile in masterfiles:
+            filelist.append(self._absolutefilename(filename, masterfile))
+        filelist.append(filename)
+        return filelist
+
+    def _listdir(self, dirname):
+        """ provides names of files in the directory.
+        Each directory is listed only once per collecting
+
+        :param dirname: directory name
+        :type dirname: :obj:`str`
+        :returns: names of files in the directory
+        :rtype: :obj:`set` <:obj:`str`>
+        """
+        names = self.__dirindex.get(dirname)
+        if names is None:
+            try:
+                if hasattr(os, "scandir"):
+                    names = set(
+                        entry.name
+                        for entry in os.scandir(dirname or os.curdir))
+                else:
+                    names = set(os.listdir(dirname or os.curdir))
+            except OSError:
+                names = set()
+            self.__dirindex[dirname] = names
+        return names
+
+    def _forget(self, filename):
+        """ removes the image file name from the directory index
+        so that the file is looked up again on the file system,
+        e.g. after the file could not be opened
+
+        :param filename: image file name
+        :type filename: :obj:`str`
+        """
+        dirname, name = os.path.split(filename)
+        names = self.__dirindex.get(dirname)
+        if names is not None:
+            names.discard(name)
+
     def _findfile(self, filename, nname=None):
-        """ searches for absolute image file name
+        """ searches for absolute image file name in indices
+        of listed directories and then directly on the file system
 
         :param filename: image file name
         :type: filename: :obj:`str`
@@ -316,39 +1130,17 @@ class Collector(object):
         :returns: absolute image file name
         :rtype: :obj:`str`
         """
-        filelist = []
-
-        if nname is not None:
-            tmpfname = '%s/%s/%s' % (
-                os.path.splitext(self.__nexusfilename)[0],
-                nname,
-                filename.split("/")[-1])
-            if os.path.exists(tmpfname):
+        filelist = self._filecandidates(filename, nname)
+        for tmpfname in filelist:
+            dirname, name = os.path.split(tmpfname)
+            if name in self._listdir(dirname):
                 return tmpfname
-            else:
-                filelist.append(tmpfname)
-            tmpfname = '%s/%s/%s' % (
-                os.path.splitext(self.__fullfilename)[0],
-                nname,
-                filename.split("/")[-1])
+        # files created after listing of their directories
+        for tmpfname in filelist:
             if os.path.exists(tmpfname):
+                dirname, name = os.path.split(tmpfname)
+                self._listdir(dirname).add(name)
                 return tmpfname
-            else:
-                filelist.append(tmpfname)
-        tmpfname = self._absolutefilename(filename, self.__nexusfilename)
-        if os.path.exists(tmpfname):
-            return tmpfname
-        else:
-            filelist.append(tmpfname)
-        tmpfname = self._absolutefilename(filename, self.__fullfilename)
-        if os.path.exists(tmpfname):
-            return tmpfname
-        else:
-            filelist.append(tmpfname)
-        if os.path.exists(filename):
-            return filename
-        else:
-            filelist.append(filename)
         if not self.__skipmissing:
             raise Exception(
                 "Cannot open any of %s files" % sorted(set(filelist)))
@@ -357,7 +1149,8 @@ class Collector(object):
         return None
 
     def _loadrawimage(self, filename, dtype, shape=None):
-        """ loads image from file
+        """ maps image from raw file. A file with several frames
+        of the given 2d shape is provided as a stack of images
 
         :param filename: image file name
         :type filename: :obj:`str`
@@ -366,14 +1159,17 @@ class Collector(object):
         :param shape: field shape
         :type shape: :obj:`list` <:obj:`int` >
         :returns: (image data, image data type, image shape)
-        :rtype: (:class:`numpy.ndarray`, :obj:`str`, :obj:`list` <:obj:`int`>)
+        :rtype: (:class:`numpy.memmap`, :obj:`str`, :obj:`list` <:obj:`int`>)
         """
         try:
-            idata = None
-
-            with open(filename, "rb") as fl:
-                idata = numpy.fromfile(fl, dtype=dtype)
+            idata = numpy.memmap(
+                filename, dtype=dtype, mode="r", offset=self.__rawoffset)
             if shape:
+                shape = list(shape)
+                if len(shape) == 2:
+                    nframes = idata.size // max(shape[0] * shape[1], 1)
+                    if nframes > 1:
+                        shape = [nframes] + shape
                 idata = idata.reshape(shape)
             dtype = idata.dtype.__str__()
             shape = idata.shape
@@ -383,6 +1179,7 @@ class Collector(object):
                 raise Exception("Cannot open a file %s" % filename)
         except Exception as e:
             print(str(e))
+            self._forget(filename)
             if not self.__skipmissing:
                 raise Exception("Cannot open a file %s" % filename)
             else:
@@ -399,18 +1196,33 @@ class Collector(object):
         :rtype: (:class:`numpy.ndarray`, :obj:`str`, :obj:`list` <:obj:`int`>)
         """
         try:
-            dtype = None
-            shape = None
-            idata = None
-            image = fabio.open(filename)
-            if image:
-                idata = image.data[...]
-                dtype = image.data.dtype.__str__()
-                shape = image.data.shape
-                return idata, dtype, shape
-            else:
+            return _readimage(filename)
+        except Exception:
+            self._forget(filename)
+            if not self.__skipmissing:
                 raise Exception("Cannot open a file %s" % filename)
+            else:
+                print("Cannot open a file %s" % filename)
+
+            return None, None, None
+
+    def _loaddecoded(self, filename, result):
+        """ fetches image decoded by a worker process
+
+        :param filename: image file name
+        :type filename: :obj:`str`
+        :param result: asynchronous result of the worker process
+        :type result: :class:`multiprocessing.pool.AsyncResult`
+        :returns: (image data, image data type, image shape)
+        :rtype: (:class:`numpy.ndarray`, :obj:`str`, :obj:`list` <:obj:`int`>)
+        """
+        try:
+            with self._stage("loadimage") as stage:
+                decoded = result.get()
+                stage.nbytes = getattr(decoded[0], "nbytes", 0)
+            return decoded
         except Exception:
+            self._forget(filename)
             if not self.__skipmissing:
                 raise Exception("Cannot open a file %s" % filename)
             else:
@@ -418,46 +1230,69 @@ class Collector(object):
 
             return None, None, None
 
+    def _openh5data(self, filename, path=None):
+        """ opens image field of hdf5 file
+
+        :param filename: hdf5 image file name
+        :type filename: :obj:`str`
+        :param path: hdf5 field path
+        :type path: :obj:`str`
+        :returns: (hdf5 file, hdf5 image field)
+        :rtype: (:class:`filewriter.FTFile`, :class:`filewriter.FTField`)
+        """
+        nxsfile = filewriter.open_file(
+            filename, readonly=True, writer=self.__wrmodule)
+        prefetcher = self.__prefetcher
+        if prefetcher is not None:
+            fieldpath = prefetcher.fieldpath(filename, path)
+            if fieldpath:
+                try:
+                    return nxsfile, nxsfile.root().open_path(fieldpath)
+                except Exception:
+                    pass
+        if path:
+            image = nxsfile.root().open_path(path)
+        else:
+            image = nxsfile.default_field()
+        if image is None:
+            root = nxsfile.root()
+            image = root.open("data")
+        if prefetcher is not None:
+            prefetcher.setfieldpath(
+                filename, path,
+                "/".join(nd.split(":")[0] for nd in image.path.split("/")))
+        return nxsfile, image
+
     def _loadh5data(self, filename, path=None):
-        """ loads image from hdf5 file
+        """ loads image from hdf5 file. In the chunk-copy mode
+        chunked fields are only opened
 
         :param filename: hdf5 image file name
         :type filename: :obj:`str`
         :param path: hdf5 field path
         :type path: :obj:`str`
         :returns: (image data, image data type, image shape)
-        :rtype: (:class:`numpy.ndarray`, :obj:`str`, :obj:`list` <:obj:`int`>)
+        :rtype: (:class:`numpy.ndarray` or :class:`ChunkSource`, \
+                 :obj:`str`, :obj:`list` <:obj:`int`>)
         """
         try:
-            dtype = None
-            shape = None
-            nxsfile = filewriter.open_file(
-                filename, readonly=True, writer=self.__wrmodule)
-            if path:
-                root = nxsfile.root()
-                parent = root
-                nodes = path.split("/")
-                for nd in nodes:
-                    if nd in parent.names():
-                        parent = parent.open(nd)
-                    else:
-                        raise Exception(
-                            "Error: path %s in % cannot be open" % (path, nd))
-                image = parent
+            if self.__prefetcher is not None:
+                nxsfile, image = self.__prefetcher.open(filename, path)
             else:
-                image = nxsfile.default_field()
-            if image is None:
-                root = nxsfile.root()
-                image = root.open("data")
-            idata = image.read()
-            if image is not None:
-                idata = image[...]
-                dtype = image.dtype
-                shape = image.shape
-            nxsfile.close()
+                nxsfile, image = self._openh5data(filename, path)
+            if self.__chunkcopy and image.chunk:
+                return ChunkSource(nxsfile, image), image.dtype, image.shape
+            idata = image[...]
+            dtype = image.dtype
+            shape = image.shape
+            if self.__prefetcher is not None:
+                self.__prefetcher.release(filename, path, (nxsfile, image))
+            else:
+                nxsfile.close()
             return idata, dtype, shape
         except Exception as e:
             print(str(e))
+            self._forget(filename)
             if not self.__skipmissing:
                 raise Exception("Cannot open a file %s" % filename)
             else:
@@ -479,7 +1314,7 @@ class Collector(object):
             print(" + add attribute: %s = %s" % (name, value))
 
     def _getfield(self, node, fieldname, dtype, shape, fieldattrs,
-                  fieldcompression):
+                  fieldcompression, chunk=None):
         """ creates a field in nexus file
 
         :param node: parent hdf5 node
@@ -495,12 +1330,18 @@ class Collector(object):
         :type fieldattrs: :obj:`dict` <:obj:`str`, :obj:`str`>
         :param fieldcompression: field compression rate
         :type fieldcompression: :obj:`int`
+        :param chunk: chunk shape of input data
+        :type chunk: :obj:`tuple` <:obj:`int`>
         :returns: hdf5 field node
         :rtype: :class:`filewriter.FTField`
         """
         field = None
-        if fieldname in node.names():
-            return node.open(fieldname)
+        if node.exists(fieldname):
+            field = node.open(fieldname)
+            if self.__compressionthreads:
+                field.encoder = filewriter.chunk_encoder(
+                    field, self.__compressionthreads)
+            return field
         else:
             if not self.__testmode:
                 cfilter = None
@@ -513,6 +1354,8 @@ class Collector(object):
                         cfilter = filewriter.data_filter(node)
                         cfilter.filterid = opts[0]
                         cfilter.options = tuple(opts[1:])
+                    if cfilter is not None:
+                        cfilter.threads = self.__compressionthreads
                 if len(shape) == 2:
                     nshape = [0, shape[0], shape[1]]
                     nchunk = [1, shape[0], shape[1]]
@@ -522,42 +1365,255 @@ class Collector(object):
                 else:
                     nshape = [0, shape[0]]
                     nchunk = [1, shape[0]]
+                itemsize = self._itemsize(dtype)
+                if self.__chunk and itemsize:
+                    nchunk = self._chunkshape(nchunk, itemsize)
+                if chunk and len(chunk) == len(nchunk) - 1:
+                    nchunk = [1] + list(chunk)
+                elif chunk and len(chunk) == len(nchunk):
+                    nchunk = list(chunk)
                 field = node.create_field(
                     fieldname,
                     dtype,
                     shape=nshape,
                     chunk=nchunk,
-                    dfilter=cfilter)
+                    dfilter=cfilter,
+                    cache=self._chunkcache(nchunk, shape, itemsize))
+                if self.__undo is not None:
+                    self.__undo.created(node, fieldname, field)
                 self._addattr(field, fieldattrs)
             return field
 
-    def _collectimages(self, files, node, fieldname=None, fieldattrs=None,
-                       fieldcompression=None, datatype=None, shape=None):
-        """ collects images
+    @classmethod
+    def _itemsize(cls, dtype):
+        """ provides size of the data type item
 
-        :param files: a list of file strings
-        :type files: :obj:`list` <:obj:`str`>
-        :param node: hdf5 parent node
-        :type node: :class:`filewriter.FTGroup` or \
-                    :class:`filewriter.FTLink`
-        :param fieldname: field name
+        :param dtype: field data type
+        :type dtype: :obj:`str`
+        :returns: item size in bytes or None for variable length types
+        :rtype: :obj:`int`
+        """
+        try:
+            return numpy.dtype(dtype).itemsize or None
+        except Exception:
+            return None
+
+    def _chunkshape(self, fchunk, itemsize):
+        """ provides the chunk shape of the chunking policy
+
+        :param fchunk: chunk with one frame, i.e. [1, y, x]
+        :type fchunk: :obj:`list` <:obj:`int`>
+        :param itemsize: size of data items in bytes
+        :type itemsize: :obj:`int`
+        :returns: chunk shape
+        :rtype: :obj:`list` <:obj:`int`>
+        """
+        fshape = list(fchunk[1:])
+        if self.__chunk == "auto":
+            # split the frame until a stack of a few tiles
+            # fits into the target chunk size
+            tile = list(fshape)
+            while itemsize * 8 * numpy.prod(tile) > self.__chunkbytes \
+                    and max(tile) > 1:
+                dm = tile.index(max(tile))
+                tile[dm] = - (- tile[dm] // 2)
+            frames = max(
+                self.__chunkbytes // int(itemsize * numpy.prod(tile)), 1)
+            return [int(frames)] + [int(tl) for tl in tile]
+        chunk = list(self.__chunk)
+        if len(chunk) == len(fshape):
+            chunk = [1] + chunk
+        if len(chunk) != len(fshape) + 1:
+            print("Warning: chunk %s does not match the field shape %s"
+                  % (self.__chunk, fshape))
+            return fchunk
+        return [chunk[0]] + [min(ch, max(sh, 1))
+                             for ch, sh in zip(chunk[1:], fshape)]
+
+    def _chunkcache(self, chunk, shape, itemsize):
+        """ provides raw data chunk cache parameters which keep all chunks
+        of a partially written frame block in memory
+
+        :param chunk: chunk shape
+        :type chunk: :obj:`list` <:obj:`int`>
+        :param shape: frame shape
+        :type shape: :obj:`list` <:obj:`int`>
+        :param itemsize: size of data items in bytes
+        :type itemsize: :obj:`int`
+        :returns: cache size in bytes and number of slots or None
+        :rtype: [:obj:`int`, :obj:`int`]
+        """
+        if not itemsize or not chunk:
+            return None
+        if chunk[0] < 2 and not self.__cachesize and not self.__cacheslots:
+            return None
+        nchunks = 1
+        for ch, sh in zip(chunk[1:], shape):
+            nchunks *= - (- max(sh, 1) // ch)
+        chunkbytes = int(itemsize * numpy.prod(chunk))
+        size = self.__cachesize or max((nchunks + 1) * chunkbytes, 1048576)
+        slots = self.__cacheslots or _nextprime(
+            max(100 * max(size // chunkbytes, 1), 521))
+        return [int(size), int(slots)]
+
+    def _ledgerkey(self, fname):
+        """ provides a ledger key of the image file
+
+        :param fname: image file name
+        :type fname: :obj:`str`
+        :returns: image file name relative to the nexus file directory
+        :rtype: :obj:`str`
+        """
+        return os.path.relpath(
+            fname, os.path.dirname(os.path.abspath(self.__nexusfilename)))
+
+    def _openledger(self, node, fieldname):
+        """ opens the field with its ledger of appended files.
+        Frames which are not stored in the ledger are removed
+
+        :param node: hdf5 parent node
+        :type node: :class:`filewriter.FTGroup` or \
+                    :class:`filewriter.FTLink`
+        :param fieldname: field name
         :type fieldname: :obj:`str`
-        :param fieldattrs: dictionary with field attributes
-        :type fieldattrs: :obj:`dict` <:obj:`str`, :obj:`str`>
-        :param fieldcompression: field compression rate
-        :type fieldcompression: :obj:`int`
+        :returns: (hdf5 field node, ledger field node, ledger rows)
+        :rtype: (:class:`filewriter.FTField`, :class:`filewriter.FTField`,
+                :obj:`list` < :obj:`dict` <:obj:`str`, `any`> >)
+        """
+        if not node.exists(fieldname):
+            return None, None, []
+        field = node.open(fieldname)
+        if not node.exists(LEDGER % fieldname):
+            if field.shape[0]:
+                raise Exception(
+                    "Error: %s has no ledger of appended files"
+                    " and cannot be resumed" % field.path)
+            if self.__testmode:
+                return field, None, []
+            return field, self._createledger(node, fieldname), []
+        ledger = node.open(LEDGER % fieldname)
+        rows = []
+        if ledger.shape[0]:
+            for row in ledger.read():
+                if isinstance(row, bytes):
+                    row = row.decode("utf-8")
+                if row:
+                    rows.append(json.loads(row))
+        changed = self._changedrow(rows)
+        if changed is not None:
+            print("resume: %s has changed since it was appended"
+                  % rows[changed]["file"])
+            if not self.__testmode:
+                rows = rows[:changed]
+                if self.__undo is not None:
+                    self.__undo.grown(ledger)
+                ledger.grow(0, len(rows) - ledger.shape[0])
+        nframes = sum(row["frames"] for row in rows)
+        if nframes > field.shape[0]:
+            raise Exception(
+                "Error: ledger of %s does not match the field" % field.path)
+        elif nframes < field.shape[0] and not self.__testmode:
+            if self.__undo is not None:
+                self.__undo.grown(field)
+            field.grow(0, nframes - field.shape[0])
+        return field, ledger, rows
+
+    def _changedrow(self, rows):
+        """ finds the first ledger row of an image file which size or
+        modification time differs from the stored one, i.e. the file was
+        still written or it was replaced after it had been appended
+
+        :param rows: ledger rows
+        :type rows: :obj:`list` < :obj:`dict` <:obj:`str`, `any`> >
+        :returns: index of the changed row or None
+        :rtype: :obj:`int`
+        """
+        dirname = os.path.dirname(os.path.abspath(self.__nexusfilename))
+        for i, row in enumerate(rows):
+            if "size" not in row:
+                continue
+            try:
+                stat = os.stat(os.path.join(dirname, row["file"]))
+            except OSError:
+                continue
+            if stat.st_size != row["size"] or \
+               stat.st_mtime != row.get("mtime", stat.st_mtime):
+                return i
+        return None
+
+    def _statfiles(self, imagefiles):
+        """ stores sizes and modification times of image files
+        before they are read
+
+        :param imagefiles: generator of (image file name, hdf5 field path)
+        :type imagefiles: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        :returns: generator of (image file name, hdf5 field path)
+        :rtype: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        """
+        for fname, npath in imagefiles:
+            if fname is not None:
+                try:
+                    stat = os.stat(fname)
+                    self.__stats[fname] = (stat.st_size, stat.st_mtime)
+                except OSError:
+                    pass
+            yield fname, npath
+
+    def _createledger(self, node, fieldname):
+        """ creates a ledger of appended files
+
+        :param node: hdf5 parent node
+        :type node: :class:`filewriter.FTGroup` or \
+                    :class:`filewriter.FTLink`
+        :param fieldname: field name
+        :type fieldname: :obj:`str`
+        :returns: ledger field node
+        :rtype: :class:`filewriter.FTField`
+        """
+        ledger = node.create_field(
+            LEDGER % fieldname, "string", shape=[0], chunk=[256])
+        if self.__undo is not None:
+            self.__undo.created(node, LEDGER % fieldname, ledger)
+        return ledger
+
+    def _record(self, fnames):
+        """ stores written image files in the ledger
+
+        :param fnames: names of written image files
+        :type fnames: :obj:`list` <:obj:`str`>
+        """
+        if self.__ledger is None or not fnames:
+            return
+        ledger = self.__ledger
+        if self.__undo is not None:
+            self.__undo.grown(ledger)
+        ledger.grow(0, len(fnames))
+        size = ledger.shape[0]
+        for i, fname in enumerate(fnames):
+            pname, index, frames, stat = self.__ledgered.popleft()
+            ledger[size - len(fnames) + i] = json.dumps({
+                "file": self._ledgerkey(pname),
+                "index": index,
+                "frames": frames,
+                "size": stat[0],
+                "mtime": stat[1]})
+
+    def _imagefiles(self, files, node, datatype=None):
+        """ provides image files to collect
+
+        :param files: a list of file strings
+        :type files: :obj:`list` <:obj:`str`>
+        :param node: hdf5 parent node
+        :type node: :class:`filewriter.FTGroup` or \
+                    :class:`filewriter.FTLink`
         :param datatype: field data type
         :type datatype: :obj:`str`
-        :param shape: field shape
-        :type shape: :obj:`list` <:obj:`int` >
+        :returns: generator of (image file name, hdf5 field path)
+        :rtype: :obj:`generator` < (:obj:`str`, :obj:`str`) >
         """
-        fieldname = fieldname or "data"
-        field = None
-        ind = 0
-        for filestr in files:
+        for inputfiles in self._filegenerators(files):
             if self.__break:
                 break
-            inputfiles = self._filegenerator(filestr)
             for fname in inputfiles():
                 if self.__break:
                     break
@@ -566,20 +1622,430 @@ class Collector(object):
                    ".h5://" in fname or ".nxs://" in fname:
                     fname, npath = fname.split("://", 1)
                 if not self.__testmode or node is not None:
-                    fname = self._findfile(fname, node.name)
+                    with self._stage("findfile"):
+                        fname = self._findfile(fname, node.name)
                 if not fname:
                     continue
-                if datatype:
-                    data, dtype, shape = self._loadrawimage(
-                        fname, datatype, shape)
-                elif fname.endswith(".h5") or fname.endswith(".nxs"):
-                    try:
-                        data, dtype, shape = self._loadh5data(fname, npath)
-                    except Exception as e:
-                        print(str(e))
-                        data, dtype, shape = self._loadimage(fname)
+                yield fname, npath
+
+    def _followfiles(self, files, node, datatype=None):
+        """ provides image files to collect as soon as they are written.
+        (None, None) is provided each time the next file is not ready
+
+        :param files: a list of file strings
+        :type files: :obj:`list` <:obj:`str`>
+        :param node: hdf5 parent node
+        :type node: :class:`filewriter.FTGroup` or \
+                    :class:`filewriter.FTLink`
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :returns: generator of (image file name, hdf5 field path)
+        :rtype: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        """
+        last = time.time()
+        for inputfiles in self._filegenerators(files):
+            for fname in inputfiles():
+                npath = None
+                if not datatype and \
+                   (".h5://" in fname or ".nxs://" in fname):
+                    fname, npath = fname.split("://", 1)
+                filelist = self._filecandidates(fname, node.name)
+                while True:
+                    if self.__break:
+                        return
+                    found = [fl for fl in filelist
+                             if self.__watcher.ready(fl)]
+                    if found:
+                        last = time.time()
+                        yield found[0], npath
+                        break
+                    if self.__timeout and \
+                       time.time() - last > self.__timeout:
+                        if not self.__skipmissing:
+                            raise Exception(
+                                "Timeout: none of %s files appeared"
+                                % sorted(set(filelist)))
+                        print("Timeout: none of %s files appeared"
+                              % sorted(set(filelist)))
+                        last = time.time()
+                        break
+                    yield None, None
+                    self.__watcher.wait(filelist)
+
+    def _loadfile(self, fname, npath=None, datatype=None, shape=None):
+        """ loads image data from file
+
+        :param fname: image file name
+        :type fname: :obj:`str`
+        :param npath: hdf5 field path
+        :type npath: :obj:`str`
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :param shape: field shape
+        :type shape: :obj:`list` <:obj:`int` >
+        :returns: (image data, image data type, image shape)
+        :rtype: (:class:`numpy.ndarray`, :obj:`str`, :obj:`list` <:obj:`int`>)
+        """
+        if datatype:
+            with self._stage("loadrawimage") as stage:
+                result = self._loadrawimage(fname, datatype, shape)
+                stage.nbytes = getattr(result[0], "nbytes", 0)
+        elif fname.endswith(".h5") or fname.endswith(".nxs"):
+            with self._stage("loadh5data") as stage:
+                try:
+                    result = self._loadh5data(fname, npath)
+                except Exception as e:
+                    print(str(e))
+                    result = self._loadimage(fname)
+                stage.nbytes = getattr(result[0], "nbytes", 0)
+        else:
+            with self._stage("loadimage") as stage:
+                result = self._loadimage(fname)
+                stage.nbytes = getattr(result[0], "nbytes", 0)
+        return result
+
+    def _loadimages(self, imagefiles, datatype=None, shape=None):
+        """ loads image data from files preserving their order.
+        If prefetch is set hdf5 files are opened in advance
+
+        :param imagefiles: generator of (image file name, hdf5 field path),
+                           (None, None) items are passed through
+        :type imagefiles: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :param shape: field shape
+        :type shape: :obj:`list` <:obj:`int` >
+        :returns: generator of (image file name, image data,
+                  image data type, image shape)
+        :rtype: :obj:`generator` < (:obj:`str`, :class:`numpy.ndarray`,
+                :obj:`str`, :obj:`list` <:obj:`int`>) >
+        """
+        if self.__prefetch < 1 or self.__testmode or datatype:
+            for image in self._decodeimages(imagefiles, datatype, shape):
+                yield image
+            return
+
+        wrmodule = self.__wrmodule or filewriter.writer
+        # hdf5 calls of h5py are serialized by its lock
+        self.__prefetcher = H5Prefetcher(
+            self._openh5data, self.__prefetch,
+            threads=getattr(wrmodule, "__name__", "").endswith("h5pywriter"))
+        try:
+            for image in self._decodeimages(
+                    self._prefetchfiles(imagefiles), datatype, shape):
+                yield image
+        finally:
+            self.__prefetcher.close()
+            self.__prefetcher = None
+
+    def _prefetchfiles(self, imagefiles):
+        """ passes image files through starting to open
+        the next hdf5 files in advance
+
+        :param imagefiles: generator of (image file name, hdf5 field path),
+                           (None, None) items are passed through
+        :type imagefiles: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        :returns: generator of (image file name, hdf5 field path)
+        :rtype: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        """
+        queued = collections.deque()
+        for fname, npath in imagefiles:
+            if fname is None:
+                while queued:
+                    yield queued.popleft()
+                yield None, None
+                continue
+            if fname.endswith(".h5") or fname.endswith(".nxs"):
+                self.__prefetcher.prefetch(fname, npath)
+            queued.append((fname, npath))
+            if len(queued) > self.__prefetch:
+                yield queued.popleft()
+        while queued:
+            yield queued.popleft()
+
+    def _decodeimages(self, imagefiles, datatype=None, shape=None):
+        """ loads image data from files preserving their order.
+        If workers are set images are decoded in advance
+        by a pool of processes
+
+        :param imagefiles: generator of (image file name, hdf5 field path),
+                           (None, None) items are passed through
+        :type imagefiles: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :param shape: field shape
+        :type shape: :obj:`list` <:obj:`int` >
+        :returns: generator of (image file name, image data,
+                  image data type, image shape)
+        :rtype: :obj:`generator` < (:obj:`str`, :class:`numpy.ndarray`,
+                :obj:`str`, :obj:`list` <:obj:`int`>) >
+        """
+        if self.__workers < 1 or self.__testmode:
+            for fname, npath in imagefiles:
+                if fname is None:
+                    yield None, None, None, None
+                    continue
+                yield (fname, ) + tuple(
+                    self._loadfile(fname, npath, datatype, shape))
+            return
+
+        pool = multiprocessing.Pool(self.__workers, _initworker)
+        queued = collections.deque()
+        try:
+            for fname, npath in imagefiles:
+                if fname is None:
+                    while queued and not self.__break:
+                        yield self._nextimage(queued, datatype, shape)
+                    yield None, None, None, None
+                    continue
+                result = None
+                if not datatype and not fname.endswith(".h5") \
+                   and not fname.endswith(".nxs"):
+                    result = pool.apply_async(_readimage, (fname,))
+                queued.append((fname, npath, result))
+                while len(queued) > 2 * self.__workers \
+                        and not self.__break:
+                    yield self._nextimage(queued, datatype, shape)
+            while queued and not self.__break:
+                yield self._nextimage(queued, datatype, shape)
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _nextimage(self, queued, datatype=None, shape=None):
+        """ takes the first image from the queue of decoded images
+
+        :param queued: queue of (image file name, hdf5 field path,
+                       asynchronous result or None)
+        :type queued: :class:`collections.deque`
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :param shape: field shape
+        :type shape: :obj:`list` <:obj:`int` >
+        :returns: (image file name, image data, image data type, image shape)
+        :rtype: (:obj:`str`, :class:`numpy.ndarray`,
+                :obj:`str`, :obj:`list` <:obj:`int`>)
+        """
+        fname, npath, result = queued.popleft()
+        if result is None:
+            return (fname, ) + tuple(
+                self._loadfile(fname, npath, datatype, shape))
+        return (fname, ) + tuple(self._loaddecoded(fname, result))
+
+    def _blockdepth(self, field):
+        """ provides number of frames written in one block, i.e.
+        the requested batch size rounded up to the field chunk depth
+
+        :param field: hdf5 field node
+        :type field: :class:`filewriter.FTField`
+        :returns: block depth
+        :rtype: :obj:`int`
+        """
+        depth = self.__batchframes
+        chunk = field.chunk if field is not None else None
+        if depth > 1 and chunk and chunk[0] > 1:
+            depth = - (- depth // chunk[0]) * chunk[0]
+        return depth
+
+    def _writeblock(self, field, block, nframes, fnames):
+        """ appends a block of frames to the field
+
+        :param field: hdf5 field node
+        :type field: :class:`filewriter.FTField`
+        :param block: block of frames
+        :type block: :class:`numpy.ndarray`
+        :param nframes: number of frames to write
+        :type nframes: :obj:`int`
+        :param fnames: names of image files stored in the block
+        :type fnames: :obj:`list` <:obj:`str`>
+        """
+        if nframes:
+            with self._stage("write") as stage:
+                if self.__undo is not None:
+                    self.__undo.grown(field)
+                field.grow(0, nframes)
+                self.__frames += nframes
+                if nframes == 1:
+                    field[-1, ...] = block[0]
+                else:
+                    field[field.shape[0] - nframes:, ...] = block[:nframes]
+                stage.nbytes = getattr(block[0], "nbytes", 0) * nframes
+            for fname in fnames:
+                print(" * append %s " % (fname))
+            self._record(fnames)
+            self._flush(nframes)
+
+    def _chunkcompatible(self, field, source, nframes):
+        """ checks if chunks of the input field can be copied
+        into the field without decompression
+
+        :param field: hdf5 field node
+        :type field: :class:`filewriter.FTField`
+        :param source: input field
+        :type source: :class:`ChunkSource`
+        :param nframes: number of frames waiting in the block
+        :type nframes: :obj:`int`
+        :returns: if chunks can be copied
+        :rtype: :obj:`bool`
+        """
+        tchunk = field.chunk
+        schunk = source.field.chunk
+        sshape = source.field.shape
+        if not tchunk or not schunk:
+            return False
+        if len(schunk) == len(tchunk) - 1:
+            schunk = [1] + list(schunk)
+            sshape = [1] + list(sshape)
+        if list(schunk) != list(tchunk) or \
+           list(sshape[1:]) != list(field.shape[1:]):
+            return False
+        if (field.shape[0] + nframes) % tchunk[0]:
+            return False
+        if field.dtype != source.field.dtype:
+            return False
+        filters = field.filters
+        return filters is not None and filters == source.field.filters
+
+    def _copychunks(self, field, source, fname):
+        """ appends the input field to the field copying
+        its compressed chunks. Chunks which cannot be read directly,
+        e.g. not allocated ones, are decompressed
+
+        :param field: hdf5 field node
+        :type field: :class:`filewriter.FTField`
+        :param source: input field
+        :type source: :class:`ChunkSource`
+        :param fname: input file name
+        :type fname: :obj:`str`
+        """
+        sfield = source.field
+        sshape = list(sfield.shape)
+        schunk = list(sfield.chunk)
+        stack = len(sshape) == len(field.shape)
+        nrim = sshape[0] if stack else 1
+        base = field.shape[0]
+        with self._stage("copychunks") as stage:
+            if self.__undo is not None:
+                self.__undo.grown(field)
+            field.grow(0, nrim)
+            self.__frames += nrim
+            for offset in itertools.product(
+                    *[range(0, sh, ch) for sh, ch in zip(sshape, schunk)]):
+                if stack:
+                    toffset = (base + offset[0], ) + offset[1:]
+                else:
+                    toffset = (base, ) + offset
+                try:
+                    filtermask, chunk = sfield.read_chunk(offset)
+                except Exception:
+                    sel = tuple(slice(of, of + ch)
+                                for of, ch in zip(offset, schunk))
+                    if stack:
+                        tsel = (slice(toffset[0],
+                                      toffset[0] + schunk[0]), ) + sel[1:]
+                    else:
+                        tsel = (base, ) + sel
+                    field[tsel] = sfield[sel]
                 else:
-                    data, dtype, shape = self._loadimage(fname)
+                    field.write_chunk(toffset, chunk, filtermask)
+                    stage.nbytes += len(chunk)
+        print(" * append %s " % (fname))
+        self._record([fname])
+        self._flush(nrim)
+
+    def _flush(self, nframes=0, force=False):
+        """ flushes the nexus file if it is required by the flush policy.
+        Otherwise the file is flushed when it is closed
+
+        :param nframes: number of appended frames
+        :type nframes: :obj:`int`
+        :param force: if flush all appended frames
+        :type force: :obj:`bool`
+        """
+        self.__unflushed += nframes
+        if not self.__unflushed:
+            return
+        if force or \
+                (self.__flushframes and
+                 self.__unflushed >= self.__flushframes) or \
+                (self.__flushinterval and
+                 time.time() - self.__flushtime >= self.__flushinterval):
+            with self._stage("flush"):
+                self.__nxsfile.flush()
+            self.__unflushed = 0
+            self.__flushtime = time.time()
+
+    def _startswmr(self):
+        """ switches the nexus file into the SWMR mode in the follow mode
+        so that readers can access appended frames. If it is not possible
+        the appended frames are visible after the file is flushed
+        """
+        if self.__watcher is None or self.__swmr:
+            return
+        self.__swmr = True
+        try:
+            self.__nxsfile.reopen(readonly=False, swmr=True)
+        except Exception as e:
+            print("SWMR mode cannot be started: %s" % str(e))
+
+    def _collectimages(self, files, node, fieldname=None, fieldattrs=None,
+                       fieldcompression=None, datatype=None, shape=None):
+        """ collects images
+
+        :param files: a list of file strings
+        :type files: :obj:`list` <:obj:`str`>
+        :param node: hdf5 parent node
+        :type node: :class:`filewriter.FTGroup` or \
+                    :class:`filewriter.FTLink`
+        :param fieldname: field name
+        :type fieldname: :obj:`str`
+        :param fieldattrs: dictionary with field attributes
+        :type fieldattrs: :obj:`dict` <:obj:`str`, :obj:`str`>
+        :param fieldcompression: field compression rate
+        :type fieldcompression: :obj:`int`
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :param shape: field shape
+        :type shape: :obj:`list` <:obj:`int` >
+        """
+        fieldname = fieldname or "data"
+        field = None
+        ind = 0
+        block = None
+        depth = 1
+        nframes = 0
+        fnames = []
+        ledger = None
+        if self.__watcher is not None:
+            imagefiles = self._followfiles(files, node, datatype)
+        else:
+            imagefiles = self._imagefiles(files, node, datatype)
+        if self.__resume and node is not None:
+            field, ledger, rows = self._openledger(node, fieldname)
+            if field is not None:
+                depth = self._blockdepth(field)
+            if ledger is not None:
+                ind = sum(row["frames"] for row in rows)
+                ledgered = set(row["file"] for row in rows)
+                imagefiles = (
+                    (fname, npath) for fname, npath in imagefiles
+                    if fname is None or
+                    self._ledgerkey(fname) not in ledgered)
+            imagefiles = self._statfiles(imagefiles)
+        self.__ledger = ledger
+        self.__ledgered.clear()
+        self.__stats.clear()
+        try:
+            for fname, data, dtype, shape in self._loadimages(
+                    imagefiles, datatype, shape):
+                if fname is None:
+                    if field and not self.__testmode:
+                        self._writeblock(field, block, nframes, fnames)
+                        nframes = 0
+                        fnames = []
+                        self._flush(force=True)
+                    continue
+                source = data if isinstance(data, ChunkSource) else None
                 if data is not None:
                     ishape = shape
                     nrim = 1
@@ -588,83 +2054,135 @@ class Collector(object):
                         nrim = shape[0]
                     if field is None:
                         if not self.__testmode or node is not None:
-                            field = self._getfield(
-                                node, fieldname, dtype, ishape,
-                                fieldattrs, fieldcompression)
-                    if field and ind == field.shape[0]:
-                        if not self.__testmode:
+                            with self._stage("getfield"):
+                                field = self._getfield(
+                                    node, fieldname, dtype, ishape,
+                                    fieldattrs, fieldcompression,
+                                    source.field.chunk if source else None)
+                            depth = self._blockdepth(field)
+                            if self.__resume and field is not None and \
+                               not field.shape[0]:
+                                ledger = self._createledger(node, fieldname)
+                                self.__ledger = ledger
+                            self._startswmr()
+                    if field and ind == field.shape[0] + nframes:
+                        if self.__ledger is not None:
+                            stat = self.__stats.pop(fname, None)
+                            if stat is None:
+                                stat = os.stat(fname)
+                                stat = (stat.st_size, stat.st_mtime)
+                            self.__ledgered.append((fname, ind, nrim, stat))
+                        if source is not None and not self.__testmode and \
+                           not self._chunkcompatible(field, source, nframes):
+                            data = source.read()
+                        if self.__testmode:
+                            print(" * append %s " % (fname))
+                        elif data is source:
+                            self._writeblock(field, block, nframes, fnames)
+                            nframes = 0
+                            fnames = []
+                            self._copychunks(field, source, fname)
+                        elif nrim == 1 and depth > 1:
+                            if block is None:
+                                block = numpy.empty(
+                                    [depth] + list(numpy.shape(data)),
+                                    dtype=data.dtype)
+                            block[nframes] = data
+                            nframes += 1
+                            fnames.append(fname)
+                            if nframes == depth:
+                                self._writeblock(field, block, nframes, fnames)
+                                nframes = 0
+                                fnames = []
+                        else:
+                            self._writeblock(field, block, nframes, fnames)
+                            nframes = 0
+                            fnames = []
                             if nrim == 1:
-                                field.grow(0, 1)
-                                field[-1, ...] = data
+                                data = [data]
+                            if isinstance(data, numpy.memmap):
+                                for st in range(0, nrim - depth, depth):
+                                    self._writeblock(
+                                        field, data[st:st + depth], depth, [])
+                                st = (nrim - 1) // depth * depth
+                                self._writeblock(
+                                    field, data[st:], nrim - st, [fname])
                             else:
-                                field.grow(0, nrim)
-                                field[field.shape[0]-nrim:, ...] = data
-                        print(" * append %s " % (fname))
+                                self._writeblock(field, data, nrim, [fname])
                     ind += nrim
-                    if not self.__testmode:
-                        self.__nxsfile.flush()
-
-    def _inspect(self, parent, collection=False):
-        """ collects recursively the all image files defined
-        by hdf5 postrun fields bellow hdf5 parent node
-
-        :param parent: hdf5 parent node
-        :type parent: :class:`filewriter.FTGroup` or \
-                      :class:`filewriter.FTLink`
-        :param collection: if parent is of NXcollection type
-        :type collection: :obj:`bool`
-        """
-        if hasattr(parent, "names"):
-            if collection:
-                if "postrun" in parent.names():
-                    inputfiles = parent.open("postrun")
-                    files = inputfiles.read()
-                    if hasattr(files, "tolist"):
-                        files = files.tolist()
-                    if isinstance(files, (str, unicode)):
-                        files = [files]
-                    fieldname = "data"
-                    fielddtype = None
-                    fieldshape = None
-                    fieldattrs = {}
-                    fieldcompression = None
-                    for at in inputfiles.attributes:
-                        if at.name == "fieldname":
-                            fieldname = filewriter.first(at.read())
-                        elif at.name == "fieldcompression":
-                            fieldcompression = filewriter.first(at.read())
-                        elif at.name == "fielddtype":
-                            fielddtype = filewriter.first(at.read())
-                        elif at.name == "fieldshape":
-                            fieldshape = json.loads(
-                                filewriter.first(at.read()))
-                        elif at.name.startswith("fieldattr_"):
-                            atname = at.name[10:]
-                            if atname:
-                                fieldattrs[atname] = (
-                                    at.read(), at.dtype, at.shape
-                                )
-                    print("populate: %s/%s with %s" % (
-                        parent.parent.path, fieldname, files))
-                    if fieldcompression is None:
-                        fieldcompression = self.__compression
-                    self._collectimages(
-                        files, parent.parent, fieldname, fieldattrs,
-                        fieldcompression, fielddtype, fieldshape)
-            try:
-                names = parent.names()
-            except Exception:
-                names = []
-            for name in names:
-                coll = False
-                child = parent.open(name)
-                if hasattr(child, "attributes"):
-                    for at in child.attributes:
-                        if at.name == "NX_class":
-                            gtype = filewriter.first(at.read())
-                            if gtype == 'NXcollection':
-                                coll = True
-                    self._inspect(child, coll)
+                if source is not None:
+                    source.close()
+        except Exception:
+            if (self.__resume or self.__watcher is not None) and \
+               field and not self.__testmode:
+                self._writeblock(field, block, nframes, fnames)
+            raise
+        if field and not self.__testmode:
+            self._writeblock(field, block, nframes, fnames)
+        self.__ledger = None
+
+    def _collections(self, root):
+        """ finds hdf5 postrun fields of NXcollection groups
+        in one pass over the nexus tree
+
+        :param root: hdf5 root node
+        :type root: :class:`filewriter.FTGroup`
+        :returns: list of (NXcollection parent node, postrun field)
+        :rtype: :obj:`list` < (:class:`filewriter.FTGroup`,
+                :class:`filewriter.FTField`) >
+        """
+        jobs = []
+        for path in root.find_groups("NXcollection"):
+            node = root
+            for name in path.split("/"):
+                node = node.open(name)
+            if node.exists("postrun"):
+                jobs.append((node.parent, node.open("postrun")))
+        return jobs
+
+    def _inspect(self, root):
+        """ collects the all image files defined
+        by hdf5 postrun fields of NXcollection groups
+
+        :param root: hdf5 root node
+        :type root: :class:`filewriter.FTGroup`
+        """
+        for parent, inputfiles in self._collections(root):
+            if self.__break:
+                break
+            files = inputfiles.read()
+            if hasattr(files, "tolist"):
+                files = files.tolist()
+            if isinstance(files, (str, unicode)):
+                files = [files]
+            fieldname = "data"
+            fielddtype = None
+            fieldshape = None
+            fieldattrs = {}
+            fieldcompression = None
+            for at in inputfiles.attributes:
+                if at.name == "fieldname":
+                    fieldname = filewriter.first(at.read())
+                elif at.name == "fieldcompression":
+                    fieldcompression = filewriter.first(at.read())
+                elif at.name == "fielddtype":
+                    fielddtype = filewriter.first(at.read())
+                elif at.name == "fieldshape":
+                    fieldshape = json.loads(
+                        filewriter.first(at.read()))
+                elif at.name.startswith("fieldattr_"):
+                    atname = at.name[10:]
+                    if atname:
+                        fieldattrs[atname] = (
+                            at.read(), at.dtype, at.shape
+                        )
+            print("populate: %s/%s with %s" % (
+                parent.path, fieldname, files))
+            if fieldcompression is None:
+                fieldcompression = self.__compression
+            self._collectimages(
+                files, parent, fieldname, fieldattrs,
+                fieldcompression, fielddtype, fieldshape)
 
     def _add(self, root, path, inputfiles, fieldtype=None, fieldshape=None):
         """appends specific data if path and inputfiles are given
@@ -679,24 +2197,7 @@ class Collector(object):
         :type shape: :obj:`list` <:obj:`int` >
         """
         groups = path.split("/")
-        parent = root
-        tgr = ""
-        for gr in groups[:-1]:
-            if gr:
-                if ":" in gr:
-                    gr, tgr = gr.split(":", 1)
-                if parent is not None and gr in parent.names():
-                    parent = parent.open(gr)
-                else:
-                    if not tgr:
-                        tgr = "NX" + gr
-                    if not self.__testmode:
-                        parent = parent.create_group(gr, tgr)
-                    else:
-                        parent = None
-                    # raise Exception(
-                    #     "Error: path %s in % cannot be open" % (path, gr))
-
+        parent = self._openpath(root, "/".join(groups[:-1]))
         fieldname = groups[-1]
         if parent:
             print("populate: %s/%s with %s" %
@@ -710,6 +2211,51 @@ class Collector(object):
             inputfiles, parent, fieldname, fieldattrs,
             fieldcompression, fieldtype, fieldshape)
 
+    def _openpath(self, root, path):
+        """ opens the group of the nexus path creating missing groups.
+        In the test mode None is returned for missing groups
+
+        :param root: root group
+        :type root: :class:`filewriter.FTGroup`
+        :param path: nexus path of the group
+        :type path: :obj:`str`
+        :returns: nexus group
+        :rtype: :class:`filewriter.FTGroup`
+        """
+        if self.__testmode:
+            try:
+                return root.open_path(path)
+            except Exception:
+                return None
+        created = []
+        try:
+            return root.open_path(path, create=True, created=created)
+        finally:
+            if self.__undo is not None:
+                for grparent, gr, group in created:
+                    self.__undo.created(grparent, gr, group)
+
+    def _openroot(self, filename):
+        """ opens the nexus file
+
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        :returns: root group
+        :rtype: :class:`filewriter.FTGroup`
+        """
+        self.__nxsfile = filewriter.open_file(
+            filename, readonly=self.__testmode, writer=self.__wrmodule)
+        self.__unflushed = 0
+        self.__flushtime = time.time()
+        root = self.__nxsfile.root()
+        try:
+            self.__fullfilename = filewriter.first(
+                root.attributes['file_name'].read())
+            # print self.__fullfilename
+        except Exception:
+            pass
+        return root
+
     def collect(self, path=None, inputfiles=None, datatype=None, shape=None):
         """ creates a temporary file,
         collects the all image files defined by hdf5
@@ -726,22 +2272,343 @@ class Collector(object):
         :param shape: field shape
         :type shape: :obj:`list` <:obj:`int` >
         """
+        start = time.time()
+        size = self._filesize()
+        self.__frames = 0
+        self.__dirindex = {}
+        self.__profiler = Profiler() if self.__profile else None
+        error = None
+        with self._stage("tempfile"):
+            self._createtmpfile()
+        self.__nxsfile = None
+        try:
+            root = self._openroot(
+                self.__tempfilename or self.__nexusfilename)
+            if path and inputfiles:
+                self._add(root, path, inputfiles, datatype, shape)
+            else:
+                self._inspect(root)
+            with self._stage("close"):
+                self.__nxsfile.close()
+                self._replacefile()
+        except Exception as e:
+            print(str(e))
+            error = str(e)
+            if self.__resume and not self.__testmode and \
+               self.__nxsfile is not None and self.__nxsfile.is_valid:
+                self.__nxsfile.close()
+                self._replacefile()
+            elif self.__tempfilename:
+                os.remove(self.__tempfilename)
+            elif self.__nxsfile is not None and self.__nxsfile.is_valid:
+                self.__undo.rollback()
+                self.__nxsfile.close()
+        self.__summary = {
+            "frames": self.__frames,
+            "bytes": self._filesize() - size,
+            "time": time.time() - start,
+            "error": error}
+        if self.__profiler is not None:
+            self._printprofile()
+            self.__profiler = None
+
+    def _printprofile(self):
+        """ prints times of collecting stages and appends them
+        as a JSON line to the profile file if it is set
+        """
+        print("\n".join(self.__profiler.table(
+            "Profile of %s" % self.__nexusfilename)))
+        if self.__profilefile:
+            record = self.__profiler.todict()
+            record["file"] = self.__nexusfilename
+            record["frames"] = self.__summary["frames"]
+            record["bytes"] = self.__summary["bytes"]
+            with open(self.__profilefile, "a") as fl:
+                fl.write(json.dumps(record) + "\n")
+
+    def _filesize(self):
+        """ provides size of the nexus file
+
+        :returns: file size in bytes or 0 if the file does not exist
+        :rtype: :obj:`int`
+        """
+        try:
+            return os.path.getsize(self.__nexusfilename)
+        except OSError:
+            return 0
+
+    def summary(self):
+        """ provides summary of the last collecting
+
+        :returns: dictionary with a number of appended frames,
+                  a growth of the nexus file in bytes,
+                  collecting time in seconds and an error message or None
+        :rtype: :obj:`dict` <:obj:`str`, `any`>
+        """
+        return dict(self.__summary)
+
+    def follow(self, path, inputfiles, datatype=None, shape=None,
+               timeout=0, interval=0.5):
+        """ appends images to the nexus file while they are written
+        by a running detector. The file is modified directly and
+        it is switched into the SWMR mode when the output field is ready.
+        The file is closed when the last expected image is appended
+
+        :param path: nexus path of the data field
+        :type path: :obj:`str`
+        :param inputfiles: a list of file strings
+        :type inputfiles: :obj:`list` <:obj:`str`>
+        :param datatype: field data type
+        :type datatype: :obj:`str`
+        :param shape: field shape
+        :type shape: :obj:`list` <:obj:`int` >
+        :param timeout: time in seconds to wait for the next image,
+                        0 to wait until the process is terminated
+        :type timeout: :obj:`float`
+        :param interval: maximal time in seconds between two checks
+                         of the next image
+        :type interval: :obj:`float`
+        """
+        self.__watcher = FileWatcher(interval)
+        self.__timeout = timeout or 0
+        self.__swmr = False
+        self.__nxsfile = None
+        try:
+            root = self._openroot(self.__nexusfilename)
+            # objects used in the SWMR mode require the latest file format
+            self.__nxsfile.reopen(readonly=False)
+            self._add(root, path, inputfiles, datatype, shape)
+        except Exception as e:
+            print(str(e))
+        finally:
+            self.__watcher.close()
+            self.__watcher = None
+            if self.__nxsfile is not None and self.__nxsfile.is_valid:
+                self.__nxsfile.close()
+
+
+class VDSCreator(object):
+
+    """ Create virtual datasets of fields stored in external files
+    """
+
+    def __init__(self, nexusfilepath, externalfields, fillvalue=None,
+                 skipmissing=False, storeold=False, testmode=False,
+                 writer=None):
+        """ The constructor creates the vds creator object
+
+        :param nexusfilepath: the nexus file name and nexus field path
+        :type nexusfilepath: :obj:`str`
+        :param externalfields: a list of external field strings
+        :type externalfields: :obj:`list` <:obj:`str`>
+        :param fillvalue: fill value of the virtual field
+        :type fillvalue: :obj:`float`
+        :param skipmissing: if skip missing external files
+        :type skipmissing: :obj:`bool`
+        :param storeold: if backup the input file
+        :type storeold: :obj:`bool`
+        :param testmode: if run in a test mode
+        :type testmode: :obj:`bool`
+        :param writer: the writer module
+        :type writer: :obj:`str`
+        """
+        self.__externalfields = externalfields
+        self.__fillvalue = fillvalue
+        self.__skipmissing = skipmissing
+        self.__testmode = testmode
+        self.__storeold = storeold
+        self.__tempfilename = None
+        self.__filepattern = re.compile(".+:\\d+:\\d+")
+        self.__nxsfile = None
+        self.__break = False
+        self.__wrmodule = None
+        self.__nexusfilename, self.__nexuspath = \
+            nexusfilepath.split(":/", 1)
+        self.__nexuspath = self.__nexuspath.lstrip("/")
+
+        if writer and writer.lower() in WRITERS.keys():
+            self.__wrmodule = WRITERS[writer.lower()]
+        self.__siginfo = dict(
+            (signal.__dict__[sname], sname)
+            for sname in ('SIGINT', 'SIGHUP', 'SIGALRM', 'SIGTERM'))
+
+        for sig in self.__siginfo.keys():
+            signal.signal(sig, self._signalhandler)
+
+    def _signalhandler(self, sig, _):
+        """ signal handler
+
+        :param sig: signal name, i.e. 'SIGINT', 'SIGHUP', 'SIGALRM', 'SIGTERM'
+        :type sig: :obj:`str`
+        """
+        if sig in self.__siginfo.keys():
+            self.__break = True
+            print("terminated by %s" % self.__siginfo[sig])
+
+    def _createtmpfile(self):
+        """ creates temporary file
+        """
+        self.__tempfilename = self.__nexusfilename + ".__nxscollect_temp__"
+        while os.path.exists(self.__tempfilename):
+            self.__tempfilename += "_"
+        shutil.copy2(self.__nexusfilename, self.__tempfilename)
+
+    def _storeoldfile(self):
+        """ makes back up of the input file
+        """
+        temp = self.__nexusfilename + ".__nxscollect_old__"
+        while os.path.exists(temp):
+            temp += "_"
+        shutil.move(self.__nexusfilename, temp)
+
+    def _fieldstrings(self):
+        """ provides external field strings with expanded file patterns
+
+        :returns: generator of (file name, field path)
+        :rtype: :obj:`generator` < (:obj:`str`, :obj:`str`) >
+        """
+        for fieldstr in FilenameGenerator.join_slices(self.__externalfields):
+            if self.__filepattern.match(fieldstr):
+                fieldstrs = FilenameGenerator.from_slice(fieldstr)()
+            else:
+                fieldstrs = [fieldstr]
+            for fstr in fieldstrs:
+                if self.__break:
+                    return
+                if "://" in fstr:
+                    yield tuple(fstr.split("://", 1))
+                else:
+                    yield fstr, None
+
+    def _fieldinfo(self, filename, path=None):
+        """ reads path, shape and data type of the external field
+
+        :param filename: external file name
+        :type filename: :obj:`str`
+        :param path: external field path
+        :type path: :obj:`str`
+        :returns: (field path, field shape, field data type)
+        :rtype: (:obj:`str`, :obj:`list` <:obj:`int`>, :obj:`str`)
+        """
+        try:
+            nxsfile = filewriter.open_file(
+                Collector._absolutefilename(filename, self.__nexusfilename),
+                readonly=True, writer=self.__wrmodule)
+            root = nxsfile.root()
+            if path:
+                field = root
+                for nd in path.split("/"):
+                    if nd:
+                        if field.exists(nd):
+                            field = field.open(nd)
+                        else:
+                            raise Exception(
+                                "Error: path %s in %s cannot be open"
+                                % (path, nd))
+            else:
+                field = nxsfile.default_field()
+                if field is None:
+                    field = root.open("data")
+            path = "/".join(nd.split(":")[0] for nd in field.path.split("/"))
+            info = (path, list(field.shape), field.dtype)
+            nxsfile.close()
+            return info
+        except Exception as e:
+            print(str(e))
+            if not self.__skipmissing:
+                raise Exception("Cannot open a file %s" % filename)
+            else:
+                print("Cannot open a file %s" % filename)
+            return None, None, None
+
+    def _sources(self):
+        """ provides external fields stitched along the frame axis
+
+        :returns: (list of (frame offset, file name, field path,
+                  field shape), virtual field shape, data type)
+        :rtype: (:obj:`list` < (:obj:`int`, :obj:`str`, :obj:`str`,
+                :obj:`list` <:obj:`int`>) >, :obj:`list` <:obj:`int`>,
+                :obj:`str`)
+        """
+        sources = []
+        nframes = 0
+        frame = None
+        dtype = None
+        for filename, path in self._fieldstrings():
+            path, shape, fdtype = self._fieldinfo(filename, path)
+            if shape is None:
+                continue
+            if frame is None:
+                frame = shape if len(shape) < 3 else shape[1:]
+                dtype = fdtype
+            fframe = shape if len(shape) == len(frame) else shape[1:]
+            if list(fframe) != list(frame) or fdtype != dtype:
+                raise Exception(
+                    "Field %s://%s of shape %s and type %s does not match "
+                    "frames of shape %s and type %s"
+                    % (filename, path, shape, fdtype, frame, dtype))
+            sources.append((nframes, filename, path, shape))
+            nframes += 1 if len(shape) == len(frame) else shape[0]
+        if not sources:
+            raise Exception("Error: no external fields found")
+        return sources, [nframes] + list(frame), dtype
+
+    def create(self):
+        """ creates a temporary file, adds to it the virtual field
+        and renames the temporary file to the origin one
+        if the action was successful
+        """
         self._createtmpfile()
         try:
+            sources, shape, dtype = self._sources()
             self.__nxsfile = filewriter.open_file(
                 self.__tempfilename, readonly=self.__testmode,
                 writer=self.__wrmodule)
             root = self.__nxsfile.root()
-            try:
-                self.__fullfilename = filewriter.first(
-                    root.attributes['file_name'].read())
-                # print self.__fullfilename
-            except Exception:
-                pass
-            if path and inputfiles:
-                self._add(root, path, inputfiles, datatype, shape)
-            else:
-                self._inspect(root)
+            groups = self.__nexuspath.split("/")
+            parent = root
+            for gr in groups[:-1]:
+                if gr:
+                    tgr = ""
+                    if ":" in gr:
+                        gr, tgr = gr.split(":", 1)
+                    if parent is not None and parent.exists(gr):
+                        parent = parent.open(gr)
+                    else:
+                        if not tgr:
+                            tgr = "NX" + gr
+                        if not self.__testmode:
+                            parent = parent.create_group(gr, tgr)
+                        else:
+                            parent = None
+            fieldname = groups[-1]
+            if parent is not None and parent.exists(fieldname):
+                raise Exception(
+                    "Error: field %s/%s already exists"
+                    % (parent.path, fieldname))
+
+            print("vds: %s:/%s/%s of shape %s with %s" % (
+                self.__nexusfilename,
+                parent.path if parent else "/" + "/".join(groups[:-1]),
+                fieldname, shape, self.__externalfields))
+            if not self.__testmode:
+                layout = filewriter.virtual_field_layout(
+                    shape, dtype, parent=parent)
+            for offset, filename, path, fshape in sources:
+                if not self.__testmode:
+                    if len(fshape) == len(shape):
+                        key = (slice(offset, offset + fshape[0]), )
+                    else:
+                        key = (offset, )
+                    key += tuple(slice(None) for _ in shape[1:])
+                    layout.add(key, filewriter.external_field(
+                        filename, path, fshape, dtype, parent=parent))
+                print(" * add %s:/%s " % (filename, path))
+            if not self.__testmode:
+                fillvalue = None
+                if self.__fillvalue is not None:
+                    fillvalue = numpy.dtype(dtype).type(self.__fillvalue)
+                parent.create_virtual_field(fieldname, layout, fillvalue)
             self.__nxsfile.close()
             if self.__storeold:
                 self._storeoldfile()
@@ -753,17 +2620,20 @@ class Collector(object):
 
 class VDS(Runner):
 
-    """ Execute runner
+    """ VDS runner
     """
 
     #: (:obj:`str`) command description
-    description = "create a virual dataset in the master file"
+    description = "create a virtual dataset in the master file"
     #: (:obj:`str`) command epilog
     epilog = "" \
         + " examples:\n" \
         + "       nxscollect vds " \
         + "scan_234.nxs://entry/instrument/lambda/data " \
         + "--external-fields lambda.nxs://entry/data/data \n\n" \
+        + "       nxscollect vds " \
+        + "scan_234.nxs://entry/instrument/eiger/data " \
+        + "-e 'eiger_%05d.nxs://entry/data/data:0:3' --fill-value -1 \n\n" \
         + "\n"
 
     def create(self):
@@ -771,13 +2641,23 @@ class VDS(Runner):
         """
         parser = self._parser
         parser.add_argument(
-            "-n", "--name", dest="name",
+            "-e", "--external-fields", dest="externalfields",
             action="store", type=str, default=None,
-            help="link name")
+            help="external fields stitched along the frame axis"
+            " defined with a pattern or separated by ','"
+            " e.g. 'lambda_%%05d.nxs://entry/data/data:0:3'")
         parser.add_argument(
-            "-t", "--target", dest="target",
-            action="store", type=str, default=None,
-            help="link target with the file name if external")
+            "--separator", dest="separator",
+            action="store", type=str, default=",",
+            help="external fields separator (default: ',')")
+        parser.add_argument(
+            "--fill-value", dest="fillvalue",
+            action="store", type=float, default=None,
+            help="fill value of the virtual field")
+        parser.add_argument(
+            "-s", "--skip-missing", action="store_true",
+            default=False, dest="skipmissing",
+            help="skip missing files")
         parser.add_argument(
             "-r", "--replace-nexus-file", action="store_true",
             default=False, dest="replaceold",
@@ -836,12 +2716,27 @@ class VDS(Runner):
             sys.stderr.flush()
             parser.print_help()
             sys.exit(255)
+        if not options.externalfields:
+            sys.stderr.write(
+                "nxscollect: --external-fields argument is missing\n")
+            parser.print_help()
+            sys.exit(255)
+        if ":/" not in nexusfilepath:
+            sys.stderr.write(
+                "nxscollect: nexus field path is missing\n")
+            parser.print_help()
+            sys.exit(255)
+        if options.separator:
+            externalfields = options.externalfields.split(options.separator)
+        else:
+            externalfields = [options.externalfields]
 
         # configuration server
-        linker = Linker(
-            nexusfilepath, options.target, options.name,
-            not options.replaceold, options.testmode, writer=writer)
-        linker.link()
+        creator = VDSCreator(
+            nexusfilepath, externalfields, options.fillvalue,
+            options.skipmissing, not options.replaceold, options.testmode,
+            writer=writer)
+        creator.create()
 
 
 class Link(Runner):
@@ -878,6 +2773,12 @@ class Link(Runner):
             default=False, dest="replaceold",
             help="if it is set the old file is not copied into "
             "a file with .__nxscollect__old__* extension")
+        parser.add_argument(
+            "--in-place", action="store_true",
+            default=False, dest="inplace",
+            help="do not copy the nexus file: clone it if the file system"
+            " supports it or, with -r, modify it directly"
+            " and roll back changes on error")
         parser.add_argument(
             "--test", action="store_true",
             default=False, dest="testmode",
@@ -934,10 +2835,136 @@ class Link(Runner):
         # configuration server
         linker = Linker(
             nexusfilepath, options.target, options.name,
-            not options.replaceold, options.testmode, writer=writer)
+            not options.replaceold, options.testmode, writer=writer,
+            inplace=options.inplace)
         linker.link()
 
 
+def _addcollectoptions(parser, follow=False):
+    """ adds options shared by the append and follow commands
+
+    :param parser: command parser
+    :type parser: :class:`argparse.ArgumentParser`
+    :param follow: if options of the follow command
+    :type follow: :obj:`bool`
+    """
+    flushed = "the next file is not ready" if follow else "it is closed"
+    parser.add_argument(
+        "-c", "--compression", dest="compression",
+        action="store", type=str, default="2",
+        help="deflate compression rate from 0 to 9 (default: 2)"
+        " or <filterid>:opt1,opt2,..."
+        " e.g.  -c 32008:0,2  for bitshuffle with lz4")
+    parser.add_argument(
+        "-p", "--path", dest="path",
+        action="store", type=str, default=None,
+        help="nexus path for the output field, e.g."
+        " /scan/instrument/pilatus/data")
+    parser.add_argument(
+        "-i", "--input-files", dest="inputfiles",
+        action="store", type=str, default=None,
+        help="input data files defined with a pattern "
+        "or separated by ',' e.g."
+        "'scan_%%05d.tif:0:100' or with a step, further index ranges"
+        " and excluded indices e.g. 'scan_%%05d.tif:0:100:2,200:300,!16'")
+    parser.add_argument(
+        "--separator", dest="separator",
+        action="store", type=str, default=",",
+        help="input data files separator (default: ',')")
+    parser.add_argument(
+        "--dtype", dest="datatype",
+        action="store", type=str, default=None,
+        help="datatype of input data - only for raw data,"
+        " e.g. 'uint8'")
+    parser.add_argument(
+        "--shape", dest="shape",
+        action="store", type=str, default=None,
+        help="shape of input data - only for raw data,"
+        " e.g. '[4096,2048]'")
+    parser.add_argument(
+        "--raw-offset", dest="rawoffset",
+        action="store", type=int, default=0,
+        help="size of raw file headers in bytes"
+        " - only for raw data (default: 0)")
+    parser.add_argument(
+        "-s", "--skip-missing", action="store_true",
+        default=False, dest="skipmissing",
+        help=("skip files which have not appeared within the timeout"
+              if follow else "skip missing files"))
+    parser.add_argument(
+        "--workers", dest="workers",
+        action="store", type=int, default=0,
+        help="number of processes decoding images in advance"
+        " (default: 0, i.e. images are decoded by the writing process)")
+    parser.add_argument(
+        "--batch-frames", dest="batchframes",
+        action="store", type=int, default=1,
+        help="number of frames gathered and written in one block,"
+        " rounded up to the chunk size of the field (default: 1)"
+        + (". Incomplete blocks are written when the next file"
+           " is not ready" if follow else ""))
+    parser.add_argument(
+        "--flush-frames", dest="flushframes",
+        action="store", type=int, default=0,
+        help="flush the file after the given number of appended frames"
+        " (default: 0, i.e. the file is flushed when %s)" % flushed)
+    parser.add_argument(
+        "--flush-interval", dest="flushinterval",
+        action="store", type=float, default=0,
+        help="flush the file after the given time in seconds"
+        " (default: 0, i.e. the file is flushed when %s)" % flushed)
+    parser.add_argument(
+        "--chunk-copy", action="store_true",
+        default=False, dest="chunkcopy",
+        help="copy compressed chunks of hdf5 input files without"
+        " decompression if their filters, data type and chunk shape"
+        " match the output field")
+    parser.add_argument(
+        "--prefetch", dest="prefetch",
+        action="store", type=int, default=0,
+        help="number of hdf5 input files read ahead and opened"
+        " in advance, open files are kept in a cache of the same size"
+        " (default: 0, i.e. files are opened when they are appended)")
+    parser.add_argument(
+        "--compression-threads", dest="compressionthreads",
+        action="store", type=int, default=0,
+        help="number of threads compressing chunks of frame blocks,"
+        " see --batch-frames, which are written directly. Supported"
+        " for deflate, shuffle and, if their python modules are"
+        " installed, bitshuffle and lz4 filters (default: 0, i.e."
+        " chunks are compressed by the hdf5 filter pipeline)")
+    parser.add_argument(
+        "--chunk", dest="chunk",
+        action="store", type=str, default=None,
+        help="chunk shape of the created output field, e.g. '16,256,256'"
+        " for 16 frames split into 256x256 tiles or 'auto' to target"
+        " the --chunk-bytes size (default: one frame per chunk)")
+    parser.add_argument(
+        "--chunk-bytes", dest="chunkbytes",
+        action="store", type=int, default=1048576,
+        help="chunk size in bytes targeted by the 'auto' chunk shape"
+        " (default: 1048576)")
+    parser.add_argument(
+        "--chunk-cache-size", dest="cachesize",
+        action="store", type=int, default=0,
+        help="raw data chunk cache size of the output field in bytes"
+        " (default: 0, i.e. large enough to keep all chunks"
+        " of a partially written frame block)")
+    parser.add_argument(
+        "--chunk-cache-slots", dest="cacheslots",
+        action="store", type=int, default=0,
+        help="number of raw data chunk cache slots of the output field"
+        " (default: 0, i.e. derived from the cache size)")
+    parser.add_argument(
+        "--h5py", action="store_true",
+        default=False, dest="h5py",
+        help="use h5py module as a nexus reader/writer")
+    parser.add_argument(
+        "--h5cpp", action="store_true",
+        default=False, dest="h5cpp",
+        help="use h5cpp module as a nexus reader")
+
+
 class Execute(Runner):
 
     """ Execute runner
@@ -954,64 +2981,52 @@ class Execute(Runner):
         + "       nxscollect append scan_234.nxs " \
         + "--path /scan/instrument/pilatus/data  " \
         + "--input-files 'scan_%05d.tif:0:100' "\
+        + "\n\n" \
+        + "       nxscollect append --jobs 8 /tmp/gpfs/raw/scan_*.nxs \n"\
         + "\n"
 
     def create(self):
         """ creates parser
         """
         parser = self._parser
+        _addcollectoptions(parser)
         parser.add_argument(
-            "-c", "--compression", dest="compression",
-            action="store", type=str, default="2",
-            help="deflate compression rate from 0 to 9 (default: 2)"
-            " or <filterid>:opt1,opt2,..."
-            " e.g.  -c 32008:0,2  for bitshuffle with lz4")
-        parser.add_argument(
-            "-p", "--path", dest="path",
-            action="store", type=str, default=None,
-            help="nexus path for the output field, e.g."
-            " /scan/instrument/pilatus/data")
-        parser.add_argument(
-            "-i", "--input-files", dest="inputfiles",
-            action="store", type=str, default=None,
-            help="input data files defined with a pattern "
-            "or separated by ',' e.g."
-            "'scan_%%05d.tif:0:100'")
+            "--jobs", dest="jobs",
+            action="store", type=int, default=0,
+            help="number of processes collecting nexus files in parallel"
+            " with a summary printed at the end, images are decoded"
+            " by the collecting processes"
+            " (default: 0, i.e. nexus files are collected one by one)")
         parser.add_argument(
-            "--separator", dest="separator",
-            action="store", type=str, default=",",
-            help="input data files separator (default: ',')")
+            "--profile", action="store_true",
+            default=False, dest="profile",
+            help="print times and processed bytes of collecting stages")
         parser.add_argument(
-            "--dtype", dest="datatype",
+            "--profile-file", dest="profilefile",
             action="store", type=str, default=None,
-            help="datatype of input data - only for raw data,"
-            " e.g. 'uint8'")
+            help="append times of collecting stages as JSON lines"
+            " to the given file, implies --profile")
         parser.add_argument(
-            "--shape", dest="shape",
-            action="store", type=str, default=None,
-            help="shape of input data - only for raw data,"
-            " e.g. '[4096,2048]'")
-        parser.add_argument(
-            "-s", "--skip-missing", action="store_true",
-            default=False, dest="skipmissing",
-            help="skip missing files")
+            "--resume", action="store_true",
+            default=False, dest="resume",
+            help="store appended files in a ledger next to the output"
+            " field and skip files found in the ledger, files which"
+            " size or modification time has changed are appended again")
         parser.add_argument(
             "-r", "--replace-nexus-file", action="store_true",
             default=False, dest="replaceold",
             help="if it is set the old file is not copied into "
             "a file with .__nxscollect__old__* extension")
+        parser.add_argument(
+            "--in-place", action="store_true",
+            default=False, dest="inplace",
+            help="do not copy the nexus file: clone it if the file system"
+            " supports it or, with -r, modify it directly"
+            " and roll back changes on error")
         parser.add_argument(
             "--test", action="store_true",
             default=False, dest="testmode",
             help="execute in the test mode")
-        parser.add_argument(
-            "--h5py", action="store_true",
-            default=False, dest="h5py",
-            help="use h5py module as a nexus reader/writer")
-        self._parser.add_argument(
-            "--h5cpp", action="store_true",
-            default=False, dest="h5cpp",
-            help="use h5cpp module as a nexus reader")
 
     def postauto(self):
         """ creates parser
@@ -1085,13 +3100,213 @@ class Execute(Runner):
                 parser.print_help()
                 sys.exit(255)
 
+        pars = dict(
+            compression=options.compression,
+            skipmissing=options.skipmissing,
+            storeold=not options.replaceold,
+            testmode=options.testmode, writer=writer,
+            workers=options.workers, batchframes=options.batchframes,
+            flushframes=options.flushframes,
+            flushinterval=options.flushinterval,
+            inplace=options.inplace, chunkcopy=options.chunkcopy,
+            rawoffset=options.rawoffset, resume=options.resume,
+            profile=options.profile, profilefile=options.profilefile,
+            chunk=options.chunk, chunkbytes=options.chunkbytes,
+            cachesize=options.cachesize, cacheslots=options.cacheslots,
+            compressionthreads=options.compressionthreads,
+            prefetch=options.prefetch)
+        args = (options.path, inputfiles, options.datatype, shape)
+        if options.jobs > 0:
+            pars["workers"] = 0
+            self._runjobs(nexusfiles, options.jobs, pars, args)
+            return
+
         # configuration server
         for nxsfile in nexusfiles:
-            collector = Collector(
-                nxsfile, options.compression, options.skipmissing,
-                not options.replaceold, options.testmode, writer=writer)
-            collector.collect(options.path, inputfiles,
-                              options.datatype, shape)
+            collector = Collector(nxsfile, **pars)
+            collector.collect(*args)
+
+    def _runjobs(self, nexusfiles, jobs, pars, args):
+        """ collects nexus files in a pool of processes,
+        prints their output in the order of files and the summary
+
+        :param nexusfiles: nexus file names
+        :type nexusfiles: :obj:`list` <:obj:`str`>
+        :param jobs: number of processes
+        :type jobs: :obj:`int`
+        :param pars: collector parameters
+        :type pars: :obj:`dict` <:obj:`str`, `any`>
+        :param args: collect arguments
+        :type args: :obj:`tuple`
+        """
+        start = time.time()
+        stopped = multiprocessing.Event()
+        siginfo = dict(
+            (signal.__dict__[sname], sname)
+            for sname in ('SIGINT', 'SIGHUP', 'SIGALRM', 'SIGTERM'))
+
+        def _signalhandler(sig, _):
+            if sig in siginfo.keys():
+                stopped.set()
+                print("terminated by %s" % siginfo[sig])
+
+        handlers = dict(
+            (sig, signal.signal(sig, _signalhandler))
+            for sig in siginfo.keys())
+        summaries = []
+        pool = multiprocessing.Pool(
+            min(jobs, len(nexusfiles)), _initjob, (stopped,),
+            maxtasksperchild=1)
+        try:
+            for nxsfile, output, summary in pool.imap(
+                    _collectfile,
+                    [(nxsfile, pars, args) for nxsfile in nexusfiles]):
+                sys.stdout.write(output)
+                sys.stdout.flush()
+                summaries.append((nxsfile, summary))
+        finally:
+            pool.close()
+            pool.join()
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+        print("summary:")
+        frames = 0
+        nbytes = 0
+        for nxsfile, summary in summaries:
+            if summary is None:
+                print(" * %s: skipped" % nxsfile)
+                continue
+            frames += summary["frames"]
+            nbytes += summary["bytes"]
+            info = "%s frames, %s bytes in %.2f s" % (
+                summary["frames"], summary["bytes"], summary["time"])
+            if summary["error"]:
+                info += ", error: %s" % summary["error"]
+            print(" * %s: %s" % (nxsfile, info))
+        print("total: %s files, %s frames, %s bytes in %.2f s" % (
+            len(summaries), frames, nbytes, time.time() - start))
+
+
+class Follow(Runner):
+
+    """ Follow runner
+    """
+
+    #: (:obj:`str`) command description
+    description = "append images to the master file while they are written"
+    #: (:obj:`str`) command epilog
+    epilog = "" \
+        + " examples:\n" \
+        + "       nxscollect follow scan_234.nxs " \
+        + "--path /scan/instrument/pilatus/data  " \
+        + "--input-files 'scan_%05d.tif:0:100' "\
+        + "\n\n" \
+        + "       nxscollect follow scan_234.nxs " \
+        + "--path /scan/instrument/pilatus/data  " \
+        + "--input-files 'scan_%05d.tif:0:100' --timeout 60 "\
+        + "--batch-frames 16 --flush-interval 1 "\
+        + "\n"
+
+    def create(self):
+        """ creates parser
+        """
+        parser = self._parser
+        _addcollectoptions(parser, follow=True)
+        parser.add_argument(
+            "--timeout", dest="timeout",
+            action="store", type=float, default=0,
+            help="time in seconds to wait for the next input file"
+            " (default: 0, i.e. wait until the process is terminated)")
+        parser.add_argument(
+            "--poll-interval", dest="interval",
+            action="store", type=float, default=0.5,
+            help="maximal time in seconds between two checks"
+            " of the next input file (default: 0.5)")
+
+    def postauto(self):
+        """ creates parser
+        """
+        parser = self._parser
+        parser.add_argument('args', metavar='nexus_file',
+                            type=str, nargs='?',
+                            help='nexus file to be collected')
+
+    def run(self, options):
+        """ the main program function
+
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        """
+        parser = self._parser
+        nexusfile = options.args
+
+        try:
+            getcompression(options.compression)
+        except Exception as e:
+            print(str(e))
+            parser.print_help()
+            print("")
+            sys.exit(0)
+
+        if not nexusfile:
+            parser.print_help()
+            print("")
+            sys.exit(0)
+
+        if options.h5cpp:
+            writer = "h5cpp"
+        elif options.h5py:
+            writer = "h5py"
+        elif "h5cpp" in WRITERS.keys():
+            writer = "h5cpp"
+        else:
+            writer = "h5py"
+        if (options.h5py and options.h5cpp) or \
+           writer not in WRITERS.keys():
+            sys.stderr.write("nxscollect: Writer '%s' cannot be opened\n"
+                             % writer)
+            sys.stderr.flush()
+            parser.print_help()
+            sys.exit(255)
+        if not options.inputfiles:
+            sys.stderr.write(
+                "nxscollect: --input-files argument is missing")
+            parser.print_help()
+            sys.exit(255)
+        if not options.path:
+            sys.stderr.write(
+                "nxscollect: --path argument is missing")
+            parser.print_help()
+            sys.exit(255)
+        if options.separator:
+            inputfiles = options.inputfiles.split(options.separator)
+        else:
+            inputfiles = [options.inputfiles]
+
+        shape = None
+        if options.shape:
+            try:
+                shape = json.loads(options.shape)
+            except Exception:
+                sys.stderr.write(
+                    "nxscollect: shape is not readable")
+                parser.print_help()
+                sys.exit(255)
+
+        collector = Collector(
+            nexusfile, options.compression, options.skipmissing,
+            writer=writer, workers=options.workers,
+            batchframes=options.batchframes,
+            flushframes=options.flushframes,
+            flushinterval=options.flushinterval,
+            chunkcopy=options.chunkcopy, rawoffset=options.rawoffset,
+            chunk=options.chunk, chunkbytes=options.chunkbytes,
+            cachesize=options.cachesize, cacheslots=options.cacheslots,
+            compressionthreads=options.compressionthreads,
+            prefetch=options.prefetch)
+        collector.follow(options.path, inputfiles, options.datatype, shape,
+                         options.timeout, options.interval)
 
 
 def _supportoldcommands():
@@ -1131,8 +3346,9 @@ def main():
         formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.cmdrunners = [
         ('append', Execute),
-        ('link', Link)
-        # ('vds', VDS)
+        ('follow', Follow),
+        ('link', Link),
+        ('vds', VDS)
     ]
     runners = parser.createSubParsers()
 
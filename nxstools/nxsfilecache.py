@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+#   This file is part of nexdatas - Tango Server for NeXus data writer
+#
+#    Copyright (C) 2012-2018 DESY, Jan Kotanski <jkotan@mail.desy.de>
+#
+#    nexdatas is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    nexdatas is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with nexdatas.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+""" Persistent cache of metadata parsed from NeXus files """
+
+import json
+import os
+import sqlite3
+import time
+
+
+def cachedir():
+    """ provides the cache directory of nxstools,
+    i.e. `$XDG_CACHE_HOME/nxstools` or `~/.cache/nxstools`
+
+    :returns: cache directory
+    :rtype: :obj:`str`
+    """
+    xdg = os.environ.get("XDG_CACHE_HOME") or \
+        os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(xdg, "nxstools")
+
+
+class NXSFileCache(object):
+
+    """ SQLite cache of JSON descriptions of NeXus files.
+    Entries are keyed by the file path and kind of the description and
+    are valid while the file size, modification time and inode are
+    unchanged. The least recently used entries are evicted when the
+    stored data exceed the maximal size.
+    """
+
+    def __init__(self, filename=None, maxsize=100 * 2 ** 20):
+        """ constructor
+
+        :param filename: cache file name, default:
+                         `nxsfileinfo.sqlite` in :func:`cachedir`
+        :type filename: :obj:`str`
+        :param maxsize: maximal size of stored data in bytes
+        :type maxsize: :obj:`int`
+        """
+        #: (:obj:`str`) cache file name
+        self.filename = filename or \
+            os.path.join(cachedir(), "nxsfileinfo.sqlite")
+        #: (:obj:`int`) maximal size of stored data in bytes
+        self.maxsize = maxsize
+        #: (:class:`sqlite3.Connection`) database connection
+        self.__db = None
+
+    def __connect(self):
+        """ opens the cache database and creates its table
+
+        :returns: database connection
+        :rtype: :class:`sqlite3.Connection`
+        """
+        if self.__db is None:
+            dirname = os.path.dirname(self.filename)
+            if dirname and not os.path.isdir(dirname):
+                try:
+                    os.makedirs(dirname)
+                except OSError:
+                    # created by another process
+                    if not os.path.isdir(dirname):
+                        raise
+            self.__db = sqlite3.connect(self.filename, timeout=60)
+            with self.__db:
+                self.__db.execute(
+                    "CREATE TABLE IF NOT EXISTS descriptions ("
+                    "path TEXT, kind TEXT, size INTEGER, mtime REAL, "
+                    "inode INTEGER, used REAL, nbytes INTEGER, data BLOB, "
+                    "PRIMARY KEY (path, kind))")
+        return self.__db
+
+    @classmethod
+    def identity(cls, filename):
+        """ provides the file identity
+
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        :returns: (absolute path, size, modification time, inode)
+        :rtype: (:obj:`str`, :obj:`int`, :obj:`float`, :obj:`int`)
+        """
+        st = os.stat(filename)
+        return (os.path.abspath(filename), st.st_size, st.st_mtime,
+                st.st_ino)
+
+    def get(self, identity, kind):
+        """ provides the cached description of the unchanged file
+
+        :param identity: file identity given by :meth:`identity`
+        :type identity: (:obj:`str`, :obj:`int`, :obj:`float`, :obj:`int`)
+        :param kind: kind of the description
+        :type kind: :obj:`str`
+        :returns: cached description or None
+        :rtype: :obj:`any`
+        """
+        path = identity[0]
+        db = self.__connect()
+        row = db.execute(
+            "SELECT size, mtime, inode, data FROM descriptions "
+            "WHERE path = ? AND kind = ?", (path, kind)).fetchone()
+        if row is None or tuple(row[:3]) != tuple(identity[1:]):
+            return None
+        with db:
+            db.execute(
+                "UPDATE descriptions SET used = ? "
+                "WHERE path = ? AND kind = ?", (time.time(), path, kind))
+        return json.loads(bytes(row[3]).decode("utf-8"))
+
+    def put(self, identity, kind, description):
+        """ stores the file description and evicts the least recently
+        used entries above the maximal size
+
+        :param identity: file identity given by :meth:`identity`
+                         before the file was read
+        :type identity: (:obj:`str`, :obj:`int`, :obj:`float`, :obj:`int`)
+        :param kind: kind of the description
+        :type kind: :obj:`str`
+        :param description: json serializable file description
+        :type description: :obj:`any`
+        """
+        data = json.dumps(description).encode("utf-8")
+        db = self.__connect()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO descriptions "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (identity[0], kind, identity[1], identity[2], identity[3],
+                 time.time(), len(data), sqlite3.Binary(data)))
+            total = db.execute(
+                "SELECT COALESCE(SUM(nbytes), 0) FROM descriptions"
+            ).fetchone()[0]
+            if total > self.maxsize:
+                for path, knd, nbytes in db.execute(
+                        "SELECT path, kind, nbytes FROM descriptions "
+                        "ORDER BY used").fetchall():
+                    if total <= self.maxsize:
+                        break
+                    db.execute(
+                        "DELETE FROM descriptions "
+                        "WHERE path = ? AND kind = ?", (path, knd))
+                    total -= nbytes
+
+    def close(self):
+        """ closes the cache database
+        """
+        if self.__db is not None:
+            self.__db.close()
+            self.__db = None
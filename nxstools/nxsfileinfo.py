@@ -21,10 +21,18 @@
 
 import sys
 import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import numpy
+import os
 
 from .nxsparser import TableTools
-from .nxsfileparser import NXSFileParser
+from .nxsfileparser import (NXSFileParser, NXSMetadataParser)
+from .nxsfilecache import NXSFileCache
 from .nxsargparser import (Runner, NXSArgParser, ErrorException)
+from .release import __version__
 from . import filewriter
 
 
@@ -41,18 +49,125 @@ try:
 except Exception:
     pass
 
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
 
-class General(Runner):
 
-    """ General runner"""
+def _expandfiles(args):
+    """ expands glob patterns of nexus file names
 
-    #: (:obj:`str`) command description
-    description = "show general information for the nexus file"
-    #: (:obj:`str`) command epilog
-    epilog = "" \
-        + " examples:\n" \
-        + "       nxsfileinfo general /user/data/myfile.nxs\n" \
-        + "\n"
+    :param args: nexus file names or their glob patterns
+    :type args: :obj:`list` <:obj:`str`>
+    :returns: nexus file names in the given order, matches of
+              each pattern are sorted
+    :rtype: :obj:`list` <:obj:`str`>
+    """
+    filenames = []
+    for arg in args:
+        found = []
+        if any(ch in arg for ch in "*?["):
+            found = sorted(glob.glob(arg))
+        filenames.extend(found or [arg])
+    return filenames
+
+
+def _jsonvalue(obj):
+    """ converts values not supported by json
+
+    :param obj: python object
+    :type obj: :obj:`any`
+    :returns: json serializable object
+    :rtype: :obj:`any`
+    """
+    if isinstance(obj, numpy.ndarray):
+        return obj.tolist()
+    if isinstance(obj, numpy.generic):
+        return obj.item()
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", "replace")
+    return str(obj)
+
+
+def _csvvalue(obj):
+    """ converts the value into a csv cell
+
+    :param obj: python object
+    :type obj: :obj:`any`
+    :returns: csv cell
+    :rtype: :obj:`str`
+    """
+    if obj is None:
+        return ""
+    if isinstance(obj, numpy.ndarray) and not obj.shape:
+        obj = obj[()]
+    if isinstance(obj, (list, tuple, numpy.ndarray)):
+        return json.dumps(obj, default=_jsonvalue)
+    if isinstance(obj, (bytes, numpy.generic)):
+        return _jsonvalue(obj)
+    return obj
+
+
+def _recordkey(label):
+    """ converts the general information label into a record key
+
+    :param label: label, e.g. 'Scan entry:'
+    :type label: :obj:`str`
+    :returns: record key, e.g. 'scan_entry'
+    :rtype: :obj:`str`
+    """
+    return label.rstrip(":").lower().replace(" ", "_")
+
+
+def _jsonline(record):
+    """ converts the record into a JSON Lines row
+
+    :param record: record dictionary
+    :type record: :obj:`dict` <:obj:`str`, `any`>
+    :returns: json row
+    :rtype: :obj:`str`
+    """
+    return json.dumps(record, default=_jsonvalue)
+
+
+def _showjob(job):
+    """ shows information of one nexus file in a job worker process
+
+    :param job: (runner class, nexus file name, writer name, options)
+    :type job: (:class:`FileRunner`, :obj:`str`, :obj:`str`,
+                :class:`argparse.Namespace`)
+    :returns: (nexus file name, output, error output, opened flag)
+    :rtype: (:obj:`str`, :obj:`str`, :obj:`str`, :obj:`bool`)
+    """
+    runner, filename, writer, options = job
+    stdout = sys.stdout
+    stderr = sys.stderr
+    sys.stdout = output = StringIO()
+    sys.stderr = erroutput = StringIO()
+    try:
+        opened = runner(None).showfile(filename, writer, options)
+    finally:
+        sys.stdout = stdout
+        sys.stderr = stderr
+    return filename, output.getvalue(), erroutput.getvalue(), opened
+
+
+class FileRunner(Runner):
+
+    """ abstract runner for nexus files"""
+
+    def __init__(self, parser):
+        """ parser creator
+
+        :param parser: option parser
+        :type parser: :class:`NXSFileInfoArgParser`
+        """
+        Runner.__init__(self, parser)
+        #: (:obj:`bool`) if any json row has been written
+        self._emitted = False
+        #: (:obj:`list` <:obj:`str`>) record keys of csv rows
+        self._columns = None
 
     def create(self):
         """ creates parser
@@ -66,12 +181,25 @@ class General(Runner):
             "--h5cpp", action="store_true",
             default=False, dest="h5cpp",
             help="use h5cpp module as a nexus reader")
+        self._parser.add_argument(
+            "--jobs", dest="jobs",
+            action="store", type=int, default=0,
+            help="number of processes reading nexus files in parallel,"
+            " the output is printed in the order of files"
+            " (default: 0, i.e. nexus files are read one by one)")
+        self._parser.add_argument(
+            "--format", dest="format",
+            choices=["rst", "json", "jsonl", "csv"], default="rst",
+            help="output format: rst tables, a JSON list, JSON Lines"
+            " with one JSON object per row or csv with a header line."
+            " Rows of json, jsonl and csv are written as they are found"
+            " (default: rst)")
 
     def postauto(self):
         """ parser creator after autocomplete run """
         self._parser.add_argument(
-            'args', metavar='nexus_file', type=str, nargs=1,
-            help='new nexus file name')
+            'args', metavar='nexus_file', type=str, nargs='+',
+            help='nexus file names or their glob patterns')
 
     def run(self, options):
         """ the main program function
@@ -96,21 +224,166 @@ class General(Runner):
             sys.stderr.flush()
             self._parser.print_help()
             sys.exit(255)
+        filenames = _expandfiles(options.args)
+        jobs = [(type(self), filename, writer, options)
+                for filename in filenames]
+        self._emitted = False
+        if options.format == "csv":
+            csv.writer(sys.stdout, lineterminator="\n").writerow(
+                self.columns(options))
+        elif options.format == "json":
+            sys.stdout.write("[")
+        if options.jobs > 0 and len(filenames) > 1:
+            pool = multiprocessing.Pool(min(options.jobs, len(filenames)))
+            try:
+                results = list(self._streamjobs(
+                    pool.imap(_showjob, jobs), options))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = list(self._streamjobs(
+                (self.showfile(*job[1:]) for job in jobs), options))
+        if options.format == "json":
+            sys.stdout.write("\n]\n")
+            sys.stdout.flush()
+        if not all(results):
+            if len(filenames) == 1:
+                self._parser.print_help()
+            sys.exit(255)
+
+    def _streamjobs(self, results, options):
+        """ writes outputs of job worker processes in the order of files
+
+        :param results: job results or opened flags
+        :type results: :obj:`list` <(:obj:`str`, :obj:`str`, :obj:`str`,
+                       :obj:`bool`)> or :obj:`list` <:obj:`bool`>
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :returns: opened flags
+        :rtype: :obj:`list` <:obj:`bool`>
+        """
+        for result in results:
+            if isinstance(result, tuple):
+                _, output, erroutput, result = result
+                if erroutput:
+                    sys.stderr.write(erroutput)
+                    sys.stderr.flush()
+                if output and options.format == "json":
+                    # the first json row of a worker has no separator
+                    if self._emitted:
+                        output = "," + output
+                    self._emitted = True
+                sys.stdout.write(output)
+                sys.stdout.flush()
+            yield result
+
+    def emit(self, record, options):
+        """ writes the record in the json, jsonl or csv format
+
+        :param record: record dictionary
+        :type record: :obj:`dict` <:obj:`str`, `any`>
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        """
+        if options.format == "csv":
+            if self._columns is None:
+                self._columns = self.columns(options)
+            csv.writer(sys.stdout, lineterminator="\n").writerow(
+                [_csvvalue(record.get(key)) for key in self._columns])
+        elif options.format == "json":
+            sys.stdout.write(
+                "%s\n%s" % ("," if self._emitted else "", _jsonline(record)))
+        else:
+            sys.stdout.write(_jsonline(record) + "\n")
+        self._emitted = True
+
+    def columns(self, options):
+        """ provides record keys written in the csv format
+
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :returns: record keys
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        return ["file"]
+
+    @classmethod
+    def openfile(cls, filename, writer):
+        """ opens the nexus file in the read-only mode
+
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        :param writer: writer name
+        :type writer: :obj:`str`
+        :returns: nexus file or None if it cannot be opened
+        :rtype: :class:`filewriter.FTFile`
+        """
         wrmodule = WRITERS[writer.lower()]
         try:
-            fl = filewriter.open_file(
-                options.args[0], readonly=True,
+            return filewriter.open_file(
+                filename, readonly=True,
                 writer=wrmodule)
         except Exception:
             sys.stderr.write("nxsfileinfo: File '%s' cannot be opened\n"
-                             % options.args[0])
+                             % filename)
             sys.stderr.flush()
-            self._parser.print_help()
-            sys.exit(255)
+            return None
+
+    def showfile(self, filename, writer, options):
+        """ opens the nexus file and shows its information
+
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        :param writer: writer name
+        :type writer: :obj:`str`
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :returns: True if the file could be opened
+        :rtype: :obj:`bool`
+        """
+        fl = self.openfile(filename, writer)
+        if fl is None:
+            return False
 
         root = fl.root()
-        self.show(root)
+        self.show(root, options, filename)
         fl.close()
+        return True
+
+    def show(self, root, options, filename):
+        """ shows information of the nexus file
+
+        :param root: nexus file root
+        :type root: class:`filewriter.FTGroup`
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        """
+
+
+class General(FileRunner):
+
+    """ General runner"""
+
+    #: (:obj:`list` <:obj:`str`>) labels of general information
+    labels = [
+        "Scan entry:", "Title:", "Experiment identifier:",
+        "Instrument name:", "Instrument short name:",
+        "Source name:", "Source short name:",
+        "Sample name:", "Sample formula:",
+        "Start time:", "End time:", "Program:"]
+
+    #: (:obj:`str`) command description
+    description = "show general information for the nexus file"
+    #: (:obj:`str`) command epilog
+    epilog = "" \
+        + " examples:\n" \
+        + "       nxsfileinfo general /user/data/myfile.nxs\n" \
+        + "       nxsfileinfo general --jobs 8 --format jsonl " \
+        + "'/user/data/scan_*.nxs'\n" \
+        + "\n"
 
     @classmethod
     def parseentry(cls, entry, description):
@@ -245,7 +518,7 @@ class General(Runner):
             except Exception:
                 sys.stderr.write("nxsfileinfo: end time cannot be found\n")
                 sys.stderr.flush()
-            if "program_name" in entry.names():
+            if entry.exists("program_name"):
                 pn = entry.open("program_name")
                 pname = filewriter.first(pn.read())
                 attr = pn.attributes
@@ -256,37 +529,175 @@ class General(Runner):
                 description.append({key: "Program:", value: pname})
         return [key, value]
 
-    def show(self, root):
-        """ show general informations
+    def create(self):
+        """ creates parser
 
-        :param root: nexus file root
-        :type root: class:`filewriter.FTGroup`
         """
+        FileRunner.create(self)
+        self._parser.add_argument(
+            "--cache", action="store_true",
+            default=False, dest="cache",
+            help="use the persistent metadata cache in"
+            " $XDG_CACHE_HOME/nxstools, it is also enabled"
+            " by the NXSFILEINFO_CACHE environment variable")
+        self._parser.add_argument(
+            "--no-cache", action="store_true",
+            default=False, dest="nocache",
+            help="do not use the persistent metadata cache")
+        self._parser.add_argument(
+            "--cache-size", dest="cachesize",
+            action="store", type=float, default=100,
+            help="maximal size of the metadata cache in MB,"
+            " the least recently used files are evicted above it"
+            " (default: 100)")
 
-        description = []
+    def columns(self, options):
+        """ provides record keys written in the csv format
 
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :returns: record keys
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        return ["file", "file_name"] + [_recordkey(lb) for lb in self.labels]
+
+    def showfile(self, filename, writer, options):
+        """ shows general information of the nexus file
+        which is taken from the metadata cache if it is enabled
+
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        :param writer: writer name
+        :type writer: :obj:`str`
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :returns: True if the file could be opened
+        :rtype: :obj:`bool`
+        """
+        if options.nocache or not (
+                options.cache or os.environ.get("NXSFILEINFO_CACHE")):
+            return FileRunner.showfile(self, filename, writer, options)
+
+        cache = NXSFileCache(maxsize=int(options.cachesize * 2 ** 20))
+        # the description depends only on the writer and the tool version,
+        # output options are applied by showinfo
+        kind = "general:%s:%s" % (writer, __version__)
+        identity = None
+        info = None
+        try:
+            identity = cache.identity(filename)
+            info = cache.get(identity, kind)
+        except Exception as e:
+            sys.stderr.write("nxsfileinfo: Cache cannot be read: %s\n"
+                             % str(e))
+            sys.stderr.flush()
+        if info is not None:
+            if info.get("warnings"):
+                sys.stderr.write(info["warnings"])
+                sys.stderr.flush()
+        else:
+            fl = self.openfile(filename, writer)
+            if fl is None:
+                cache.close()
+                return False
+            stderr = sys.stderr
+            sys.stderr = warnings = StringIO()
+            try:
+                info = self.describe(fl.root())
+            finally:
+                sys.stderr = stderr
+            fl.close()
+            info["warnings"] = warnings.getvalue()
+            if info["warnings"]:
+                sys.stderr.write(info["warnings"])
+                sys.stderr.flush()
+            # the cached values are shown in the same way on a hit
+            info = json.loads(json.dumps(info, default=_jsonvalue))
+            if identity is not None:
+                try:
+                    cache.put(identity, kind, info)
+                except Exception as e:
+                    sys.stderr.write(
+                        "nxsfileinfo: Cache cannot be written: %s\n"
+                        % str(e))
+                    sys.stderr.flush()
+        cache.close()
+        self.showinfo(info, options, filename)
+        return True
+
+    def describe(self, root):
+        """ parses general information of the nexus file
+
+        :param root: nexus file root
+        :type root: class:`filewriter.FTGroup`
+        :returns: dictionary with the `file_name` attribute or None
+                  and `entries` list of
+                  [table key, table value, description list] items
+        :rtype: :obj:`dict` <:obj:`str`, `any`>
+        """
         attr = root.attributes
 
         names = [at.name for at in attr]
-        fname = filewriter.first(
-            (attr["file_name"].read()
-             if "file_name" in names else " ") or " ")
-        title = "File name: '%s'" % fname
-
-        print("")
+        fname = None
+        if "file_name" in names:
+            fname = filewriter.first(attr["file_name"].read())
+        entries = []
         for en in root:
             description = []
-            headers = self.parseentry(en, description)
+            key, value = self.parseentry(en, description)
+            entries.append([key, value, description])
+        return {"file_name": fname, "entries": entries}
+
+    def show(self, root, options, filename):
+        """ show general informations
+
+        :param root: nexus file root
+        :type root: class:`filewriter.FTGroup`
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        """
+        self.showinfo(self.describe(root), options, filename)
+
+    def showinfo(self, info, options, filename):
+        """ show parsed general informations
+
+        :param info: general information given by :meth:`describe`
+        :type info: :obj:`dict` <:obj:`str`, `any`>
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        """
+        fname = info["file_name"]
+        title = "File name: '%s'" % (fname or " ")
+
+        if options.format != "rst":
+            for key, value, description in info["entries"]:
+                if key != "Scan entry:":
+                    continue
+                record = {"file": filename}
+                if fname is not None:
+                    record["file_name"] = fname
+                record[_recordkey(key)] = value
+                for desc in description:
+                    record[_recordkey(desc[key])] = desc[value]
+                self.emit(record, options)
+            return
+
+        print("")
+        for key, value, description in info["entries"]:
             ttools = TableTools(description)
             ttools.title = title
-            ttools.headers = headers
+            ttools.headers = [key, value]
             rstdescription = ttools.generateList()
             title = ""
             print("\n".join(rstdescription).strip())
             print("")
 
 
-class Field(Runner):
+class Field(FileRunner):
 
     """ Field runner"""
 
@@ -298,6 +709,8 @@ class Field(Runner):
         + "       nxsfileinfo field /user/data/myfile.nxs\n" \
         + "       nxsfileinfo field /user/data/myfile.nxs -g\n" \
         + "       nxsfileinfo field /user/data/myfile.nxs -s\n" \
+        + "       nxsfileinfo field --format jsonl -c nexus_path,units " \
+        + "/user/data/scan_*.nxs\n" \
         + "\n"
 
     def create(self):
@@ -333,66 +746,17 @@ class Field(Runner):
             "-s", "--source", action="store_true",
             default=False, dest="source",
             help="show datasource parameters")
-        self._parser.add_argument(
-            "--h5py", action="store_true",
-            default=False, dest="h5py",
-            help="use h5py module as a nexus reader")
-        self._parser.add_argument(
-            "--h5cpp", action="store_true",
-            default=False, dest="h5cpp",
-            help="use h5cpp module as a nexus reader")
-
-    def postauto(self):
-        """ parser creator after autocomplete run """
-        self._parser.add_argument(
-            'args', metavar='nexus_file', type=str, nargs=1,
-            help='new nexus file name')
-
-    def run(self, options):
-        """ the main program function
-
-        :param options: parser options
-        :type options: :class:`argparse.Namespace`
-        :returns: output information
-        :rtype: :obj:`str`
-        """
-        if options.h5cpp:
-            writer = "h5cpp"
-        elif options.h5py:
-            writer = "h5py"
-        elif "h5cpp" in WRITERS.keys():
-            writer = "h5cpp"
-        else:
-            writer = "h5py"
-        if (options.h5cpp and options.h5py) or writer not in WRITERS.keys():
-            sys.stderr.write("nxsfileinfo: Writer '%s' cannot be opened\n"
-                             % writer)
-            sys.stderr.flush()
-            self._parser.print_help()
-            sys.exit(255)
-        wrmodule = WRITERS[writer.lower()]
-        try:
-            fl = filewriter.open_file(
-                options.args[0], readonly=True,
-                writer=wrmodule)
-        except Exception:
-            sys.stderr.write("nxsfileinfo: File '%s' cannot be opened\n"
-                             % options.args[0])
-            sys.stderr.flush()
-            self._parser.print_help()
-            sys.exit(255)
-
-        root = fl.root()
-        self.show(root, options)
-        fl.close()
+        FileRunner.create(self)
 
-    def show(self, root, options):
-        """ the main function
+    def __settings(self, options):
+        """ provides column headers, filters, stored values and
+        columns which have to exist to be shown
 
         :param options: parser options
         :type options: :class:`argparse.Namespace`
-        :param root: nexus file root
-        :type root: class:`filewriter.FTGroup`
+        :returns: (headers, filters, values, toshow)
+        :rtype: (:obj:`list`< :obj:`str`>, :obj:`list`< :obj:`str`>,
+                 :obj:`list`< :obj:`str`>, :obj:`list`< :obj:`str`>)
         """
         #: (:obj:`list`< :obj:`str`>)   \
         #     parameters which have to exists to be shown
@@ -422,15 +786,66 @@ class Field(Runner):
             filters = options.filters.split(',')
         if options.values:
             values = options.values.split(',')
+        return headers, filters, values, toshow
+
+    def columns(self, options):
+        """ provides record keys written in the csv format
+
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :returns: record keys
+        :rtype: :obj:`list` <:obj:`str`>
+        """
+        return ["file"] + self.__settings(options)[0]
 
-        nxsparser = NXSFileParser(root)
+    def show(self, root, options, filename):
+        """ the main function
+
+        :param root: nexus file root
+        :type root: class:`filewriter.FTGroup`
+        :param options: parser options
+        :type options: :class:`argparse.Namespace`
+        :param filename: nexus file name
+        :type filename: :obj:`str`
+        """
+        headers, filters, values, toshow = self.__settings(options)
+
+        if NXSMetadataParser.supports(root):
+            nxsparser = NXSMetadataParser(root)
+            nxsparser.columns = headers + (toshow or [])
+        else:
+            nxsparser = NXSFileParser(root)
         nxsparser.filters = filters
         nxsparser.valuestostore = values
+
+        if options.format != "rst":
+            def _emitrow(desc):
+                if any(not desc.get(hd) for hd in (toshow or [])):
+                    return
+                record = {"file": filename}
+                record.update(
+                    (hd, desc[hd]) for hd in headers if hd in desc)
+                field = desc.get("nexus_path", "").split('/')[-1]
+                value = desc.get("value", "")
+                if isinstance(value, numpy.ndarray) and not value.shape:
+                    value = value[()]
+                if isinstance(value, bytes):
+                    value = _jsonvalue(value)
+                if field == 'depends_on' and value \
+                   and "depends_on" in headers:
+                    # as in TableTools
+                    record["depends_on"] = "[%s]" % value
+                self.emit(record, options)
+
+            nxsparser.handler = _emitrow
+            nxsparser.parse()
+            return
+
         nxsparser.parse()
 
         description = []
         ttools = TableTools(nxsparser.description, toshow)
-        ttools.title = "File name: '%s'" % options.args[0]
+        ttools.title = "File name: '%s'" % filename
         ttools.headers = headers
         description.extend(ttools.generateList())
         print("\n".join(description))
@@ -21,12 +21,22 @@
 
 from . import filewriter
 import fnmatch
+import re
 import sys
 import xml.etree.ElementTree as et
 from lxml.etree import XMLParser
 
 from nxstools.nxsparser import ParserTools
 
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+
+if sys.version_info > (3,):
+    unicode = str
+
 
 def getdsname(xmlstring):
     """ provides datasource name from datasource xml string
@@ -140,6 +150,12 @@ class NXSFileParser(object):
         self.__root = root
         #: (:obj:`list`< :obj:`str`>)  filters for `full_path` names
         self.filters = []
+        #: (:obj:`types.MethodType`) function called with every found
+        #  node description, if set the description list is not stored
+        self.handler = None
+        #: (:obj:`list` <[:obj:`_sre.SRE_Pattern`, :obj:`str`, :obj:`bool`]>) \
+        #    compiled filters, their literal prefixes and wildcard flags
+        self._patterns = []
 
     @classmethod
     def getpath(cls, path):
@@ -192,7 +208,7 @@ class NXSFileParser(object):
                     cont = False
             desc["value"] = vl
 
-        self.description.append(desc)
+        self._store(desc)
         if tgpath:
             fname = self.__root.parent.name
             if "%s:/%s" % (fname, desc["nexus_path"]) != tgpath:
@@ -200,7 +216,7 @@ class NXSFileParser(object):
                 if tgpath.startswith(fname):
                     tgpath = tgpath[len(fname) + 2:]
                 ldesc["nexus_path"] = "\\-> %s" % tgpath
-                self.description.append(ldesc)
+                self._store(ldesc)
 
     def __parsenode(self, node, tgpath=None):
         """parses the node and add it into the description list
@@ -213,9 +229,11 @@ class NXSFileParser(object):
         :param path: path of the link target or `None`
         :type path: :obj:`str`
         """
-        self.__addnode(node, tgpath)
+        path = str(filewriter.first(node.path))
+        if self._matched(path):
+            self.__addnode(node, tgpath)
         names = []
-        if isinstance(node, filewriter.FTGroup):
+        if isinstance(node, filewriter.FTGroup) and self._descends(path):
             names = [
                 (ch.name,
                  str(ch.target_path) if hasattr(ch, "target_path") else None)
@@ -229,26 +247,228 @@ class NXSFileParser(object):
             finally:
                 pass
 
-    def __filter(self):
-        """filters description list
+    def _store(self, desc):
+        """stores the node description or passes it to the handler
 
+        :param desc: node description
+        :type desc: :obj:`dict` <:obj:`str`, `any`>
         """
-        res = []
-        if self.filters:
-            for elem in self.description:
-                fpath = elem['full_path']
-                found = False
-                for df in self.filters:
-                    found = fnmatch.filter([fpath], df)
-                    if found:
-                        break
-                if found:
-                    res.append(elem)
-            self.description[:] = res
+        if self.handler is not None:
+            self.handler(desc)
+        else:
+            self.description.append(desc)
+
+    def _compile(self):
+        """compiles the filters into regular expressions
+
+        """
+        self._patterns = []
+        for df in self.filters:
+            wild = re.search(r"[*?[]", df)
+            self._patterns.append(
+                [re.compile(fnmatch.translate(df)),
+                 df[:wild.start()] if wild else df,
+                 bool(wild)])
+
+    def _matched(self, path):
+        """checks if the full_path passes the filters
+
+        :param path: nexus full_path
+        :type path: :obj:`str`
+        :returns: True if the node should be described
+        :rtype: :obj:`bool`
+        """
+        if not self._patterns:
+            return True
+        for pattern in self._patterns:
+            if pattern[0].match(path):
+                return True
+        return False
+
+    def _descends(self, path):
+        """checks if descendants of the full_path can pass the filters
+
+        :param path: nexus full_path of a group
+        :type path: :obj:`str`
+        :returns: False if the subtree can be pruned
+        :rtype: :obj:`bool`
+        """
+        if not self._patterns:
+            return True
+        start = path if path.endswith("/") else (path + "/")
+        for _, prefix, wild in self._patterns:
+            if prefix.startswith(start) or \
+               (wild and start.startswith(prefix)):
+                return True
+        return False
 
     def parse(self):
         """parses the file and creates the filtered description list
 
         """
+        self._compile()
         self.__parsenode(self.__root)
-        self.__filter()
+
+
+class NXSMetadataParser(NXSFileParser):
+
+    """ Metadata-only parser for NeXus files opened with h5py
+
+    The file is walked once with the low-level link iteration. Only
+    the attributes of the requested columns are read and nodes dropped
+    by the filters are neither described nor wrapped into
+    :class:`filewriter.FTObject` instances.
+    """
+
+    def __init__(self, root):
+        """ constructor
+
+        :param root: nexus root node
+        :type root: :class:`filewriter.FTGroup`
+        """
+        NXSFileParser.__init__(self, root)
+        #: (:obj:`list`< :obj:`str`>)  requested columns, `None` for all
+        self.columns = None
+        self.__root = root
+        #: (:obj:`list` <[:obj:`str`, :obj:`str`, :obj:`types.MethodType`]>) \
+        #    column names, attribute names and their type converters
+        self.__attrs = []
+
+    @classmethod
+    def supports(cls, root):
+        """ checks if the root node can be parsed by the metadata parser
+
+        :param root: nexus root node
+        :type root: :class:`filewriter.FTGroup`
+        :returns: True if the root is an h5py group
+        :rtype: :obj:`bool`
+        """
+        return h5py is not None and \
+            isinstance(getattr(root, "h5object", None), h5py.Group)
+
+    @classmethod
+    def __decode(cls, vl):
+        """ decodes bytes into unicode as the h5py writer does
+
+        :param vl: read value
+        :type vl: :obj:`any`
+        :returns: decoded value
+        :rtype: :obj:`any`
+        """
+        if hasattr(vl, "decode") and not isinstance(vl, unicode):
+            return vl.decode(encoding="utf-8")
+        return vl
+
+    def __addnode(self, oid, name, path, tgpath):
+        """adds the h5py object into the description list
+
+        :param oid: h5py low-level object id
+        :type oid: :class:`h5py.h5g.GroupID` or :class:`h5py.h5d.DatasetID`
+        :param name: node name
+        :type name: :obj:`str`
+        :param path: nexus full_path
+        :type path: :obj:`str`
+        :param tgpath: nexus path of the link target or `None`
+        :type tgpath: :obj:`str`
+        """
+        desc = {}
+        desc["full_path"] = str(path)
+        desc["nexus_path"] = str(self.getpath(path))
+        isfield = isinstance(oid, h5py.h5d.DatasetID)
+        if isfield:
+            dtype = oid.dtype
+            desc["dtype"] = "string" if dtype.kind == 'O' else str(dtype)
+            desc["shape"] = [int(n) for n in (oid.shape or [])]
+        # high-level objects are created only if they are needed
+        obj = None
+        for key, aname, conv in self.__attrs:
+            if h5py.h5a.exists(oid, aname):
+                if obj is None:
+                    obj = h5py.Dataset(oid) if isfield else h5py.Group(oid)
+                desc[key] = conv(
+                    filewriter.first(self.__decode(obj.attrs[aname])))
+        if isfield and name in self.valuestostore:
+            vl = self.__decode((obj or h5py.Dataset(oid))[...])
+            cont = True
+            while cont:
+                try:
+                    if not isinstance(vl, str) and \
+                       (hasattr(vl, "__len__") and len(vl) == 1):
+                        vl = vl[0]
+                    else:
+                        cont = False
+                except Exception:
+                    cont = False
+            desc["value"] = vl
+
+        self._store(desc)
+        if tgpath is not None and tgpath != desc["nexus_path"]:
+            ldesc = dict(desc)
+            ldesc["nexus_path"] = "\\-> %s" % tgpath
+            self._store(ldesc)
+
+    def __target(self, gid, bname):
+        """ provides the stripped target path of a soft or external link
+
+        :param gid: parent group id
+        :type gid: :class:`h5py.h5g.GroupID`
+        :param bname: link name
+        :type bname: :obj:`bytes`
+        :returns: target path or `None` for hard links
+        :rtype: :obj:`str`
+        """
+        ltype = gid.links.get_info(bname).type
+        if ltype == h5py.h5l.TYPE_SOFT:
+            target = gid.links.get_val(bname)
+        elif ltype == h5py.h5l.TYPE_EXTERNAL:
+            target = gid.links.get_val(bname)[1]
+        else:
+            return None
+        target = self.__decode(target)
+        return "/".join([gr.split(":")[0] for gr in target.split("/")])
+
+    def __parsenode(self, oid, name, path, tgpath=None):
+        """parses the h5py object and its children
+
+        :param oid: h5py low-level object id
+        :type oid: :class:`h5py.h5g.GroupID` or :class:`h5py.h5d.DatasetID`
+        :param name: node name
+        :type name: :obj:`str`
+        :param path: nexus full_path
+        :type path: :obj:`str`
+        :param tgpath: nexus path of the link target or `None`
+        :type tgpath: :obj:`str`
+        """
+        if self._matched(path):
+            self.__addnode(oid, name, path, tgpath)
+        if not isinstance(oid, h5py.h5g.GroupID) or \
+           not self._descends(path):
+            return
+        bnames = []
+        oid.links.iterate(bnames.append)
+        for bname in sorted(bnames):
+            try:
+                cid = h5py.h5o.open(oid, bname)
+            except KeyError:
+                # dangling soft or external links
+                continue
+            cname = self.__decode(h5py.h5i.get_name(cid)).split("/")[-1]
+            cpath = ("/" + cname) if path == "/" else (path + "/" + cname)
+            if ":" not in cname and isinstance(cid, h5py.h5g.GroupID) and \
+               h5py.h5a.exists(cid, b"NX_class"):
+                clss = filewriter.first(h5py.Group(cid).attrs["NX_class"])
+                if clss:
+                    cpath += ":" + str(clss)
+            self.__parsenode(cid, cname, cpath, self.__target(oid, bname))
+
+    def parse(self):
+        """parses the file and creates the filtered description list
+
+        """
+        self.__attrs = [
+            [key, vl[0].encode(), vl[1]]
+            for key, vl in self.attrdesc.items()
+            if self.columns is None or key in self.columns]
+        self._compile()
+        path = filewriter.first(self.__root.path)
+        self.__parsenode(self.__root.h5object.id, self.__root.name, path)
@@ -2235,6 +2235,314 @@ class H5PYWriterTest(unittest.TestCase):
         finally:
             os.remove(self._fname)
 
+    # default createfile test
+    # \brief It tests default settings
+    def test_h5pyfield_chunk(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            det = ins.create_group("detector", "NXdetector")
+
+            df1 = H5PYWriter.data_filter()
+            df1.rate = 2
+
+            fspec = ins.create_field("floatspec", "float32", [20], [16])
+            fimage = det.create_field("intimage", "uint32", [0, 30], [1, 30])
+            fvec = det.create_field(
+                "floatvec", "float64", [1, 20, 10], [4, 10, 10], dfilter=df1)
+
+            self.assertEqual(tuple(fspec.chunk), (16,))
+            self.assertEqual(tuple(fimage.chunk), (1, 30))
+            self.assertEqual(tuple(fvec.chunk), (4, 10, 10))
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pygroup_find_groups(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            det = ins.create_group("detector", "NXdetector")
+            det.create_group("collection", "NXcollection")
+            det.create_field("data", "uint32", [0, 30], [1, 30])
+            ins.create_group("log", "NXlog")
+            entry.create_group("collection", "NXcollection")
+            entry.create_group("notype")
+
+            self.assertEqual(
+                sorted(rt.find_groups("NXcollection")),
+                ["entry12345/collection",
+                 "entry12345/instrument/detector/collection"])
+            self.assertEqual(
+                ins.find_groups("NXcollection"),
+                ["detector/collection"])
+            self.assertEqual(ins.find_groups("NXlog"), ["log"])
+            self.assertEqual(det.find_groups("NXlog"), [])
+
+            # linked groups are visited once in the order of names
+            entry.h5object["soft"] = h5py.SoftLink(
+                "/entry12345/instrument")
+            entry.h5object["hard"] = ins.h5object
+            self.assertEqual(
+                sorted(entry.find_groups("NXcollection")),
+                ["collection", "hard/detector/collection"])
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pygroup_exists_links(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            logs = entry.create_group("logs", "NXcollection")
+            for i in range(100):
+                logs.create_group("log%03d" % i, "NXlog")
+            H5PYWriter.link("/entry12345/missing", logs, "dangling")
+            H5PYWriter.link("nofile.h5://entry/data", logs, "external")
+
+            self.assertTrue(logs.exists("log000"))
+            self.assertTrue(logs.exists("log099"))
+            self.assertFalse(logs.exists("log100"))
+            self.assertTrue(logs.exists("dangling"))
+            self.assertTrue(logs.exists("external"))
+            self.assertTrue(entry.exists("logs/log010"))
+            self.assertFalse(entry.exists("nologs/log010"))
+            self.assertEqual(
+                sorted(logs.names()),
+                sorted(["log%03d" % i for i in range(100)]
+                       + ["dangling", "external"]))
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pygroup_open_path(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            ins.create_field("name", "string")
+
+            det = rt.open_path("/entry12345/instrument")
+            self.assertEqual(det.name, "instrument")
+            self.assertTrue(rt.open_path("entry12345/instrument") is det)
+            self.assertEqual(
+                rt.open_path("/entry12345:NXentry/instrument/name").name,
+                "name")
+            self.assertRaises(
+                Exception, rt.open_path, "/entry12345/instrument/pilatus")
+            self.assertRaises(
+                Exception, rt.open_path, "/entry12345/instrument/name/a")
+
+            created = []
+            data = rt.open_path(
+                "/entry12345/instrument/pilatus:NXdetector/collection",
+                create=True, created=created)
+            self.assertEqual(
+                [(gr.name, nm) for gr, nm, _ in created],
+                [("instrument", "pilatus"), ("pilatus", "collection")])
+            self.assertTrue(created[1][2] is data)
+            self.assertEqual(
+                created[0][2].attributes["NX_class"][...], "NXdetector")
+            self.assertEqual(
+                data.attributes["NX_class"][...], "NXcollection")
+            self.assertTrue(
+                ins.open_path("pilatus/collection") is data)
+
+            det.remove("pilatus")
+            self.assertRaises(
+                Exception, rt.open_path, "/entry12345/instrument/pilatus")
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pygroup_create_field_cache(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            fd = rt.create_field(
+                "data", "uint16", [0, 10, 20], [4, 5, 10],
+                cache=[4194304, 1031])
+            self.assertEqual(tuple(fd.chunk), (4, 5, 10))
+            self.assertEqual(
+                fd.h5object.id.get_access_plist().get_chunk_cache()[:2],
+                (1031, 4194304))
+            fd.grow(0, 6)
+            fd[...] = [[[1] * 20] * 10] * 6
+            self.assertEqual(fd.read().sum(), 1200)
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pyfield_chunk_encoder(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            fields = []
+            for threads in [0, 3]:
+                dfilter = H5PYWriter.data_filter()
+                dfilter.rate = 2
+                dfilter.shuffle = True
+                dfilter.threads = threads
+                self.assertEqual(dfilter.threads, threads)
+                fd = rt.create_field(
+                    "data%s" % threads, "uint16", [0, 10, 20], [2, 5, 15],
+                    dfilter=dfilter)
+                self.assertEqual(fd.encoder is None, threads == 0)
+                value = [[[(f * 200 + y * 20 + x) % 7 for x in range(20)]
+                          for y in range(10)] for f in range(5)]
+                fd.grow(0, 2)
+                fd[0:2, ...] = value[:2]
+                fd.grow(0, 1)
+                fd[-1, ...] = value[2]
+                fd.grow(0, 2)
+                fd[3:, ...] = value[3:]
+                self.assertEqual(fd.read().tolist(), value)
+                fields.append(fd)
+            self.assertEqual(
+                fields[0].read_chunk((0, 0, 0)),
+                fields[1].read_chunk((0, 0, 0)))
+            self.assertEqual(
+                fields[0].read_chunk((4, 5, 15)),
+                fields[1].read_chunk((4, 5, 15)))
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pyfield_chunk_encoder_options(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+            rt = fl.root()
+
+            fd = H5PYWriter.H5PYField(
+                rt.h5object.create_dataset(
+                    "filled", (0, 4), "int32", chunks=(3, 4),
+                    maxshape=(None, 4), compression="gzip", fillvalue=-7),
+                rt)
+            self.assertEqual(fd.fillvalue, -7)
+            fd.encoder = FileWriter.chunk_encoder(fd, 2)
+            self.assertTrue(fd.encoder is not None)
+            self.assertEqual(fd.encoder.fillvalue, -7)
+            fd.grow(0, 4)
+            fd[...] = [[i * 4 + j for j in range(4)] for i in range(4)]
+            fd.grow(0, 2)
+            self.assertEqual(
+                fd.read().tolist(),
+                [[i * 4 + j for j in range(4)] for i in range(4)] +
+                [[-7] * 4] * 2)
+
+            self.assertTrue(FileWriter._supported(1, (4,), 2))
+            self.assertTrue(not FileWriter._supported(1, (4, 1), 2))
+            self.assertTrue(FileWriter._supported(2, (2,), 2))
+            self.assertTrue(not FileWriter._supported(2, (4,), 2))
+            self.assertTrue(not FileWriter._supported(307, (), 2))
+            if 32008 in FileWriter.CHUNK_ENCODERS:
+                self.assertTrue(
+                    FileWriter._supported(32008, (0, 3, 2, 0, 2), 2))
+                self.assertTrue(
+                    FileWriter._supported(32008, (0, 3, 2, 0, 0), 2))
+                self.assertTrue(
+                    not FileWriter._supported(32008, (0, 3, 2, 0, 3), 2))
+                self.assertTrue(
+                    not FileWriter._supported(32008, (0, 3, 4, 0, 2), 2))
+                self.assertTrue(
+                    not FileWriter._supported(32008, (0, 3, 2, 0, 3, 1), 2))
+            else:
+                self.assertTrue(
+                    not FileWriter._supported(32008, (0, 3, 2, 0, 2), 2))
+
+            pools = FileWriter._threadpools
+            self.assertTrue(pools)
+            FileWriter.close_threadpools()
+            self.assertEqual(pools, {})
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
+    def test_h5pyfield_direct_chunk(self):
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+        self._fname = '%s/%s%s.h5' % (
+            os.getcwd(), self.__class__.__name__, fun)
+
+        try:
+            fl = H5PYWriter.create_file(self._fname)
+
+            rt = fl.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            det = entry.create_group("detector", "NXdetector")
+
+            df1 = H5PYWriter.data_filter()
+            df1.rate = 2
+
+            fimage = det.create_field(
+                "intimage", "uint32", [2, 30], [1, 30], dfilter=df1)
+            fcopy = det.create_field(
+                "intcopy", "uint32", [0, 30], [1, 30], dfilter=df1)
+            fraw = det.create_field("intraw", "uint32", [0, 30], [1, 30])
+            fimage.write([list(range(30)), list(range(30, 60))])
+
+            self.assertEqual(fimage.filters, fcopy.filters)
+            self.assertEqual(len(fimage.filters), 1)
+            self.assertEqual(fimage.filters[0][0], 1)
+            self.assertEqual(fraw.filters, [])
+
+            fcopy.grow(0, 2)
+            for i in range(2):
+                mask, chunk = fimage.read_chunk((i, 0))
+                self.assertEqual(mask, 0)
+                fcopy.write_chunk((i, 0), chunk, mask)
+            self.assertEqual(fcopy.read().tolist(), fimage.read().tolist())
+            fl.close()
+        finally:
+            os.remove(self._fname)
+
     # default createfile test
     # \brief It tests default settings
     def test_h5pylink(self):
@@ -26,6 +26,7 @@ import random
 import struct
 import binascii
 import shutil
+import tempfile
 import fabio
 import numpy as np
 # import time
@@ -95,15 +96,17 @@ class NXSCollectTest(unittest.TestCase):
 
         self.helperror = "Error: too few arguments\n"
 
-        self.helpinfo = """usage: nxscollect [-h] {append,link} ...
+        self.helpinfo = """usage: nxscollect [-h] {append,follow,link,vds} ...
 
   Command-line tool to merge images of external file-formats """ + \
             """into the master NeXus file
 
 positional arguments:
-  {append,link}  sub-command help
+  {append,follow,link,vds}  sub-command help
     append       append images to the master file
+    follow       append images to the master file while they are written
     link         create an external or internal link in the master file
+    vds          create a virtual dataset in the master file
 
 optional arguments:
   -h, --help      show this help message and exit
@@ -1849,6 +1852,106 @@ For more help:
                 for i in range(6):
                     os.remove("h5test1_%05d.h5" % i)
 
+    def test_append_file_parameters_h5_prefetch(self):
+        """ test nxsconfig append file with h5 images opened in advance
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'h5test1_%05d.h5:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        attrs = {
+            "int": [-123, "NX_INT", "int64", (1,)],
+            "uint16": [123, "NX_UINT16", "uint16", (1,)],
+            "float32": [-12.345e-1, "NX_FLOAT32", "float32", (1,), 1.e-5],
+        }
+
+        commands = [
+            ('nxscollect append %s -r --prefetch 2 %s -i %s -p %s' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r --prefetch 8 --batch-frames 4'
+             ' %s -i %s -p %s' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r --prefetch 3 --workers 2'
+             ' %s -i %s -p %s' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r --prefetch 2 --chunk-copy'
+             ' %s -i %s -p %s' %
+             (filename, self.flags, ifiles, path)).split(),
+        ]
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+        for k in attrs.keys():
+            mlen = [self.__rnd.randint(10, 200),
+                    self.__rnd.randint(10, 200)]
+
+            attrs[k][0] = np.array(
+                [[[attrs[k][0] * self.__rnd.randint(0, 3)
+                   for c in range(mlen[1])]
+                  for i in range(mlen[0])]
+                 for _ in range(6)],
+                dtype=attrs[k][2]
+                )
+            try:
+                for i in range(6):
+                    fl = filewriter.create_file("h5test1_%05d.h5" % i, )
+                    rt = fl.root()
+                    entry = rt.create_group("entry", "NXentry")
+                    dgrp = entry.create_group("data", "NXdata")
+                    shp = attrs[k][0][i].shape
+                    data = dgrp.create_field(
+                        "data", attrs[k][2], shp, shp)
+                    data.write(attrs[k][0][i])
+                    data.close()
+                    fl.close()
+                for cmd in commands:
+                    nxsfile = filewriter.create_file(
+                        filename, overwrite=True)
+                    rt = nxsfile.root()
+                    entry = rt.create_group("entry12345", "NXentry")
+                    ins = entry.create_group("instrument", "NXinstrument")
+                    ins.create_group("pilatus300k", "NXdetector")
+                    entry.create_group("data", "NXdata")
+                    nxsfile.close()
+
+                    old_stdout = sys.stdout
+                    old_stderr = sys.stderr
+                    sys.stdout = mystdout = StringIO()
+                    sys.stderr = mystderr = StringIO()
+                    old_argv = sys.argv
+                    sys.argv = cmd
+                    nxscollect.main()
+
+                    sys.argv = old_argv
+                    sys.stdout = old_stdout
+                    sys.stderr = old_stderr
+                    vl = mystdout.getvalue()
+                    er = mystderr.getvalue()
+
+                    self.assertEqual('', er)
+                    svl = vl.split("\n")
+                    for i in range(1, 7):
+                        self.assertTrue(svl[i].startswith(' * append '))
+                        self.assertTrue(
+                            svl[i].endswith('test1_%05d.h5 ' % (i - 1)))
+
+                    nxsfile = filewriter.open_file(filename, readonly=True)
+                    rt = nxsfile.root()
+                    dt = rt.open("entry12345").open("instrument").open(
+                        "pilatus300k").open("data")
+                    buffer = dt.read()
+                    self.assertEqual(buffer.shape, attrs[k][0].shape)
+                    for i in range(6):
+                        self.assertTrue(
+                            (buffer[i, :, :] == attrs[k][0][i]).all())
+                    nxsfile.close()
+                    os.remove(filename)
+
+            finally:
+                for i in range(6):
+                    os.remove("h5test1_%05d.h5" % i)
+
     def test_append_file_parameters_tif(self):
         """ test nxsconfig append file with a tif postrun field
         """
@@ -2502,12 +2605,1225 @@ For more help:
                 os.remove(filename)
 
         finally:
-            os.remove('./test1_00000.cbf')
-            os.remove('./test1_00001.cbf')
-            os.remove('./test1_00002.cbf')
-            os.remove('./test1_00003.cbf')
-            os.remove('./test1_00004.cbf')
-            os.remove('./test1_00005.cbf')
+            os.remove('./test1_00000.cbf')
+            os.remove('./test1_00001.cbf')
+            os.remove('./test1_00002.cbf')
+            os.remove('./test1_00003.cbf')
+            os.remove('./test1_00004.cbf')
+            os.remove('./test1_00005.cbf')
+
+    def test_append_file_parameters_tif_slices(self):
+        """ test nxsconfig append file with tif images given by
+        index ranges with steps and exclusions
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('test1_%05d.tif:0:4:2,!2,5:5', [0, 4, 5]),
+            ('test1_%05d.tif:0:5,!1:3', [0, 4, 5]),
+            ('test1_%05d.tif:4:5;test1_%05d.tif:0:3:3', [4, 5, 0, 3]),
+            ('test1_%05d.tif:0:5,!x', []),
+            ('test1_%05d.tif:0:5:0', []),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            for ifiles, indices in commands:
+                cmd = ('nxscollect append %s -r %s -p %s' %
+                       (filename, self.flags, path)).split()
+                cmd.extend(['-i', ifiles])
+                if ";" in ifiles:
+                    cmd.extend(['--separator', ';'])
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                if not indices:
+                    self.assertEqual(len(svl), 3)
+                    self.assertTrue(svl[1].startswith('FilenameGenerator: '))
+                else:
+                    self.assertEqual(len(svl), len(indices) + 2)
+                for k, i in enumerate(indices):
+                    self.assertTrue(svl[k + 1].startswith(' * append '))
+                    self.assertTrue(
+                        svl[k + 1].endswith('test1_%05d.tif ' % i))
+
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                det = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k")
+                if not indices:
+                    self.assertEqual(det.names(), [])
+                else:
+                    buffer = det.open("data").read()
+                    self.assertEqual(buffer.shape, (len(indices), 195, 487))
+                    for k, i in enumerate(indices):
+                        fimage = fabio.open(
+                            './test1_%05d.tif' % i).data[...]
+                        self.assertTrue((buffer[k, :, :] == fimage).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_workers(self):
+        """ test nxsconfig append file with tif images decoded by workers
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('nxscollect append  %s %s -i %s -p %s --workers 2' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r %s -i %s --path %s --workers 3' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append  %s -r -s %s --input-files %s -p %s'
+             ' --workers 4' %
+             (filename, self.flags, ifiles, path)).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            for cmd in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                self.assertEqual(len(svl), 8)
+                for i in range(1, 7):
+                    self.assertTrue(svl[i].startswith(' * append '))
+                    self.assertTrue(
+                        svl[i].endswith('test1_%05d.tif ' % (i - 1)))
+
+                if '-r' not in cmd:
+                    os.remove("%s.__nxscollect_old__" % filename)
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                for i in range(6):
+                    fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                    self.assertTrue((buffer[i, :, :] == fimage).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_one_worker(self):
+        """ test nxsconfig append file with tif images decoded
+        by one worker process
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        pools = []
+        pool = nxscollect.multiprocessing.Pool
+
+        def _pool(processes, *args, **kwargs):
+            pools.append(processes)
+            return pool(processes, *args, **kwargs)
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            nxscollect.multiprocessing.Pool = _pool
+            chunks = []
+            for workers in [0, 1]:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = ('nxscollect append %s -r %s -i %s -p %s'
+                            ' --workers %s' % (
+                                filename, self.flags, ifiles, path,
+                                workers)).split()
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                self.assertEqual('', mystderr.getvalue())
+                self.assertEqual(pools, [1] if workers else [])
+
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                dt = nxsfile.root().open("entry12345").open(
+                    "instrument").open("pilatus300k").open("data")
+                self.assertEqual(tuple(dt.shape), (6, 195, 487))
+                chunks.append(
+                    [dt.read_chunk((i, 0, 0)) for i in range(6)])
+                nxsfile.close()
+                os.remove(filename)
+            self.assertEqual(chunks[0], chunks[1])
+        finally:
+            nxscollect.multiprocessing.Pool = pool
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_dirindex(self):
+        """ test nxsconfig append file with tif images found
+        in the directory index
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        scanned = []
+        scandir = getattr(os, "scandir", None)
+
+        def _scandir(dirname):
+            scanned.append(dirname)
+            return scandir(dirname)
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            ins.create_group("pilatus300k", "NXdetector")
+            nxsfile.close()
+
+            if scandir is not None:
+                os.scandir = _scandir
+            old_stdout = sys.stdout
+            old_stderr = sys.stderr
+            sys.stdout = mystdout = StringIO()
+            sys.stderr = mystderr = StringIO()
+            old_argv = sys.argv
+            sys.argv = ('nxscollect append %s -r %s -i %s -p %s' % (
+                filename, self.flags, ifiles, path)).split()
+            try:
+                nxscollect.main()
+            finally:
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                if scandir is not None:
+                    os.scandir = scandir
+            self.assertEqual('', mystderr.getvalue())
+            appended = [ln for ln in mystdout.getvalue().split("\n")
+                        if ln.startswith(' * append ')]
+            self.assertEqual(len(appended), 6)
+            if scandir is not None:
+                self.assertTrue(scanned)
+                self.assertEqual(len(scanned), len(set(scanned)))
+
+            nxsfile = filewriter.open_file(filename, readonly=True)
+            buffer = nxsfile.root().open("entry12345").open(
+                "instrument").open("pilatus300k").open("data").read()
+            self.assertEqual(buffer.shape, (6, 195, 487))
+            for i in range(6):
+                fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                self.assertTrue((buffer[i, :, :] == fimage).all())
+            nxsfile.close()
+            os.remove(filename)
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_collector_findfile(self):
+        """ test image files created or removed after
+        their directory was listed
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        dirname = tempfile.mkdtemp()
+        old_stdout = sys.stdout
+        try:
+            collector = nxscollect.Collector(
+                os.path.join(dirname, 'testcollect.nxs'), skipmissing=True)
+            first = os.path.join(dirname, 'test1_00000.tif')
+            later = os.path.join(dirname, 'test1_00001.tif')
+            never = os.path.join(dirname, 'test1_00002.tif')
+            shutil.copy2('test/files/test_file0.tif', first)
+
+            sys.stdout = mystdout = StringIO()
+            self.assertEqual(collector._findfile(first), first)
+            self.assertEqual(collector._findfile(later), None)
+            # created after the directory was listed
+            shutil.copy2('test/files/test_file1.tif', later)
+            self.assertEqual(collector._findfile(later), later)
+            self.assertEqual(collector._findfile(never), None)
+            sys.stdout = old_stdout
+            vl = mystdout.getvalue()
+            self.assertTrue(
+                "Cannot open any of %s files" % [later] in vl)
+            self.assertTrue(
+                "Cannot open any of %s files" % [never] in vl)
+
+            # removed after the directory was listed
+            os.remove(first)
+            sys.stdout = mystdout = StringIO()
+            self.assertEqual(collector._findfile(first), first)
+            self.assertEqual(
+                collector._loadimage(first), (None, None, None))
+            self.assertEqual(collector._findfile(first), None)
+            sys.stdout = old_stdout
+            self.assertEqual(
+                mystdout.getvalue().split("\n")[:2],
+                ["Cannot open a file %s" % first,
+                 "Cannot open any of %s files" % [first]])
+        finally:
+            sys.stdout = old_stdout
+            shutil.rmtree(dirname)
+
+    def test_append_file_parameters_tif_jobs(self):
+        """ test nxsconfig append files with tif images collected
+        by parallel jobs
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filenames = ['testcollect%s.nxs' % i for i in range(3)]
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('nxscollect append %s -r %s -i %s -p %s --jobs 2' %
+             (" ".join(filenames), self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r %s -i %s -p %s --jobs 4'
+             ' --batch-frames 2' %
+             (" ".join(filenames), self.flags, ifiles, path)).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            for cmd in commands:
+                for filename in filenames:
+                    nxsfile = filewriter.create_file(
+                        filename, overwrite=True)
+                    rt = nxsfile.root()
+                    entry = rt.create_group("entry12345", "NXentry")
+                    ins = entry.create_group("instrument", "NXinstrument")
+                    ins.create_group("pilatus300k", "NXdetector")
+                    entry.create_group("data", "NXdata")
+                    nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                self.assertEqual(len(svl), 27)
+                for k in range(3):
+                    self.assertTrue(svl[7 * k].startswith('populate: '))
+                    for i in range(6):
+                        ln = svl[7 * k + i + 1]
+                        self.assertTrue(ln.startswith(' * append '))
+                        self.assertTrue(ln.endswith('test1_%05d.tif ' % i))
+                self.assertEqual(svl[21], 'summary:')
+                for k, filename in enumerate(filenames):
+                    self.assertTrue(
+                        svl[22 + k].startswith(
+                            ' * %s: 6 frames, ' % filename))
+                self.assertTrue(
+                    svl[25].startswith('total: 3 files, 18 frames, '))
+
+                for filename in filenames:
+                    nxsfile = filewriter.open_file(filename, readonly=True)
+                    rt = nxsfile.root()
+                    dt = rt.open("entry12345").open("instrument").open(
+                        "pilatus300k").open("data")
+                    buffer = dt.read()
+                    self.assertEqual(buffer.shape, (6, 195, 487))
+                    for i in range(6):
+                        fimage = fabio.open(
+                            './test1_%05d.tif' % i).data[...]
+                        self.assertTrue((buffer[i, :, :] == fimage).all())
+                    nxsfile.close()
+                    os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+            for filename in filenames:
+                if os.path.exists(filename):
+                    os.remove(filename)
+
+    def test_append_file_parameters_tif_batch(self):
+        """ test nxsconfig append file with tif images written in blocks
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('nxscollect append  %s %s -i %s -p %s --batch-frames 2' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r %s -i %s --path %s --batch-frames 4' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append  %s -r -s %s --input-files %s -p %s'
+             ' --batch-frames 10 --workers 2' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r %s -i %s -p %s --batch-frames 2'
+             ' --flush-frames 3' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r %s -i %s -p %s --flush-frames 1'
+             ' --flush-interval 0.01' %
+             (filename, self.flags, ifiles, path)).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            for cmd in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                self.assertEqual(len(svl), 8)
+                for i in range(1, 7):
+                    self.assertTrue(svl[i].startswith(' * append '))
+                    self.assertTrue(
+                        svl[i].endswith('test1_%05d.tif ' % (i - 1)))
+
+                if '-r' not in cmd:
+                    os.remove("%s.__nxscollect_old__" % filename)
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                for i in range(6):
+                    fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                    self.assertTrue((buffer[i, :, :] == fimage).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_profile(self):
+        """ test nxsconfig append file with tif images and stage profiling
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        profilename = 'testcollect_profile.json'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('nxscollect append %s -r %s -i %s -p %s --profile'
+             ' --batch-frames 2 --flush-frames 2' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r %s -i %s -p %s --profile-file %s' %
+             (filename, self.flags, ifiles, path, profilename)).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            for cmd in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                for i in range(1, 7):
+                    self.assertTrue(svl[i].startswith(' * append '))
+                    self.assertTrue(
+                        svl[i].endswith('test1_%05d.tif ' % (i - 1)))
+                self.assertEqual(svl[8], 'Profile of %s' % filename)
+                stages = [ln.split()[0] for ln in svl[13:]
+                          if ln and not ln.startswith("=")]
+                self.assertEqual(stages[-1], "total")
+                for stage in ["tempfile", "findfile", "loadimage",
+                              "getfield", "write", "close"]:
+                    self.assertTrue(stage in stages)
+                self.assertEqual("flush" in stages, '--profile' in cmd)
+                wline = [ln for ln in svl[13:] if ln.startswith("write ")]
+                self.assertEqual(wline[0].split()[1],
+                                 '3' if '--profile' in cmd else '6')
+
+                if '--profile' not in cmd:
+                    with open(profilename) as fl:
+                        records = [json.loads(ln) for ln in fl]
+                    self.assertEqual(len(records), 1)
+                    self.assertEqual(records[0]["file"], filename)
+                    self.assertEqual(records[0]["frames"], 6)
+                    self.assertEqual(
+                        records[0]["stages"]["write"]["calls"], 6)
+                    self.assertEqual(
+                        records[0]["stages"]["write"]["bytes"],
+                        6 * 195 * 487 * 4)
+
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+            if os.path.exists(profilename):
+                os.remove(profilename)
+
+    def test_append_file_parameters_tif_chunk(self):
+        """ test nxsconfig append file with tif images and a chunk policy
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            (('nxscollect append %s -r %s -i %s -p %s'
+              ' --chunk 4,100,1000' %
+              (filename, self.flags, ifiles, path)).split(),
+             (4, 100, 487)),
+            (('nxscollect append %s -r %s -i %s -p %s'
+              ' --chunk 100,200 --chunk-cache-size 4194304' %
+              (filename, self.flags, ifiles, path)).split(),
+             (1, 100, 200)),
+            (('nxscollect append %s -r %s -i %s -p %s'
+              ' --chunk auto --chunk-bytes 1048576 --batch-frames 3' %
+              (filename, self.flags, ifiles, path)).split(),
+             (11, 195, 122)),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            images = []
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+                images.append(fabio.open('./test1_%05d.tif' % i).data)
+            for cmd, chunk in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                for i in range(1, 7):
+                    self.assertTrue(svl[i].startswith(' * append '))
+
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                self.assertEqual(tuple(dt.chunk), chunk)
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                for i in range(6):
+                    self.assertTrue((buffer[i] == images[i]).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_compression_threads(self):
+        """ test nxsconfig append file with tif images compressed in threads
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            (('nxscollect append %s -r %s -i %s -p %s -c 2'
+              ' --compression-threads 3 --batch-frames 4' %
+              (filename, self.flags, ifiles, path)).split(),
+             (1, 195, 487)),
+            (('nxscollect append %s -r %s -i %s -p %s -c 1'
+              ' --compression-threads 2 --chunk 4,100,200' %
+              (filename, self.flags, ifiles, path)).split(),
+             (4, 100, 200)),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            images = []
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+                images.append(fabio.open('./test1_%05d.tif' % i).data)
+            for cmd, chunk in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                for i in range(1, 7):
+                    self.assertTrue(svl[i].startswith(' * append '))
+
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                self.assertEqual(tuple(dt.chunk), chunk)
+                self.assertEqual(dt.filters[-1][0], 1)
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                for i in range(6):
+                    self.assertTrue((buffer[i] == images[i]).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_inplace(self):
+        """ test nxsconfig append file with tif images in the in-place mode
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        ifiles = 'test1_%05d.tif:0:5'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('nxscollect append %s --in-place %s -i %s -p %s' %
+             (filename, self.flags, ifiles, path)).split(),
+            ('nxscollect append %s -r --in-place %s -i %s -p %s'
+             ' --batch-frames 4' %
+             (filename, self.flags, ifiles, path)).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            for cmd in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                self.assertEqual(len(svl), 8)
+                for i in range(1, 7):
+                    self.assertTrue(svl[i].startswith(' * append '))
+                    self.assertTrue(
+                        svl[i].endswith('test1_%05d.tif ' % (i - 1)))
+
+                if '-r' not in cmd:
+                    os.remove("%s.__nxscollect_old__" % filename)
+                self.assertEqual(
+                    [fl for fl in os.listdir(".")
+                     if fl.startswith("%s.__nxscollect" % filename)], [])
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                for i in range(6):
+                    fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                    self.assertTrue((buffer[i, :, :] == fimage).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_inplace_rollback(self):
+        """ test nxsconfig append file in the in-place mode
+        rolled back because of missing images
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        commands = [
+            ('test1_%05d.tif:0:3',
+             '/entry12345/instrument/pilatus300k/data'),
+            ('test1_%05d.tif:4:7',
+             '/entry12345/instrument/pilatus300k/data'),
+            ('test1_%05d.tif:4:5,test2.tif',
+             '/entry12345/instrument/pilatus300k/data'),
+            ('test2.tif',
+             '/entry12345/instrument/lambda/data'),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            nxsfile = filewriter.create_file(
+                filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            entry.create_group("data", "NXdata")
+            nxsfile.close()
+
+            for ifiles, path in commands:
+                cmd = ('nxscollect append %s -r --in-place %s -i %s'
+                       ' -p %s --batch-frames 2' %
+                       (filename, self.flags, ifiles, path)).split()
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                er = mystderr.getvalue()
+                self.assertEqual('', er)
+
+                self.assertEqual(
+                    [fl for fl in os.listdir(".")
+                     if fl.startswith("%s.__nxscollect" % filename)], [])
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                ins = rt.open("entry12345").open("instrument")
+                self.assertEqual(ins.names(), ["pilatus300k"])
+                dt = ins.open("pilatus300k").open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (4, 195, 487))
+                for i in range(4):
+                    fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                    self.assertTrue((buffer[i, :, :] == fimage).all())
+                nxsfile.close()
+            os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_append_file_parameters_tif_resume(self):
+        """ test nxsconfig append file with tif images resumed with a ledger
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        path = '/entry12345/instrument/pilatus300k/data'
+        # (input files, appended files, frames, file changed before)
+        commands = [
+            ('test1_%05d.tif:0:2', [0, 1, 2], 3, None),
+            ('test1_%05d.tif:0:2', [], 3, None),
+            ('test1_%05d.tif:0:7', [3, 4, 5], 6, None),
+            ('test1_%05d.tif:0:5', [], 6, None),
+            ('test1_%05d.tif:0:7', [4, 5], 6, 4),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+            nxsfile = filewriter.create_file(
+                filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            entry.create_group("data", "NXdata")
+            nxsfile.close()
+
+            for ifiles, appended, nframes, changed in commands:
+                if changed is not None:
+                    shutil.copy2('test/files/test_file0.tif',
+                                 './test1_%05d.tif' % changed)
+                    os.utime('./test1_%05d.tif' % changed, (0, 0))
+                cmd = ('nxscollect append %s -r --resume %s -i %s'
+                       ' -p %s --batch-frames 2' %
+                       (filename, self.flags, ifiles, path)).split()
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+                self.assertEqual('', er)
+                self.assertEqual(
+                    "resume: test1_%05d.tif has changed" % (changed or 0)
+                    in vl, changed is not None)
+                svl = [line for line in vl.split("\n")
+                       if line.startswith(" * append ")]
+                self.assertEqual(len(svl), len(appended))
+                for line, i in zip(svl, appended):
+                    self.assertTrue(line.endswith('test1_%05d.tif ' % i))
+
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                det = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k")
+                buffer = det.open("data").read()
+                self.assertEqual(buffer.shape, (nframes, 195, 487))
+                for i in range(nframes):
+                    fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                    self.assertTrue((buffer[i, :, :] == fimage).all())
+                rows = det.open("data_nxscollect_ledger").read()
+                self.assertEqual(len(rows), nframes)
+                for i, row in enumerate(rows):
+                    if isinstance(row, bytes):
+                        row = row.decode()
+                    row = json.loads(row)
+                    self.assertEqual(row["file"], 'test1_%05d.tif' % i)
+                    self.assertEqual(row["index"], i)
+                    self.assertEqual(row["frames"], 1)
+                    self.assertEqual(
+                        row["size"],
+                        os.path.getsize('./test1_%05d.tif' % i))
+                    self.assertEqual(
+                        row["mtime"],
+                        os.path.getmtime('./test1_%05d.tif' % i))
+                nxsfile.close()
+            os.remove(filename)
+
+            # a field without a ledger cannot be resumed
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            det = entry.create_group(
+                "instrument", "NXinstrument").create_group(
+                    "pilatus300k", "NXdetector")
+            det.create_field(
+                "data", "int32", [1, 195, 487], [1, 195, 487])
+            nxsfile.close()
+            cmd = ('nxscollect append %s -r --resume %s -i %s'
+                   ' -p %s' % (filename, self.flags,
+                               'test1_%05d.tif:0:2', path)).split()
+            old_stdout = sys.stdout
+            old_stderr = sys.stderr
+            sys.stdout = mystdout = StringIO()
+            sys.stderr = StringIO()
+            old_argv = sys.argv
+            sys.argv = cmd
+            nxscollect.main()
+
+            sys.argv = old_argv
+            sys.stdout = old_stdout
+            sys.stderr = old_stderr
+            self.assertTrue(
+                "data has no ledger of appended files and cannot be resumed"
+                in mystdout.getvalue())
+            nxsfile = filewriter.open_file(filename, readonly=True)
+            self.assertEqual(
+                nxsfile.root().open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data").shape, (1, 195, 487))
+            nxsfile.close()
+            os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_follow_file_parameters_tif(self):
+        """ test nxsconfig follow file with tif images
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        path = '/entry12345/instrument/pilatus300k/data'
+        commands = [
+            ('nxscollect follow %s %s -i test1_%%05d.tif:0:5 -p %s'
+             ' --poll-interval 0.01 --batch-frames 4' %
+             (filename, self.flags, path)).split(),
+            ('nxscollect follow %s %s -i test1_%%05d.tif:0:7 -p %s'
+             ' --poll-interval 0.01 --timeout 0.1 -s' %
+             (filename, self.flags, path)).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i in range(6):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+                os.utime('./test1_%05d.tif' % i, (0, 0))
+            for cmd in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                ins = entry.create_group("instrument", "NXinstrument")
+                ins.create_group("pilatus300k", "NXdetector")
+                entry.create_group("data", "NXdata")
+                nxsfile.close()
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                self.assertTrue(svl[0].startswith('populate: '))
+                appended = [ln for ln in svl if ln.startswith(' * append ')]
+                self.assertEqual(len(appended), 6)
+                for i, ln in enumerate(appended):
+                    self.assertTrue(ln.endswith('test1_%05d.tif ' % i))
+                timeouts = [ln for ln in svl if ln.startswith('Timeout: ')]
+                self.assertEqual(len(timeouts), 2 if '-s' in cmd else 0)
+
+                self.assertEqual(
+                    [fl for fl in os.listdir(".")
+                     if fl.startswith("%s.__nxscollect" % filename)], [])
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                dt = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k").open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, (6, 195, 487))
+                for i in range(6):
+                    fimage = fabio.open('./test1_%05d.tif' % i).data[...]
+                    self.assertTrue((buffer[i, :, :] == fimage).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(6):
+                os.remove('./test1_%05d.tif' % i)
+
+    def test_follow_file_inotify(self):
+        """ test nxsconfig follow file with a stubbed inotify notifier
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        path = '/entry12345/instrument/pilatus300k/data'
+        cmd = ('nxscollect follow %s %s -i test1_%%05d.tif:0:3 -p %s'
+               ' --poll-interval 0.01 --timeout 0.1 -s' %
+               (filename, self.flags, path)).split()
+        watched = []
+
+        class ProcessEvent(object):
+
+            def __call__(self, event):
+                pass
+
+        class WatchManager(object):
+
+            def add_watch(self, dirname, mask):
+                watched.append(dirname)
+
+        class Notifier(object):
+            # processes events as pyinotify does
+
+            def __init__(self, manager, default_proc_fun=None, timeout=None):
+                self.procfun = default_proc_fun
+
+            def check_events(self):
+                return True
+
+            def read_events(self):
+                pass
+
+            def process_events(self):
+                event = "<Event dir=False mask=0x8 name=test1_00002.tif>"
+                if self.procfun is None:
+                    print(event)
+                else:
+                    self.procfun(event)
+
+            def stop(self):
+                pass
+
+        class PyInotify(object):
+            IN_CREATE = 0x100
+            IN_CLOSE_WRITE = 0x8
+            IN_MOVED_TO = 0x80
+
+        pyinotify = PyInotify()
+        pyinotify.ProcessEvent = ProcessEvent
+        pyinotify.WatchManager = WatchManager
+        pyinotify.Notifier = Notifier
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+        oldpyinotify = nxscollect.pyinotify
+        nxscollect.pyinotify = pyinotify
+
+        try:
+            for i in range(2):
+                shutil.copy2('test/files/test_file%s.tif' % i,
+                             './test1_%05d.tif' % i)
+                os.utime('./test1_%05d.tif' % i, (0, 0))
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            ins.create_group("pilatus300k", "NXdetector")
+            nxsfile.close()
+
+            old_stdout = sys.stdout
+            old_stderr = sys.stderr
+            sys.stdout = mystdout = StringIO()
+            sys.stderr = mystderr = StringIO()
+            old_argv = sys.argv
+            sys.argv = cmd
+            nxscollect.main()
+
+            sys.argv = old_argv
+            sys.stdout = old_stdout
+            sys.stderr = old_stderr
+            vl = mystdout.getvalue()
+            er = mystderr.getvalue()
+
+            self.assertEqual('', er)
+            self.assertTrue("<Event" not in vl)
+            self.assertEqual(set(watched), set([os.getcwd()]))
+            svl = vl.split("\n")
+            appended = [ln for ln in svl if ln.startswith(' * append ')]
+            self.assertEqual(len(appended), 2)
+            timeouts = [ln for ln in svl if ln.startswith('Timeout: ')]
+            self.assertEqual(len(timeouts), 2)
+            os.remove(filename)
+        finally:
+            nxscollect.pyinotify = oldpyinotify
+            for i in range(2):
+                os.remove('./test1_%05d.tif' % i)
 
     def test_append_file_parameters_raw(self):
         """ test nxsconfig append file with a cbf postrun field
@@ -2629,6 +3945,101 @@ For more help:
                 for i in range(6):
                     os.remove("rawtest1_%05d.dat" % i)
 
+    def test_append_file_parameters_raw_stack(self):
+        """ test nxsconfig append file with raw files of several frames
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        attrs = {
+            "int": [-123, "NX_INT", "int64", (1,)],
+            "uint8": [12, "NX_UINT8", "uint8", (1,)],
+            "float32": [-12.345e-1, "NX_FLOAT32", "float32", (1,), 1.e-5],
+        }
+
+        commands = [
+            ('nxscollect append %s -r --raw-offset 16 %s' %
+             (filename, self.flags)).split(),
+            ('nxscollect append %s -r --raw-offset 16 --batch-frames 2 %s' %
+             (filename, self.flags)).split(),
+            ('nxscollect append %s --raw-offset 16 --batch-frames 4 %s' %
+             (filename, self.flags)).split(),
+        ]
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+        for k in attrs.keys():
+            mlen = [self.__rnd.randint(10, 200),
+                    self.__rnd.randint(10, 200)]
+
+            attrs[k][0] = np.array(
+                [[[attrs[k][0] * self.__rnd.randint(0, 3)
+                   for c in range(mlen[1])]
+                  for i in range(mlen[0])]
+                 for _ in range(6)],
+                dtype=attrs[k][2]
+                )
+            try:
+                for i in range(2):
+                    with open("rawtest1_%05d.dat" % i, "wb") as fl:
+                        fl.write(b"H" * 16)
+                        attrs[k][0][3 * i:3 * i + 3].tofile(fl)
+                for cmd in commands:
+                    nxsfile = filewriter.create_file(
+                        filename, overwrite=True)
+                    rt = nxsfile.root()
+                    entry = rt.create_group("entry12345", "NXentry")
+                    entry.create_group("data", "NXdata")
+                    nxsfile.close()
+                    pcmd = cmd
+                    pcmd.extend(["-i", "rawtest1_%05d.dat:0:1"])
+                    pcmd.extend(
+                        ["-p", '/entry12345/instrument/pilatus300k/data'])
+                    pcmd.extend(
+                        ["--shape", json.dumps(attrs[k][0].shape[1:])])
+                    pcmd.extend(
+                        ["--dtype", attrs[k][2]])
+
+                    old_stdout = sys.stdout
+                    old_stderr = sys.stderr
+                    sys.stdout = mystdout = StringIO()
+                    sys.stderr = mystderr = StringIO()
+                    old_argv = sys.argv
+                    sys.argv = pcmd
+                    nxscollect.main()
+
+                    sys.argv = old_argv
+                    sys.stdout = old_stdout
+                    sys.stderr = old_stderr
+                    vl = mystdout.getvalue()
+                    er = mystderr.getvalue()
+
+                    self.assertEqual('', er)
+                    svl = vl.split("\n")
+                    self.assertEqual(len(svl), 4)
+                    for i in range(1, 3):
+                        self.assertTrue(svl[i].startswith(' * append '))
+                        self.assertTrue(
+                            svl[i].endswith('test1_%05d.dat ' % (i - 1)))
+
+                    if '-r' not in cmd:
+                        os.remove("%s.__nxscollect_old__" % filename)
+                    nxsfile = filewriter.open_file(filename, readonly=True)
+                    rt = nxsfile.root()
+                    dt = rt.open("entry12345").open("instrument").open(
+                        "pilatus300k").open("data")
+                    buffer = dt.read()
+                    self.assertEqual(buffer.shape, attrs[k][0].shape)
+                    for i in range(6):
+                        self.assertTrue(
+                            (buffer[i, :, :] == attrs[k][0][i]).all())
+                    nxsfile.close()
+                    os.remove(filename)
+
+            finally:
+                for i in range(2):
+                    os.remove("rawtest1_%05d.dat" % i)
+
     def test_append_file_parameters_nxs(self):
         """ test nxsconfig append file with a cbf postrun field
         """
@@ -3351,6 +4762,128 @@ For more help:
                 for i in range(6):
                     os.remove("h5test1_%05d.nxs" % i)
 
+    def test_append_file_parameters_nxs_chunkcopy(self):
+        """ test nxsconfig append file with nxs images copied chunk by chunk
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        attrs = {
+            "int": [-123, "NX_INT", "int64", (1,)],
+            "uint16": [123, "NX_UINT16", "uint16", (1,)],
+            "float32": [-12.345e-1, "NX_FLOAT32", "float32", (1,), 1.e-5],
+        }
+
+        commands = [
+            ('nxscollect append %s -r --chunk-copy %s' %
+             (filename, self.flags)).split(),
+            ('nxscollect append %s -r --chunk-copy --batch-frames 4 %s' %
+             (filename, self.flags)).split(),
+            ('nxscollect append %s -r --chunk-copy -c 3 %s' %
+             (filename, self.flags)).split(),
+            ('nxscollect append %s -r --chunk-copy -c 0 %s' %
+             (filename, self.flags)).split(),
+        ]
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+        for k in attrs.keys():
+            mlen = [self.__rnd.randint(10, 200),
+                    self.__rnd.randint(10, 200)]
+
+            attrs[k][0] = np.array(
+                [[[attrs[k][0] * self.__rnd.randint(0, 3)
+                   for c in range(mlen[1])]
+                  for i in range(mlen[0])]
+                 for _ in range(6)],
+                dtype=attrs[k][2]
+                )
+            try:
+                for i in range(6):
+                    fl = filewriter.create_file("h5test1_%05d.nxs" % i)
+                    rt = fl.root()
+                    entry = rt.create_group("entry345", "NXentry")
+
+                    dt = entry.create_group("data", "NXdata")
+
+                    shp = attrs[k][0][i].shape
+                    cfilter = filewriter.data_filter(dt)
+                    cfilter.rate = 2
+                    data = dt.create_field(
+                        "data", attrs[k][2], shp, shp, dfilter=cfilter)
+                    data.write(attrs[k][0][i])
+                    data.close()
+
+                    dt.close()
+                    entry.close()
+                    fl.close()
+
+                for cmd in commands:
+                    nxsfile = filewriter.create_file(
+                        filename, overwrite=True)
+                    rt = nxsfile.root()
+                    entry = rt.create_group("entry12345", "NXentry")
+                    ins = entry.create_group("instrument", "NXinstrument")
+                    entry.create_group("data", "NXdata")
+                    nxsfile.close()
+
+                    pcmd = cmd
+                    pcmd.extend(
+                        ["-i", "h5test1_%05d.nxs://entry345/data/data:0:5"])
+                    pcmd.extend(
+                        ["-p", '/entry12345/instrument/pilatus300k/data'])
+
+                    old_stdout = sys.stdout
+                    old_stderr = sys.stderr
+                    sys.stdout = mystdout = StringIO()
+                    sys.stderr = mystderr = StringIO()
+                    old_argv = sys.argv
+                    sys.argv = pcmd
+                    nxscollect.main()
+
+                    sys.argv = old_argv
+                    sys.stdout = old_stdout
+                    sys.stderr = old_stderr
+                    vl = mystdout.getvalue()
+                    er = mystderr.getvalue()
+
+                    self.assertEqual('', er)
+                    svl = vl.split("\n")
+                    print(vl)
+                    self.assertEqual(len(svl), 8)
+                    for i in range(1, 7):
+                        self.assertTrue(svl[i].startswith(' * append '))
+                        self.assertTrue(
+                            svl[i].endswith('test1_%05d.nxs ' % (i - 1)))
+
+                    nxsfile = filewriter.open_file(filename, readonly=True)
+                    rt = nxsfile.root()
+                    entry = rt.open("entry12345")
+                    ins = entry.open("instrument")
+                    det = ins.open("pilatus300k")
+                    dt = det.open("data")
+                    buffer = dt.read()
+                    self.assertEqual(buffer.shape, attrs[k][0].shape)
+                    for i in range(6):
+                        fimage = attrs[k][0][i]
+                        image = buffer[i, :, :]
+                        self.assertTrue((image == fimage).all())
+                    if '-c' not in cmd:
+                        fl = filewriter.open_file(
+                            "h5test1_00003.nxs", readonly=True)
+                        sdt = fl.root().open("entry345").open(
+                            "data").open("data")
+                        self.assertEqual(
+                            dt.read_chunk((3, 0, 0)),
+                            sdt.read_chunk((0, 0)))
+                        fl.close()
+                    nxsfile.close()
+                    os.remove(filename)
+
+            finally:
+                for i in range(6):
+                    os.remove("h5test1_%05d.nxs" % i)
+
     def test_test_file_withpostrun_tif(self):
         """ test nxsconfig test file with a tif postrun field
         """
@@ -5568,6 +7101,8 @@ For more help:
         commands = [
             ('nxscollect link %s' % (self.flags)).split(),
             ('nxscollect link -r %s' % (self.flags)).split(),
+            ('nxscollect link --in-place %s' % (self.flags)).split(),
+            ('nxscollect link -r --in-place %s' % (self.flags)).split(),
         ]
         wrmodule = WRITERS[self.writer]
         filewriter.writer = wrmodule
@@ -5777,6 +7312,153 @@ For more help:
             finally:
                 os.remove("h5test1_00001.nxs")
 
+    def test_vds_external_nxs(self):
+        """ test nxscollect vds with external nxs fields
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = 'testcollect.nxs'
+        path = '%s://entry12345/instrument/pilatus300k:NXdetector/data' \
+            % filename
+        commands = [
+            ('nxscollect vds %s %s' % (path, self.flags)).split(),
+            ('nxscollect vds -r %s %s' % (path, self.flags)).split(),
+            ('nxscollect vds -r %s --fill-value 7 %s' %
+             (path, self.flags)).split(),
+        ]
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+        if not wrmodule.is_vds_supported():
+            print("Skip the test")
+            return
+        mlen = [self.__rnd.randint(10, 50),
+                self.__rnd.randint(10, 50)]
+        images = np.array(
+            [[[self.__rnd.randint(0, 100)
+               for c in range(mlen[1])]
+              for i in range(mlen[0])]
+             for _ in range(6)],
+            dtype="uint32")
+        try:
+            for i, frames in enumerate([[0, 1], [2, 3, 4]]):
+                fl = filewriter.create_file("h5test1_%05d.nxs" % i)
+                rt = fl.root()
+                entry = rt.create_group("entry345", "NXentry")
+                dt = entry.create_group("data", "NXdata")
+                shp = images[frames].shape
+                data = dt.create_field("data", "uint32", shp, shp)
+                data.write(images[frames])
+                data.close()
+                dt.close()
+                entry.close()
+                fl.close()
+            fl = filewriter.create_file("h5test1_00002.nxs")
+            rt = fl.root()
+            entry = rt.create_group("entry345", "NXentry")
+            dt = entry.create_group("data", "NXdata")
+            shp = images[5].shape
+            data = dt.create_field("data", "uint32", shp, shp)
+            data.write(images[5])
+            data.close()
+            dt.close()
+            entry.close()
+            fl.close()
+
+            for cmd in commands:
+                nxsfile = filewriter.create_file(
+                    filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry12345", "NXentry")
+                entry.create_group("instrument", "NXinstrument")
+                nxsfile.close()
+
+                pcmd = cmd
+                pcmd.extend(
+                    ["-e", "h5test1_%05d.nxs://entry345/data/data:0:1,"
+                     "h5test1_00002.nxs://entry345/data/data"])
+
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = pcmd
+                nxscollect.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                svl = vl.split("\n")
+                self.assertEqual(len(svl), 5)
+                self.assertTrue(svl[0].startswith('vds: '))
+                self.assertTrue(
+                    "of shape [6, %s, %s]" % tuple(mlen) in svl[0])
+                for i in range(1, 4):
+                    self.assertEqual(
+                        svl[i],
+                        ' * add h5test1_%05d.nxs:/'
+                        '/entry345/data/data ' % (i - 1))
+
+                if '-r' not in cmd:
+                    os.remove("%s.__nxscollect_old__" % filename)
+                nxsfile = filewriter.open_file(filename, readonly=True)
+                rt = nxsfile.root()
+                det = rt.open("entry12345").open("instrument").open(
+                    "pilatus300k")
+                self.assertEqual(
+                    filewriter.first(det.attributes["NX_class"].read()),
+                    "NXdetector")
+                dt = det.open("data")
+                buffer = dt.read()
+                self.assertEqual(buffer.shape, images.shape)
+                self.assertEqual(dt.dtype, "uint32")
+                self.assertTrue((buffer == images).all())
+                nxsfile.close()
+                os.remove(filename)
+
+        finally:
+            for i in range(3):
+                os.remove("h5test1_%05d.nxs" % i)
+
+    def test_benchmark_workers(self):
+        """ test the append benchmark with decoding worker processes
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        sys.path.insert(0, "benchmarks")
+        try:
+            import collect_benchmark
+        finally:
+            sys.path.pop(0)
+
+        directory = tempfile.mkdtemp()
+        try:
+            inputfiles, datatype, shape, nbytes = collect_benchmark.generate(
+                directory, "tif", 6, [16, 20], "uint16")
+            self.assertEqual(nbytes, 6 * 16 * 20 * 2)
+            for workers in [0, 2]:
+                summary = collect_benchmark.measure({
+                    "writer": self.writer,
+                    "compression": "2",
+                    "master": os.path.join(directory, "master.nxs"),
+                    "inputfiles": inputfiles,
+                    "datatype": datatype,
+                    "shape": shape,
+                    "workers": workers,
+                    "batchframes": 2,
+                })
+                self.assertEqual(summary["error"], None)
+                self.assertEqual(summary["frames"], 6)
+                self.assertTrue(summary["bytes"] > 0)
+        finally:
+            shutil.rmtree(directory)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -21,6 +21,11 @@
 #
 import unittest
 import os
+import fnmatch
+import json
+import shutil
+import tempfile
+import time
 import sys
 import random
 import struct
@@ -30,6 +35,8 @@ import docutils.utils
 
 from nxstools import nxsfileinfo
 from nxstools import filewriter
+from nxstools.nxsfileparser import (NXSFileParser, NXSMetadataParser)
+from nxstools.nxsfilecache import NXSFileCache
 
 
 try:
@@ -2008,6 +2015,551 @@ For more help:
         finally:
             os.remove(filename)
 
+    def test_field_metadata_parser(self):
+        """ test metadata parser with the full file parser
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = "vttestfileinfo.nxs"
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            det = ins.create_group("detector", "NXdetector")
+            dt = entry.create_group("data", "NXdata")
+            sample = entry.create_group("sample", "NXsample")
+            sample.create_field("depends_on", "string").write(
+                "transformations/phi")
+            trans = sample.create_group(
+                "transformations", "NXtransformations")
+            phi = trans.create_field("phi", "float64")
+            phi.write(5.)
+            phi.attributes.create("units", "string").write("deg")
+            phi.attributes.create("transformation_type", "string").write(
+                "rotation")
+            phi.attributes.create("depends_on", "string").write(".")
+            phi.attributes.create("nexdatas_source", "string").write(
+                '<datasource type="TANGO" name="sphi">'
+                '<device member="attribute" hostname="haso0000" '
+                'group="__CLIENT__" name="p/motor/m16" port="10000">'
+                '</device>'
+                '<record name="Position"></record>'
+                '</datasource>')
+            phi.attributes.create("vector", "int32", [3]).write(
+                [1, 0, 0])
+            det.create_field("intimage", "uint32", [0, 30], [1, 30])
+            filewriter.link(
+                "/entry12345/instrument/detector/intimage",
+                dt, "lkintimage")
+            filewriter.link(
+                "/entry12345/sample", dt, "lksample")
+            nxsfile.close()
+
+            nxsfile = filewriter.open_file(filename, readonly=True)
+            rt = nxsfile.root()
+            if not NXSMetadataParser.supports(rt):
+                self.assertEqual(self.writer, "h5cpp")
+                nxsfile.close()
+                return
+            for filters in [[], ["*/depends_on"], ["*:NXdata/*"],
+                            ["*:NXtransformations/*", "*/depends_on"]]:
+                fparser = NXSFileParser(rt)
+                fparser.filters = filters
+                fparser.valuestostore = ["depends_on", "phi"]
+                fparser.parse()
+                mparser = NXSMetadataParser(rt)
+                mparser.filters = filters
+                mparser.valuestostore = ["depends_on", "phi"]
+                mparser.parse()
+                self.assertEqual(
+                    str(mparser.description), str(fparser.description))
+
+            mparser = NXSMetadataParser(rt)
+            mparser.columns = ["nexus_path", "units"]
+            mparser.filters = ["*/phi"]
+            mparser.valuestostore = ["phi"]
+            mparser.parse()
+            self.assertEqual(
+                mparser.description,
+                [{"full_path": "/entry12345:NXentry/data:NXdata/"
+                  "lksample:NXsample/transformations:NXtransformations/phi",
+                  "nexus_path": "/entry12345/data/lksample/"
+                  "transformations/phi",
+                  "dtype": "float64", "shape": [1], "units": "deg",
+                  "value": 5.0},
+                 {"full_path": "/entry12345:NXentry/sample:NXsample/"
+                  "transformations:NXtransformations/phi",
+                  "nexus_path": "/entry12345/sample/transformations/phi",
+                  "dtype": "float64", "shape": [1], "units": "deg",
+                  "value": 5.0}])
+            nxsfile.close()
+        finally:
+            os.remove(filename)
+
+    def test_field_parser_filters(self):
+        """ test filters applied during the tree walk
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = "vttestfileinfo.nxs"
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            ins = entry.create_group("instrument", "NXinstrument")
+            det = ins.create_group("detector", "NXdetector")
+            dt = entry.create_group("data", "NXdata")
+            sample = entry.create_group("sample", "NXsample")
+            sample.create_field("depends_on", "string").write(
+                "transformations/phi")
+            trans = sample.create_group(
+                "transformations", "NXtransformations")
+            trans.create_field("phi", "float64").write(5.)
+            det.create_field("intimage", "uint32", [0, 30], [1, 30])
+            filewriter.link(
+                "/entry12345/instrument/detector/intimage",
+                dt, "lkintimage")
+            nxsfile.close()
+
+            nxsfile = filewriter.open_file(filename, readonly=True)
+            rt = nxsfile.root()
+            parsers = [NXSFileParser]
+            if NXSMetadataParser.supports(rt):
+                parsers.append(NXSMetadataParser)
+            for prs in parsers:
+                nxsparser = prs(rt)
+                nxsparser.parse()
+                paths = [desc["full_path"]
+                         for desc in nxsparser.description]
+                self.assertEqual(len(paths), 12)
+                for filters in [
+                        ["*:NXtransformations/*"],
+                        ["/entry12345:NXentry/sample:NXsample/*"],
+                        ["/entry12345:NXentry/data:NXdata/lkintimage"],
+                        ["/entry12345:NXentry/instrument:NXinstrument"],
+                        ["/entry12345:NXentry/[ds]*/*", "*/phi"],
+                        ["/entry12345:NXentry/s?mple*"],
+                        ["entry12345*"], ["/"]]:
+                    nxsparser = prs(rt)
+                    nxsparser.filters = filters
+                    nxsparser.parse()
+                    expected = [
+                        path for path in paths
+                        if any(fnmatch.fnmatch(path, df) for df in filters)]
+                    self.assertEqual(
+                        [desc["full_path"]
+                         for desc in nxsparser.description],
+                        expected)
+            nxsfile.close()
+        finally:
+            os.remove(filename)
+
+    def test_field_jsonl_files(self):
+        """ test field and general information of many files in jsonl
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filenames = ["vttestfileinfo%s.nxs" % i for i in range(3)]
+
+        commands = [
+            ('nxsfileinfo field vttestfileinfo?.nxs %s'
+             ' --format jsonl -f */phi -c nexus_path,units,dtype,shape'
+             % self.flags).split(),
+            ('nxsfileinfo field vttestfileinfo?.nxs %s --jobs 2'
+             ' --format jsonl -f */phi -c nexus_path,units,dtype,shape'
+             % self.flags).split(),
+            ('nxsfileinfo field %s %s --jobs 3'
+             ' --format jsonl -f */phi -c nexus_path,units,dtype,shape'
+             % (" ".join(filenames), self.flags)).split(),
+        ]
+        gcommands = [
+            ('nxsfileinfo general vttestfileinfo*.nxs %s'
+             ' --format jsonl' % self.flags).split(),
+            ('nxsfileinfo general vttestfileinfo*.nxs %s'
+             ' --format jsonl --jobs 2' % self.flags).split(),
+        ]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i, filename in enumerate(filenames):
+                nxsfile = filewriter.create_file(filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry%s" % i, "NXentry")
+                entry.create_field("title", "string").write("scan %s" % i)
+                sample = entry.create_group("sample", "NXsample")
+                trans = sample.create_group(
+                    "transformations", "NXtransformations")
+                phi = trans.create_field("phi", "float64")
+                phi.write(5.)
+                phi.attributes.create("units", "string").write("deg")
+                nxsfile.close()
+
+            for cmd in commands:
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxsfileinfo.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                self.assertEqual(
+                    [json.loads(line) for line in vl.splitlines()],
+                    [{"file": filename,
+                      "nexus_path":
+                      "/entry%s/sample/transformations/phi" % i,
+                      "units": "deg", "dtype": "float64", "shape": [1]}
+                     for i, filename in enumerate(filenames)])
+
+            for cmd in gcommands:
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = cmd
+                nxsfileinfo.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+
+                records = [json.loads(line) for line in vl.splitlines()]
+                self.assertEqual(
+                    [(rc["file"], rc["scan_entry"], rc["title"])
+                     for rc in records],
+                    [(filename, "entry%s" % i, "scan %s" % i)
+                     for i, filename in enumerate(filenames)])
+        finally:
+            for filename in filenames:
+                os.remove(filename)
+
+    def test_field_json_csv_files(self):
+        """ test field and general information of many files in json and csv
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filenames = ["vttestfileinfo%s.nxs" % i for i in range(3)]
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            for i, filename in enumerate(filenames):
+                nxsfile = filewriter.create_file(filename, overwrite=True)
+                rt = nxsfile.root()
+                entry = rt.create_group("entry%s" % i, "NXentry")
+                entry.create_field("title", "string").write("scan %s" % i)
+                sample = entry.create_group("sample", "NXsample")
+                trans = sample.create_group(
+                    "transformations", "NXtransformations")
+                phi = trans.create_field("phi", "float64")
+                phi.write(5.)
+                phi.attributes.create("units", "string").write("deg")
+                nxsfile.close()
+
+            for jobs in ["", "--jobs 2"]:
+                for fmt in ["json", "csv"]:
+                    cmd = ('nxsfileinfo field vttestfileinfo?.nxs %s %s'
+                           ' --format %s -f */phi -v phi'
+                           ' -c nexus_path,units,shape,value'
+                           % (self.flags, jobs, fmt)).split()
+                    old_stdout = sys.stdout
+                    old_stderr = sys.stderr
+                    sys.stdout = mystdout = StringIO()
+                    sys.stderr = mystderr = StringIO()
+                    old_argv = sys.argv
+                    sys.argv = cmd
+                    nxsfileinfo.main()
+
+                    sys.argv = old_argv
+                    sys.stdout = old_stdout
+                    sys.stderr = old_stderr
+                    vl = mystdout.getvalue()
+                    er = mystderr.getvalue()
+
+                    self.assertEqual('', er)
+                    if fmt == "json":
+                        self.assertEqual(
+                            json.loads(vl),
+                            [{"file": filename,
+                              "nexus_path":
+                              "/entry%s/sample/transformations/phi" % i,
+                              "units": "deg", "shape": [1], "value": 5.0}
+                             for i, filename in enumerate(filenames)])
+                    else:
+                        self.assertEqual(
+                            vl.splitlines(),
+                            ["file,nexus_path,units,shape,value"] +
+                            ["%s,/entry%s/sample/transformations/phi,"
+                             "deg,[1],5.0" % (filename, i)
+                             for i, filename in enumerate(filenames)])
+
+                for fmt in ["json", "csv"]:
+                    cmd = ('nxsfileinfo general vttestfileinfo?.nxs %s %s'
+                           ' --format %s' % (self.flags, jobs, fmt)).split()
+                    old_stdout = sys.stdout
+                    old_stderr = sys.stderr
+                    sys.stdout = mystdout = StringIO()
+                    sys.stderr = mystderr = StringIO()
+                    old_argv = sys.argv
+                    sys.argv = cmd
+                    nxsfileinfo.main()
+
+                    sys.argv = old_argv
+                    sys.stdout = old_stdout
+                    sys.stderr = old_stderr
+                    vl = mystdout.getvalue()
+
+                    if fmt == "json":
+                        self.assertEqual(
+                            [(rc["file"], rc["scan_entry"], rc["title"])
+                             for rc in json.loads(vl)],
+                            [(filename, "entry%s" % i, "scan %s" % i)
+                             for i, filename in enumerate(filenames)])
+                    else:
+                        lines = vl.splitlines()
+                        self.assertEqual(len(lines), 4)
+                        self.assertTrue(lines[0].startswith(
+                            "file,file_name,scan_entry,title,"))
+                        for i, filename in enumerate(filenames):
+                            self.assertTrue(lines[i + 1].startswith(
+                                "%s,%s,entry%s,scan %s," % (
+                                    filename, filename, i, i)))
+        finally:
+            for filename in filenames:
+                os.remove(filename)
+
+    def test_general_cache(self):
+        """ test general information taken from the metadata cache
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = "vttestfileinfo.nxs"
+        cachehome = tempfile.mkdtemp()
+        cachefile = os.path.join(cachehome, "nxstools", "nxsfileinfo.sqlite")
+        oldcachehome = os.environ.get("XDG_CACHE_HOME")
+        os.environ["XDG_CACHE_HOME"] = cachehome
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+        kind = "general:%s:%s" % (self.writer, nxsfileinfo.__version__)
+        errors = []
+
+        def runcmd(cmd):
+            old_stdout = sys.stdout
+            old_stderr = sys.stderr
+            sys.stdout = mystdout = StringIO()
+            sys.stderr = mystderr = StringIO()
+            old_argv = sys.argv
+            sys.argv = cmd.split()
+            nxsfileinfo.main()
+
+            sys.argv = old_argv
+            sys.stdout = old_stdout
+            sys.stderr = old_stderr
+            errors.append(mystderr.getvalue())
+            return [json.loads(line)
+                    for line in mystdout.getvalue().splitlines()]
+
+        def createfile(title):
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            entry = nxsfile.root().create_group("entry12345", "NXentry")
+            entry.create_field("title", "string").write(title)
+            nxsfile.close()
+
+        try:
+            createfile("my scan")
+            cmd = 'nxsfileinfo general %s %s --format jsonl' % (
+                filename, self.flags)
+
+            self.assertEqual(
+                runcmd(cmd + " --cache --no-cache")[0]["title"], "my scan")
+            self.assertTrue(not os.path.exists(cachefile))
+            self.assertEqual(
+                runcmd(cmd + " --cache")[0]["title"], "my scan")
+            self.assertTrue(os.path.exists(cachefile))
+            self.assertTrue("start time cannot be found" in errors[-1])
+
+            cache = NXSFileCache(cachefile)
+            identity = cache.identity(filename)
+            self.assertEqual(cache.get(identity, "general"), None)
+            info = cache.get(identity, kind)
+            self.assertEqual(info["entries"][0][1], "entry12345")
+            self.assertEqual(info["warnings"], errors[-1])
+            # a cached description is shown for the unchanged file
+            info["entries"][0][2][0]["entry12345"] = "cached scan"
+            info["warnings"] = "cached warning\n"
+            cache.put(identity, kind, info)
+            cache.close()
+            self.assertEqual(
+                runcmd(cmd + " --cache")[0]["title"], "cached scan")
+            self.assertEqual(errors[-1], "cached warning\n")
+            self.assertEqual(
+                runcmd(cmd)[0]["title"], "my scan")
+            self.assertTrue("start time cannot be found" in errors[-1])
+
+            createfile("new scan with a longer title")
+            self.assertEqual(
+                runcmd(cmd + " --cache")[0]["title"],
+                "new scan with a longer title")
+            identity = NXSFileCache.identity(filename)
+
+            # the least recently used entries are evicted
+            cache = NXSFileCache(cachefile, maxsize=700)
+            cache.put(("/a.nxs", 1, 1., 1), "general", "a" * 300)
+            time.sleep(0.01)
+            cache.put(("/b.nxs", 1, 1., 1), "general", "b" * 300)
+            time.sleep(0.01)
+            self.assertEqual(
+                cache.get(("/a.nxs", 1, 1., 1), "general"), "a" * 300)
+            time.sleep(0.01)
+            self.assertEqual(
+                cache.get(("/a.nxs", 1, 2., 1), "general"), None)
+            cache.put(("/c.nxs", 1, 1., 1), "general", "c" * 300)
+            self.assertEqual(cache.get(identity, kind), None)
+            self.assertEqual(
+                cache.get(("/b.nxs", 1, 1., 1), "general"), None)
+            self.assertEqual(
+                cache.get(("/a.nxs", 1, 1., 1), "general"), "a" * 300)
+            self.assertEqual(
+                cache.get(("/c.nxs", 1, 1., 1), "general"), "c" * 300)
+            cache.close()
+        finally:
+            if oldcachehome is None:
+                os.environ.pop("XDG_CACHE_HOME")
+            else:
+                os.environ["XDG_CACHE_HOME"] = oldcachehome
+            shutil.rmtree(cachehome)
+            os.remove(filename)
+
+    def test_field_geometry_depends_on(self):
+        """ test depends_on values shown with the geometry columns
+        """
+        fun = sys._getframe().f_code.co_name
+        print("Run: %s.%s() " % (self.__class__.__name__, fun))
+
+        filename = "gtestfileinfo.nxs"
+
+        wrmodule = WRITERS[self.writer]
+        filewriter.writer = wrmodule
+
+        try:
+            nxsfile = filewriter.create_file(filename, overwrite=True)
+            rt = nxsfile.root()
+            entry = rt.create_group("entry12345", "NXentry")
+            sample = entry.create_group("sample", "NXsample")
+            sample.create_field("depends_on", "string").write(
+                "transformations/phi")
+            trans = sample.create_group(
+                "transformations", "NXtransformations")
+            phi = trans.create_field("phi", "float64")
+            phi.write(5.)
+            phi.attributes.create("units", "string").write("deg")
+            phi.attributes.create("transformation_type", "string").write(
+                "rotation")
+            phi.attributes.create("depends_on", "string").write(".")
+            nxsfile.close()
+
+            old_stdout = sys.stdout
+            old_stderr = sys.stderr
+            sys.stdout = mystdout = StringIO()
+            sys.stderr = mystderr = StringIO()
+            old_argv = sys.argv
+            sys.argv = ('nxsfileinfo field -g %s %s' % (
+                filename, self.flags)).split()
+            nxsfileinfo.main()
+
+            sys.argv = old_argv
+            sys.stdout = old_stdout
+            sys.stderr = old_stderr
+            vl = mystdout.getvalue()
+            er = mystderr.getvalue()
+
+            self.assertEqual('', er)
+            rows = dict(
+                (line.split()[0], line) for line in vl.splitlines()
+                if line.startswith("/entry12345"))
+            self.assertEqual(
+                sorted(rows.keys()),
+                ["/entry12345/sample/depends_on",
+                 "/entry12345/sample/transformations/phi"])
+            self.assertTrue(
+                "transformations/phi" in
+                rows["/entry12345/sample/depends_on"])
+            self.assertTrue(
+                "rotation" in rows["/entry12345/sample/transformations/phi"])
+            self.assertTrue(
+                "[" in rows["/entry12345/sample/depends_on"])
+
+            for fmt in ["json", "jsonl", "csv"]:
+                old_stdout = sys.stdout
+                old_stderr = sys.stderr
+                sys.stdout = mystdout = StringIO()
+                sys.stderr = mystderr = StringIO()
+                old_argv = sys.argv
+                sys.argv = ('nxsfileinfo field -g %s %s --format %s' % (
+                    filename, self.flags, fmt)).split()
+                nxsfileinfo.main()
+
+                sys.argv = old_argv
+                sys.stdout = old_stdout
+                sys.stderr = old_stderr
+                vl = mystdout.getvalue()
+                er = mystderr.getvalue()
+
+                self.assertEqual('', er)
+                if fmt == "json":
+                    records = json.loads(vl)
+                elif fmt == "jsonl":
+                    records = [json.loads(line) for line in vl.splitlines()]
+                else:
+                    lines = vl.splitlines()
+                    self.assertEqual(
+                        lines[0],
+                        "file,nexus_path,source_name,units,trans_type,"
+                        "trans_vector,trans_offset,depends_on")
+                    records = [
+                        {"nexus_path": line.split(",")[1],
+                         "depends_on": line.split(",")[-1]}
+                        for line in lines[1:]]
+                depends = dict(
+                    (rc["nexus_path"], rc.get("depends_on"))
+                    for rc in records)
+                self.assertEqual(
+                    depends["/entry12345/sample/depends_on"],
+                    "[transformations/phi]")
+                self.assertEqual(
+                    depends["/entry12345/sample/transformations/phi"], ".")
+        finally:
+            os.remove(filename)
+
 
 if __name__ == '__main__':
     unittest.main()